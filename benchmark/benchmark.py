@@ -1,13 +1,26 @@
 from typing import Any
 import abc
+import concurrent.futures
+import contextlib
+import glob
+import hashlib
+import io
+import json
 import os
 import sys
 import subprocess
+import tempfile
 import importlib
 import traceback
+import pylint
 import pylint.lint
+import mypy.version
 from mypy import api
 
+# results of pylint and mypy, keyed by a hash of the checked sources
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+SERVER_DIR = os.path.join("server", "py")
+
 
 class Benchmark:
 
@@ -16,13 +29,16 @@ class Benchmark:
     COLOR_ENDC = '\033[0m'
     COLOR_RESULT = '\033[93m'
 
+    LIST_SLOW_TEST = ['test_pylint', 'test_mypy', 'test_pytest']
+
     def __init__(self, argv) -> None:
+        self.argv = argv
         self.mode = argv[1]
         if self.mode == 'python':
             self.script = argv[2]
             self.game_server = Python_Game_Server(self.script)
 
-    def run_tests(self, disable_features=False) -> None:
+    def run_tests(self, disable_features=False, workers=None) -> None:
         os.system('color')
 
         print('--- Benchmark ---')
@@ -37,7 +53,8 @@ class Benchmark:
         cnt_tests_total = 0
         cnt_points_valid = 0
         cnt_points_total = 0
-        for function_name in list_function_name:
+        for function_name, (valid, output) in zip(list_function_name,
+                                                  self.run_functions(list_function_name, disable_features, workers)):
 
             function = getattr(self, function_name)
             id_test = function.__doc__.split(":")[0]
@@ -45,20 +62,14 @@ class Benchmark:
             description = function.__doc__[len(id_test) + 2:]
             cnt_tests_total += 1
             cnt_points_total += points
-            try:
-                if disable_features:
-                    os.environ["DISABLED_FEATURES"] = function_name
-                function()
-            except AssertionError as e:
-                print(f'{self.COLOR_FAIL}{id_test}{self.COLOR_ENDC}: {description}')
-                print(e)
-            except Exception:
-                print(f'{self.COLOR_FAIL}{id_test}{self.COLOR_ENDC}: {description}')
-                print(traceback.format_exc())
-            else:
+            if valid:
+                print(output, end='')
                 print(f'{self.COLOR_OKAY}{id_test}{self.COLOR_ENDC}: {description}')
                 cnt_tests_valid += 1
                 cnt_points_valid += points
+            else:
+                print(f'{self.COLOR_FAIL}{id_test}{self.COLOR_ENDC}: {description}')
+                print(output)
             print()
 
         print(f'{self.COLOR_RESULT}Result{self.COLOR_ENDC}')
@@ -67,6 +78,42 @@ class Benchmark:
         print()
 
 
+    def run_functions(self, list_function_name, disable_features=False, workers=None):
+        """Run the tests, in parallel processes unless workers is 1, and yield (valid, output) in the given order.
+        Every process builds its own benchmark (and game server), so the tests don't share any game state."""
+        if workers == 1 or self.mode != 'python':
+            for function_name in list_function_name:
+                yield self.run_function(function_name, disable_features)
+            return
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            # the slow external checks are started first, the game tests are run beside them
+            dict_future = {}
+            for function_name in sorted(list_function_name, key=lambda name: name not in self.LIST_SLOW_TEST):
+                dict_future[function_name] = executor.submit(run_function_in_process, type(self), self.argv,
+                                                             function_name, disable_features)
+            for future in [dict_future[function_name] for function_name in list_function_name]:
+                try:
+                    yield future.result()
+                except Exception:
+                    yield False, traceback.format_exc()
+
+
+    def run_function(self, function_name, disable_features=False) -> tuple[bool, str]:
+        """Run one test and return whether it passed with its output (or the reason it failed)."""
+        function = getattr(self, function_name)
+        output = io.StringIO()
+        try:
+            if disable_features:
+                os.environ["DISABLED_FEATURES"] = function_name
+            with contextlib.redirect_stdout(output):
+                function()
+        except AssertionError as e:
+            return False, output.getvalue() + str(e)
+        except Exception:
+            return False, output.getvalue() + traceback.format_exc()
+        return True, output.getvalue()
+
+
     def get_list_function_name(self) -> list[str]:
         list_function_name = []
         for attribute in dir(self):
@@ -91,12 +138,16 @@ class Benchmark:
 
     def test_pylint(self) -> None:
         """Test 100: Code style with Pylint [5 point]"""
-        og_pipe = sys.stdout # Save original pipeline
-        with open(os.devnull, 'w', encoding="utf-8") as tmp_pipe:
-            sys.stdout = tmp_pipe # Pipe stdout to temporary pipeline
-            module_name, _ = self.script.split('.')
-            pylint_score = round(pylint.lint.Run([f'server.py.{module_name}'], exit=False).linter.stats.global_note, 2)
-        sys.stdout = og_pipe # Set stdout pipe back to original
+        module_name, _ = self.script.split('.')
+        cache_key = get_cache_key(f'pylint {pylint.__version__} {module_name}', ['.pylintrc'])
+        pylint_score = load_cached_result(f'pylint_{module_name}', cache_key)
+        if pylint_score is None:
+            og_pipe = sys.stdout # Save original pipeline
+            with open(os.devnull, 'w', encoding="utf-8") as tmp_pipe:
+                sys.stdout = tmp_pipe # Pipe stdout to temporary pipeline
+                pylint_score = round(pylint.lint.Run([f'server.py.{module_name}'], exit=False).linter.stats.global_note, 2)
+            sys.stdout = og_pipe # Set stdout pipe back to original
+            store_cached_result(f'pylint_{module_name}', cache_key, pylint_score)
         if pylint_score != 10:
             raise AssertionError(f'Pylint score {pylint_score:.1f}/10')
 
@@ -104,9 +155,20 @@ class Benchmark:
     def test_mypy(self) -> None:
         """Test 101: Type checking with MyPy [5 point]"""
         module_name, _ = self.script.split('.')
-        result = api.run([f"server/py/{module_name}.py"])
-        if result[2] != 0:
-            raise AssertionError(f'MyPy exit code is {result[2]}')
+        cache_key = get_cache_key(f'mypy {mypy.version.__version__} {module_name}', ['mypy.ini'])
+        exit_code = load_cached_result(f'mypy_{module_name}', cache_key)
+        if exit_code is None:
+            if os.environ.get("BENCHMARK_MYPY_DAEMON"):
+                # the daemon keeps the analysis in memory between runs (stop it with 'dmypy stop')
+                result = api.run_dmypy(["run", "--", f"server/py/{module_name}.py"])
+            else:
+                result = api.run(["--incremental", "--cache-dir", os.path.join(CACHE_DIR, "mypy"),
+                                  f"server/py/{module_name}.py"])
+            exit_code = result[2]
+            if exit_code in (0, 1):  # exit code 2 is a crash or usage error, not a result of the sources
+                store_cached_result(f'mypy_{module_name}', cache_key, exit_code)
+        if exit_code != 0:
+            raise AssertionError(f'MyPy exit code is {exit_code}')
 
 
     def test_pytest(self) -> None:
@@ -125,6 +187,42 @@ class Benchmark:
             raise AssertionError(f"Test coverage is too low ({int(coverage_result.stdout)}%)")
 
 
+def get_cache_key(tool: str, list_config_file: list[str]) -> str:
+    """Hash of everything a check of the server depends on: the tool (with its version), its configuration
+    and the content of all server modules (a changed test file keeps the key)."""
+    digest = hashlib.sha256(tool.encode())
+    for path in list_config_file + sorted(glob.glob(os.path.join(SERVER_DIR, "*.py"))):
+        if os.path.isfile(path):
+            digest.update(path.encode())
+            with open(path, 'rb') as file:
+                digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def load_cached_result(name: str, cache_key: str) -> Any:
+    """Result stored for the key, or None if there is none (or it was stored for other sources)."""
+    try:
+        with open(os.path.join(CACHE_DIR, f"{name}.json"), encoding="utf-8") as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    return data["result"] if data.get("key") == cache_key else None
+
+
+def store_cached_result(name: str, cache_key: str, result: Any) -> None:
+    """Store the result of a check (replaced atomically, as tests run in parallel processes)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, f"{name}.json")
+    with tempfile.NamedTemporaryFile('w', dir=CACHE_DIR, suffix='.tmp', delete=False, encoding="utf-8") as file:
+        json.dump({"key": cache_key, "result": result}, file)
+    os.replace(file.name, path)
+
+
+def run_function_in_process(benchmark_class, argv, function_name, disable_features) -> tuple[bool, str]:
+    """Run one test in a worker process on a new benchmark instance (with its own game server)."""
+    return benchmark_class(argv=argv).run_function(function_name, disable_features)
+
+
 class Game_Server(metaclass=abc.ABCMeta):
 
     @abc.abstractmethod
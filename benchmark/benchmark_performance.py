@@ -0,0 +1,290 @@
+# runcmd: cd .. & venv\Scripts\python benchmark/benchmark_performance.py python dog.Dog --output perf_dog.json
+"""
+Timing suite of a game engine: plays games with random players and measures
+
+- the throughput (actions and games per second)
+- the latency of get_list_action, in total and per card type of the active hand (e.g. SEVEN, JOKER, JACK)
+- the latency of apply_action
+- the latency of get_player_view plus the serialization sent to the client (model_dump and JSON)
+- the memory of a live game
+
+The games are played several times (--repeats) and each latency is the median over the repetitions, so a
+single disturbed run doesn't shift the result. The results are written as JSON. With --baseline, every latency
+is compared to a stored result and the run fails (exit code 1) if one got slower by more than the tolerance.
+"""
+import argparse
+import copy
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import benchmark
+
+sys.path += '../'
+
+HANGMAN_WORDS = ['apple', 'benchmark', 'kennel', 'marble', 'python', 'server']
+PERCENTILES = (50, 90, 99)
+DEFAULT_GAMES = 5
+DEFAULT_MAX_STEPS = 2000
+DEFAULT_LIVE_GAMES = 20
+DEFAULT_REPEATS = 3
+DEFAULT_TOLERANCE = 0.25
+# latencies below this are dominated by timer noise and never reported as a regression
+MIN_COMPARED_US = 5.0
+# the p90 of fewer samples (in either run) is decided by a few outliers and not compared
+MIN_P90_SAMPLES = 200
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """ Distribution of latencies (in seconds) as count, mean, percentiles and max in microseconds """
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    summary = {'count': len(ordered), 'mean_us': statistics.fmean(ordered) * 1e6}
+    for percentile in PERCENTILES:
+        idx = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        summary[f'p{percentile}_us'] = ordered[idx] * 1e6
+    summary['max_us'] = ordered[-1] * 1e6
+    return {key: round(value, 2) for key, value in summary.items()}
+
+
+def serialize(state: Any) -> str:
+    """ JSON of a state as sent to the client (states which are no pydantic models by their attributes) """
+    data = state.model_dump() if hasattr(state, 'model_dump') else vars(state)
+    return json.dumps(data, default=str)
+
+
+def dog_card_category(card: Any) -> str:
+    return {'7': 'SEVEN', 'JKR': 'JOKER', 'J': 'JACK'}.get(card.rank, 'other')
+
+
+def uno_card_category(card: Any) -> str:
+    if card.symbol in ('wild', 'wilddraw4'):
+        return 'wild'
+    return 'number' if card.symbol is None else 'action'
+
+
+class PerformanceBenchmark(benchmark.Benchmark):
+
+    CARD_CATEGORY: Dict[str, Callable[[Any], str]] = {
+        'dog': dog_card_category,
+        'uno': uno_card_category,
+    }
+
+    def __init__(self, argv) -> None:
+        super().__init__(argv)
+        parser = argparse.ArgumentParser(prog='benchmark_performance.py')
+        parser.add_argument('--games', type=int, default=DEFAULT_GAMES, help='number of games to play')
+        parser.add_argument('--max-steps', type=int, default=DEFAULT_MAX_STEPS, help='maximum actions per game')
+        parser.add_argument('--live-games', type=int, default=DEFAULT_LIVE_GAMES,
+                            help='number of games kept alive to measure the memory per game')
+        parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS,
+                            help='number of times the games are played (the median is reported)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='file to write the results to (JSON)')
+        parser.add_argument('--baseline', help='stored results (JSON) to compare with')
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                            help='allowed slowdown against the baseline (0.25 = 25%%)')
+        self.args = parser.parse_args(argv[3:])
+        self.module_name = self.script.split('.')[0]
+        self.card_category = self.CARD_CATEGORY.get(self.module_name)
+        self.latencies: Dict[str, List[float]] = {}
+
+    # --- game setup ---
+
+    def new_game(self) -> Any:
+        """ A started game with a random player (as in the websocket endpoints of the server) """
+        self.game_server.reset()
+        game = self.game_server.game
+        if self.module_name == 'uno':
+            game.set_state(self.game_server.game_module.GameState(cnt_player=4))
+        elif self.module_name == 'hangman':
+            module = self.game_server.game_module
+            game.set_state(module.HangmanGameState(
+                word_to_guess=random.choice(HANGMAN_WORDS), phase=module.GamePhase.RUNNING,
+                guesses=[], incorrect_guesses=[]))
+        return game
+
+    def is_card_choice(self, state: Any) -> bool:
+        """ Whether the active player chooses a card to play from the hand (for the latency per card type) """
+        if self.card_category is None or state.phase != 'running':
+            return False
+        if self.module_name == 'dog':
+            return state.bool_card_exchanged and state.card_active is None
+        return True
+
+    # --- measurements ---
+
+    def record(self, name: str, seconds: float) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+
+    def timed(self, name: str, function: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        result = function()
+        self.record(name, time.perf_counter() - start)
+        return result
+
+    def probe_card_categories(self, game: Any, probe: Any) -> None:
+        """ Time get_list_action with the active hand reduced to the cards of each category in it """
+        assert self.card_category is not None
+        state = game.get_state()
+        hand = state.list_player[state.idx_player_active].list_card
+        by_category: Dict[str, List[Any]] = {}
+        for card in hand:
+            by_category.setdefault(self.card_category(card), []).append(card)
+        for category, cards in by_category.items():
+            state_probe = copy.deepcopy(state)
+            state_probe.list_player[state.idx_player_active].list_card = copy.deepcopy(cards)
+            probe.set_state(state_probe)
+            self.timed(f'get_list_action.{category}', probe.get_list_action)
+
+    def play_game(self) -> Dict[str, Any]:
+        """ Play one game with random players, timing every call """
+        game = self.new_game()
+        player = self.game_server.player
+        probe = self.new_game() if self.card_category is not None else None
+        cnt_action = 0
+        start = time.perf_counter()
+        time_probe = 0.0
+        while game.get_state().phase != 'finished' and cnt_action < self.args.max_steps:
+            state = game.get_state()
+            idx_player = getattr(state, 'idx_player_active', None) or 0
+
+            def serialize_view(idx_player: int = idx_player) -> str:
+                return serialize(game.get_player_view(idx_player))
+
+            self.timed('get_player_view+serialize', serialize_view)
+            if probe is not None and self.is_card_choice(state):
+                start_probe = time.perf_counter()
+                self.probe_card_categories(game, probe)
+                time_probe += time.perf_counter() - start_probe
+            list_action = self.timed('get_list_action', game.get_list_action)
+            action = player.select_action(game.get_state(), list_action)
+            self.timed('apply_action', lambda action=action: game.apply_action(action))
+            cnt_action += 1
+        seconds = time.perf_counter() - start - time_probe
+        return {'cnt_action': cnt_action, 'seconds': seconds, 'finished': game.get_state().phase == 'finished'}
+
+    def measure_memory(self) -> Dict[str, float]:
+        """ Memory allocated per started game, with several games alive at the same time """
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        games = [self.new_game() for _ in range(self.args.live_games)]
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return {'live_games': len(games), 'bytes_per_game': round((after - before) / len(games))}
+
+    def play_games(self) -> Dict[str, Any]:
+        """ Play the games once (the same games on every call) and summarize the throughput and latencies """
+        random.seed(self.args.seed)
+        self.latencies = {}
+        list_game = [self.play_game() for _ in range(self.args.games)]
+        cnt_action = sum(result['cnt_action'] for result in list_game)
+        seconds = sum(result['seconds'] for result in list_game)
+        return {
+            'throughput': {
+                'actions_per_s': round(cnt_action / seconds, 1) if seconds else 0.0,
+                'games_per_s': round(len(list_game) / seconds, 3) if seconds else 0.0,
+                'games_finished': sum(result['finished'] for result in list_game),
+                'actions_per_game': round(cnt_action / len(list_game), 1) if list_game else 0.0,
+            },
+            'latency': {name: summarize(samples) for name, samples in sorted(self.latencies.items())},
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """ Play the games repeatedly and collect the median results """
+        list_run = [self.play_games() for _ in range(max(1, self.args.repeats))]
+        latency = {}
+        for name, summary in list_run[0]['latency'].items():
+            summaries = [result['latency'][name] for result in list_run if name in result['latency']]
+            latency[name] = {key: statistics.median(summary_run[key] for summary_run in summaries) for key in summary}
+        throughput = {key: statistics.median(result['throughput'][key] for result in list_run)
+                      for key in list_run[0]['throughput']}
+        return {
+            'script': self.script,
+            'python': platform.python_version(),
+            'games': self.args.games,
+            'repeats': len(list_run),
+            'seed': self.args.seed,
+            'throughput': throughput,
+            'latency': latency,
+            'memory': self.measure_memory(),
+        }
+
+    # --- baseline ---
+
+    def compare(self, results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+        """
+        Latencies (mean, and p90 of enough samples) which are slower than the baseline by more than the tolerance
+        """
+        regressions = []
+        for name, summary in results['latency'].items():
+            stored = baseline.get('latency', {}).get(name)
+            if stored is None:
+                continue
+            for key in ('mean_us', 'p90_us'):
+                if key not in summary or key not in stored or summary[key] < MIN_COMPARED_US:
+                    continue
+                if key == 'p90_us' and min(summary['count'], stored['count']) < MIN_P90_SAMPLES:
+                    continue
+                ratio = summary[key] / stored[key] if stored[key] else float('inf')
+                if ratio > 1 + self.args.tolerance:
+                    regressions.append(f'{name} {key}: {stored[key]:.1f} -> {summary[key]:.1f} ({ratio:.2f}x)')
+        stored_memory = baseline.get('memory', {}).get('bytes_per_game')
+        if stored_memory:
+            ratio = results['memory']['bytes_per_game'] / stored_memory
+            if ratio > 1 + self.args.tolerance:
+                regressions.append(f'memory bytes_per_game: {stored_memory} -> '
+                                   f'{results["memory"]["bytes_per_game"]} ({ratio:.2f}x)')
+        return regressions
+
+    def print_results(self, results: Dict[str, Any]) -> None:
+        print('--- Performance ---')
+        print(f'Script: {self.script}')
+        print()
+        throughput = results['throughput']
+        print(f'{self.COLOR_RESULT}Throughput{self.COLOR_ENDC}')
+        print(f'{throughput["actions_per_s"]} actions/s, {throughput["games_per_s"]} games/s '
+              f'({throughput["games_finished"]}/{results["games"]} games finished)')
+        print()
+        print(f'{self.COLOR_RESULT}Latency [us]{self.COLOR_ENDC}')
+        print(f'{"":36}{"count":>8}{"mean":>10}{"p50":>10}{"p90":>10}{"p99":>10}{"max":>10}')
+        for name, summary in results['latency'].items():
+            values = ''.join(f'{summary.get(key, 0):>10.1f}' for key in
+                             ('mean_us', 'p50_us', 'p90_us', 'p99_us', 'max_us'))
+            print(f'{name:36}{summary["count"]:>8}{values}')
+        print()
+        print(f'{self.COLOR_RESULT}Memory{self.COLOR_ENDC}')
+        print(f'{results["memory"]["bytes_per_game"] / 1024:.1f} KiB per live game')
+        print()
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) < 3 or sys.argv[1] != 'python':
+        print("Error: Wrong number of arguments")
+        print("Use: python benchmark_performance.py python [dog.Dog] [--games N] [--output file] [--baseline file]")
+        sys.exit()
+
+    benchmark = PerformanceBenchmark(argv=sys.argv)
+    results = benchmark.run()
+    benchmark.print_results(results)
+
+    if benchmark.args.output:
+        with open(benchmark.args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+    if benchmark.args.baseline:
+        with open(benchmark.args.baseline, encoding='utf-8') as file:
+            regressions = benchmark.compare(results, json.load(file))
+        if regressions:
+            print(f'{benchmark.COLOR_FAIL}Regressions against {benchmark.args.baseline}{benchmark.COLOR_ENDC}')
+            for regression in regressions:
+                print(regression)
+            sys.exit(1)
+        print(f'{benchmark.COLOR_OKAY}No regressions against {benchmark.args.baseline}{benchmark.COLOR_ENDC}')
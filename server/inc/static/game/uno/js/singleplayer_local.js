@@ -32,8 +32,45 @@ Singleplayer.prototype.ws_onmessage = function(event) {
     		}*/
     		//this.apply_action(data['state']['selected_action']);
             break;
+        case 'batch':
+            this.animate_batch(data['list_turn'], data['state']);
+            break;
     }
 };
+Singleplayer.prototype.animate_batch = function(list_turn, state) {
+	// replay the bot turns on a copy of the current state, then show the final state
+	if(this.game.state==null || list_turn.length==0) {
+		this.game.set_state(state);
+		return;
+	}
+	var state_anim = JSON.parse(JSON.stringify(this.game.state));
+	state_anim.list_action = [];
+	for(var i=0; i<list_turn.length; i++) {
+		setTimeout(function(turn) {
+			this.apply_turn_locally(state_anim, turn);
+			this.game.set_state(JSON.parse(JSON.stringify(state_anim)));
+		}.bind(this, list_turn[i]), i*this.config.delay_millis);
+	}
+	setTimeout(this.game.set_state.bind(this.game, state), list_turn.length*this.config.delay_millis);
+};
+Singleplayer.prototype.apply_turn_locally = function(state, turn) {
+	var player = state.list_player[turn.idx_player];
+	var action = turn.action;
+	state.idx_player_active = turn.idx_player;
+	if(action==null) {
+		return;
+	}
+	if(action.card!=null) {
+		// the cards of the bots are face down
+		player.list_card.pop();
+		state.list_card_discard.push(action.card);
+		state.color = action.color;
+	} else {
+		for(var i=0; i<action.draw; i++) {
+			player.list_card.push({'color': null, 'number': null, 'symbol': 'back'});
+		}
+	}
+};
 Singleplayer.prototype.add_log = function(msg) {
     //console.log(msg);
 };
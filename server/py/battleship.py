@@ -5,10 +5,11 @@ This module provides classes for managing a two-player Battleship game.
 # mypy: disable-error-code="union-attr, arg-type, operator, misc"
 # pylint: disable=unknown-option-value,import-error,too-many-function-args,too-few-public-methods,redefined-outer-name,unused-argument,unused-import,redefined-outer-name,too-many-function-arg,too-many-branches,too-many-nested-blocks,invalid-name
 
-from typing import List, Optional, Set
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union, overload
 from enum import Enum
+from bisect import bisect_left
 import random
-from copy import deepcopy
+import numpy as np
 from pydantic import BaseModel, Field
 from server.py.game import Game, Player
 
@@ -19,6 +20,58 @@ EXIT_ACTION = 999   # Exit the Game
 GRID_ROWS = 'ABCDEFGHIJ'
 GRID_COLS = range(1, 11)
 
+# Bitboard layout: cell index = row * 10 + (col - 1), e.g. "A1" -> 0, "A2" -> 1, "B1" -> 10, "J10" -> 99
+CELL_NAMES: List[str] = [f"{row}{col}" for row in GRID_ROWS for col in GRID_COLS]
+CELL_INDEX: Dict[str, int] = {name: idx for idx, name in enumerate(CELL_NAMES)}
+FULL_GRID_MASK = (1 << len(CELL_NAMES)) - 1
+
+
+def location_to_mask(location: Optional[List[str]]) -> int:
+    """ Convert a list of coordinates like ["A1", "A2"] into a 100-bit mask """
+    mask = 0
+    for loc in location or []:
+        mask |= 1 << CELL_INDEX[loc]
+    return mask
+
+
+def mask_to_location(mask: int) -> List[str]:
+    """ Convert a 100-bit mask back into coordinates (in ascending cell order) """
+    location = []
+    while mask:
+        low_bit = mask & -mask
+        location.append(CELL_NAMES[low_bit.bit_length() - 1])
+        mask ^= low_bit
+    return location
+
+
+# Fleet to be placed during the setup phase, in placement order
+SHIP_CONFIG = [
+    ("Carrier", 5),
+    ("Battleship", 4),
+    ("Cruiser", 3),
+    ("Submarine", 3),
+    ("Destroyer", 2)
+]
+
+
+def build_placement_catalog() -> Dict[int, List[int]]:
+    """ Enumerate every horizontal and vertical ship placement on the grid as bitmask, per ship length """
+    catalog: Dict[int, List[int]] = {}
+    for length in sorted({length for _, length in SHIP_CONFIG}):
+        placements: List[int] = []
+        for row in range(len(GRID_ROWS)):
+            for col in range(len(GRID_COLS)):
+                if col + length <= len(GRID_COLS):  # Horizontal placement
+                    placements.append(sum(1 << (row * 10 + col + i) for i in range(length)))
+                if row + length <= len(GRID_ROWS):  # Vertical placement
+                    placements.append(sum(1 << ((row + i) * 10 + col) for i in range(length)))
+        catalog[length] = placements
+    return catalog
+
+
+PLACEMENT_CATALOG = build_placement_catalog()
+
+
 class ActionType(str, Enum):
     """
     Represents the possible action types in battleship.
@@ -51,6 +104,22 @@ class PlayerState(BaseModel):
     shots: List[str] = Field(default_factory=list)
     successful_shots: List[str] = Field(default_factory=list)
 
+def copy_player(player: PlayerState) -> PlayerState:
+    """ Copy a player record with its ships and shot lists (without validating it again) """
+    return PlayerState.model_construct(
+        name=player.name,
+        ships=[Ship.model_construct(name=ship.name, length=ship.length,
+                                    location=list(ship.location) if ship.location is not None else None)
+               for ship in player.ships],
+        shots=list(player.shots),
+        successful_shots=list(player.successful_shots),
+    )
+
+def get_player_content(player: PlayerState) -> Tuple[Tuple[Tuple[str, ...], ...], Tuple[str, ...], Tuple[str, ...]]:
+    """ Ship locations and shots of a player record, to detect changes made outside of the game """
+    return (tuple(tuple(ship.location or ()) for ship in player.ships),
+            tuple(player.shots), tuple(player.successful_shots))
+
 class GamePhase(str, Enum):
     """
     Represents the current phase in the game.
@@ -59,6 +128,106 @@ class GamePhase(str, Enum):
     RUNNING = 'running'        # while the game is running (shooting)
     FINISHED = 'finished'      # when the game is finished
 
+class PlayerBoard:
+    """
+    Bitboard index of a player's state: the own fleet (with one mask per ship),
+    the own shots and the own successful shots, each held as a 100-bit integer.
+    The index belongs to the PlayerState it was built from and is rebuilt
+    whenever that record is replaced or changed from outside the game, which is
+    detected by comparing the content of its lists (not just their lengths).
+    """
+    def __init__(self, player: PlayerState) -> None:
+        self.player = player
+        self.ship_masks: List[int] = [location_to_mask(ship.location) for ship in player.ships]
+        self.fleet = 0
+        for ship_mask in self.ship_masks:
+            self.fleet |= ship_mask
+        self.shots = location_to_mask(player.shots)
+        self.hits = location_to_mask(player.successful_shots)
+        # Single-bit masks of the cells not shot at yet, in ascending order. The tuple is
+        # replaced (never modified) on every shot, so action spaces can keep referencing it.
+        self.open_cells: Tuple[int, ...] = tuple(
+            1 << idx for idx in range(len(CELL_NAMES)) if not self.shots >> idx & 1)
+        self.content = get_player_content(player)
+
+    def is_in_sync(self, player: PlayerState) -> bool:
+        """ Check that the index still describes the given player record (also after in-place edits) """
+        return self.player is player and self.content == get_player_content(player)
+
+    def mark_synced(self) -> None:
+        """ Record the current content of the player record, after the game changed it along with the index """
+        self.content = get_player_content(self.player)
+
+    def add_ship(self, ship_mask: int) -> None:
+        """ Add a placed ship to the fleet """
+        self.ship_masks.append(ship_mask)
+        self.fleet |= ship_mask
+
+    def add_shot(self, shot_mask: int) -> None:
+        """ Record a shot and remove its cell from the open cells """
+        self.shots |= shot_mask
+        idx = bisect_left(self.open_cells, shot_mask)
+        if idx < len(self.open_cells) and self.open_cells[idx] == shot_mask:
+            self.open_cells = self.open_cells[:idx] + self.open_cells[idx + 1:]
+
+class ActionSpace(Sequence[BattleshipAction]):
+    """
+    Read-only list of legal actions, stored as bitmasks (one mask per action).
+    BattleshipAction models are only created for the entries that are accessed,
+    e.g. by sample() or when the list is iterated for the client.
+    """
+    def __init__(self, action_type: ActionType, ship_name: Optional[str], masks: Sequence[int],
+                 legal_mask: Optional[int] = None) -> None:
+        self.action_type = action_type
+        self.ship_name = ship_name
+        self.masks = masks
+        self.legal_mask = legal_mask  # union of all masks, for single-cell actions
+        self._mask_set: Optional[Set[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    @overload
+    def __getitem__(self, index: int) -> BattleshipAction: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[BattleshipAction]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[BattleshipAction, List[BattleshipAction]]:
+        if isinstance(index, slice):
+            return [self.to_action(mask) for mask in self.masks[index]]
+        return self.to_action(self.masks[index])
+
+    def __contains__(self, action: object) -> bool:
+        if not isinstance(action, BattleshipAction):
+            return False
+        if action.action_type != self.action_type or action.ship_name != self.ship_name:
+            return False
+        if not set(action.location) <= CELL_INDEX.keys():
+            return False
+        mask = location_to_mask(action.location)
+        if self.legal_mask is not None:
+            return mask.bit_count() == 1 and bool(mask & self.legal_mask)
+        if self._mask_set is None:
+            self._mask_set = set(self.masks)
+        return mask in self._mask_set
+
+    def index(self, value: object, start: int = 0, stop: Optional[int] = None) -> int:
+        """ Position of a legal action, found by its mask (no actions are materialized) """
+        if value not in self:
+            raise ValueError(f"{value} is not in the action space")
+        assert isinstance(value, BattleshipAction)
+        return self.masks.index(location_to_mask(value.location), start, len(self.masks) if stop is None else stop)
+
+    def sample(self) -> BattleshipAction:
+        """ Pick a legal action uniformly at random """
+        return self.to_action(random.choice(self.masks))
+
+    def to_action(self, mask: int) -> BattleshipAction:
+        """ Materialize the action for the given mask """
+        return BattleshipAction(action_type=self.action_type, ship_name=self.ship_name,
+                                location=mask_to_location(mask))
+
 class BattleshipGameState(BaseModel):
     """
     Represents the current state of the game.
@@ -83,6 +252,16 @@ class Battleship(Game):
                 PlayerState(name="Player 2"),
             ],
         )
+        self._boards: List[PlayerBoard] = [PlayerBoard(player) for player in self.state.players]
+
+    def _board(self, idx_player: int) -> PlayerBoard:
+        """ Get the bitboard index of a player, rebuilding it if the state was changed from outside """
+        player = self.state.players[idx_player]
+        board = self._boards[idx_player]
+        if not board.is_in_sync(player):
+            board = PlayerBoard(player)
+            self._boards[idx_player] = board
+        return board
 
     def print_state(self) -> None:
         """ Print the current game state """
@@ -100,15 +279,16 @@ class Battleship(Game):
     def get_state(self) -> BattleshipGameState:
         """ Get the complete, unmasked game state. Returns a copy of current game state to
         ensure no external modifications affect the internal game state afterwards."""
-        return deepcopy(self.state)
+        return self.state.model_copy(update={"players": [copy_player(player) for player in self.state.players]})
 
     def set_state(self, state: BattleshipGameState) -> None:
         """Set the game state with defensive copying to ensure encapsulation."""
         if not isinstance(state, BattleshipGameState):
             raise ValueError("Invalid state type.")
         self.state = state.copy()
+        self._boards = [PlayerBoard(player) for player in self.state.players]
 
-    def get_list_action(self) -> List[BattleshipAction]:
+    def get_list_action(self) -> Sequence[BattleshipAction]:
         """ Get a list of possible actions for the active player """
         actions: List[BattleshipAction] = []
         if not self.state:
@@ -117,58 +297,17 @@ class Battleship(Game):
         current_player = self.state.players[self.state.idx_player_active]
 
         if self.state.phase == GamePhase.SETUP:
-            # Define available ships
-            ships_config = [
-                ("Carrier", 5),
-                ("Battleship", 4),
-                ("Cruiser", 3),
-                ("Submarine", 3),
-                ("Destroyer", 2)
-            ]
-
-            if len(current_player.ships) < len(ships_config):
-                ship_name, length = ships_config[len(current_player.ships)]
-                # Get existing ship locations for validation
-                existing_locations = set(
-                    loc
-                    for ship in current_player.ships
-                    for loc in ship.location
-                )
-
-                # Simplified ship placement - both horizontal and vertical
-                for row in GRID_ROWS:
-                    for col in range(1, 11 - length + 1):
-                        # Horizontal placement
-                        horizontal_location = [f"{row}{col + i}" for i in range(length)]
-                        if set(horizontal_location).isdisjoint(existing_locations):
-                            actions.append(BattleshipAction(
-                                action_type=ActionType.SET_SHIP,
-                                ship_name=ship_name,
-                                location=horizontal_location
-                            ))
-
-                        # Vertical placement
-                        if ord(row) + length - 1 <= ord('J'):
-                            vertical_location = [f"{chr(ord(row) + i)}{col}" for i in range(length)]
-                            if set(vertical_location).isdisjoint(existing_locations):
-                                actions.append(BattleshipAction(
-                                    action_type=ActionType.SET_SHIP,
-                                    ship_name=ship_name,
-                                    location=vertical_location
-                                ))
+            if len(current_player.ships) < len(SHIP_CONFIG):
+                ship_name, length = SHIP_CONFIG[len(current_player.ships)]
+                # Keep the placements that do not overlap with existing ships
+                existing_locations = self._board(self.state.idx_player_active).fleet
+                return ActionSpace(ActionType.SET_SHIP, ship_name, [
+                    mask for mask in PLACEMENT_CATALOG[length] if not mask & existing_locations])
 
         elif self.state.phase == GamePhase.RUNNING:
-            # Generate all possible shots excluding already taken shots
-            taken_shots = set(current_player.shots)
-            for row in GRID_ROWS:
-                for col in GRID_COLS:
-                    location = f"{row}{col}"
-                    if location not in taken_shots:  # Exclude already shot locations
-                        actions.append(BattleshipAction(
-                            action_type=ActionType.SHOOT,
-                            ship_name=None,
-                            location=[location]
-                        ))
+            # All possible shots excluding already taken shots
+            board = self._board(self.state.idx_player_active)
+            return ActionSpace(ActionType.SHOOT, None, board.open_cells, legal_mask=FULL_GRID_MASK & ~board.shots)
 
         return actions
 
@@ -179,22 +318,21 @@ class Battleship(Game):
 
         current_player = self.state.players[self.state.idx_player_active]
         opponent = self.state.players[1 - self.state.idx_player_active]
+        current_board = self._board(self.state.idx_player_active)
+        opponent_board = self._board(1 - self.state.idx_player_active)
 
         if self.state.phase == GamePhase.SETUP:
             if action.action_type == ActionType.SET_SHIP:
                 # Validate that the new ship's location does not overlap with existing ships
-                existing_locations = set(
-                    loc
-                    for ship in current_player.ships
-                    for loc in ship.location
-                )
-                new_ship_locations = set(action.location)
-                if not new_ship_locations.isdisjoint(existing_locations):
+                ship_mask = location_to_mask(action.location)
+                if ship_mask & current_board.fleet:
                     raise ValueError("Ships cannot overlap.")
 
                 # Add ship to the current player's fleet
                 ship = Ship(name=action.ship_name, length=len(action.location), location=action.location)
                 current_player.ships.append(ship)
+                current_board.add_ship(ship_mask)
+                current_board.mark_synced()
 
                 # Check if all ships are placed for all players
                 if all(len(player.ships) == MAX_SHIP_COUNT for player in self.state.players):
@@ -206,22 +344,23 @@ class Battleship(Game):
         elif self.state.phase == GamePhase.RUNNING:
             if action.action_type == ActionType.SHOOT:
                 shot_location = action.location[0]
+                shot_mask = 1 << CELL_INDEX[shot_location]
                 current_player.shots.append(shot_location)  # Record the shot
+                current_board.add_shot(shot_mask)
 
                 # Check if shot hit any opponent ships
-                for ship in opponent.ships:
-                    if shot_location in ship.location:
-                        current_player.successful_shots.append(shot_location)  # Record successful shot
-                        if all(loc in current_player.successful_shots for loc in ship.location):
+                if shot_mask & opponent_board.fleet:
+                    current_player.successful_shots.append(shot_location)  # Record successful shot
+                    current_board.hits |= shot_mask
+                    for ship, ship_mask in zip(opponent.ships, opponent_board.ship_masks):
+                        if ship_mask & shot_mask and not ship_mask & ~current_board.hits:
                             print(f"{ship.name} has been sunk!")
 
-                        # Check win condition
-                        if all(
-                            all(loc in current_player.successful_shots for loc in ship.location)
-                            for ship in opponent.ships):
-                            self.state.phase = GamePhase.FINISHED
-                            self.state.winner = self.state.idx_player_active
-                        break
+                    # Check win condition
+                    if not opponent_board.fleet & ~current_board.hits:
+                        self.state.phase = GamePhase.FINISHED
+                        self.state.winner = self.state.idx_player_active
+                current_board.mark_synced()
 
                 # Always switch turns unless game is finished
                 if self.state.phase != GamePhase.FINISHED:
@@ -239,21 +378,20 @@ class Battleship(Game):
         # Opponent's view
         opponent_player = self.state.players[1 - idx_player]
 
-        # Create masked opponent player state
+        # Create masked opponent player state, ships sunk by the current player are revealed
+        current_hits = self._board(idx_player).hits
+        opponent_ship_masks = self._board(1 - idx_player).ship_masks
         masked_opponent = PlayerState(
             name=opponent_player.name,
-            ships=[Ship(ship.name, ship.length, None) for ship in opponent_player.ships],  # Hide ship locations
+            ships=[Ship(name=ship.name, length=ship.length,
+                        location=ship.location if ship.location and not ship_mask & ~current_hits else None)
+                   for ship, ship_mask in zip(opponent_player.ships, opponent_ship_masks)],  # Hide ship locations
             shots=opponent_player.shots,  # Opponent's shots are visible
             successful_shots=opponent_player.successful_shots  # Opponent's successful hits are visible
         )
 
         # Create full view of current player's state
-        visible_current_player = PlayerState(
-            name=current_player.name,
-            ships=current_player.ships,  # All ships are visible
-            shots=current_player.shots,
-            successful_shots=current_player.successful_shots
-        )
+        visible_current_player = copy_player(current_player)
 
         # Construct and return the masked game state
         return BattleshipGameState(
@@ -272,11 +410,119 @@ class RandomPlayer(Player):
 
     def select_action(self,
         state: BattleshipGameState,
-        actions: List[BattleshipAction]) -> Optional[BattleshipAction]:
+        actions: Sequence[BattleshipAction]) -> Optional[BattleshipAction]:
+        """ Given masked game state and possible actions, select the next action """
+        if len(actions) == 0:
+            return None
+        if isinstance(actions, ActionSpace):
+            return actions.sample()
+        return random.choice(actions)
+
+class DensityTracker:
+    """
+    Shot bookkeeping of one seat for the HuntTargetPlayer. Per remaining ship length it keeps
+    which horizontal and vertical placements are still possible; every new miss or sunk ship
+    only clears the placements covering its cells.
+    """
+    def __init__(self) -> None:
+        self.shots: List[str] = []
+        self.sunk: Set[str] = set()
+        self.open = np.ones((10, 10), dtype=bool)      # cells not shot at yet
+        self.hits = np.zeros((10, 10), dtype=bool)     # hits on ships that are not sunk yet
+        self.valid: Dict[int, Tuple[np.ndarray, np.ndarray]] = {
+            length: (np.ones((10, 11 - length), dtype=bool), np.ones((11 - length, 10), dtype=bool))
+            for length in PLACEMENT_CATALOG}
+
+    def is_continuation(self, shots: List[str]) -> bool:
+        """ Check that the given shots extend the ones already processed (same game) """
+        return len(shots) >= len(self.shots) and (not self.shots or shots[len(self.shots) - 1] == self.shots[-1])
+
+    def block(self, row: int, col: int) -> None:
+        """ Remove all placements covering a cell that cannot hold an unsunk ship """
+        self.hits[row, col] = False
+        for length, (horizontal, vertical) in self.valid.items():
+            horizontal[row, max(0, col - length + 1):col + 1] = False
+            vertical[max(0, row - length + 1):row + 1, col] = False
+
+    def update(self, shots: List[str], hits: Set[str], sunk: Set[str]) -> None:
+        """ Process the shots and newly sunk ship cells since the last update """
+        for location in shots[len(self.shots):]:
+            row, col = divmod(CELL_INDEX[location], 10)
+            self.open[row, col] = False
+            if location in hits:
+                self.hits[row, col] = True
+            else:
+                self.block(row, col)
+        for location in sunk - self.sunk:
+            self.block(*divmod(CELL_INDEX[location], 10))
+        self.shots = list(shots)
+        self.sunk = set(sunk)
+
+    def density(self, lengths: List[int], hit_bonus: float) -> np.ndarray:
+        """ Count the possible placements of the remaining ships per cell, weighting placements through hits """
+        hits = self.hits.astype(np.int32)
+        cum_rows = np.pad(np.cumsum(hits, axis=1), ((0, 0), (1, 0)))
+        cum_cols = np.pad(np.cumsum(hits, axis=0), ((1, 0), (0, 0)))
+        density = np.zeros((10, 10))
+        for length in lengths:
+            horizontal, vertical = self.valid[length]
+            weight_h = horizontal * (1 + hit_bonus * (cum_rows[:, length:] - cum_rows[:, :-length]))
+            weight_v = vertical * (1 + hit_bonus * (cum_cols[length:, :] - cum_cols[:-length, :]))
+            for offset in range(length):
+                density[:, offset:offset + 11 - length] += weight_h
+                density[offset:offset + 11 - length, :] += weight_v
+        return density * self.open
+
+
+class HuntTargetPlayer(RandomPlayer):
+    """
+    Battleship player that shoots at the cell most ships could still occupy. The placement
+    probability density is computed from the remaining ship lengths, the misses and the
+    hits on ships that are not sunk yet (placements through such hits weigh much more).
+    Only information of the player's own masked view is used. Ships are placed randomly.
+    """
+
+    HIT_BONUS = 25.0
+
+    def __init__(self) -> None:
+        self.trackers: Dict[int, DensityTracker] = {}
+
+    def select_action(self,
+        state: BattleshipGameState,
+        actions: Sequence[BattleshipAction]) -> Optional[BattleshipAction]:
         """ Given masked game state and possible actions, select the next action """
-        if len(actions) > 0:
-            return random.choice(actions)
-        return None
+        if state.phase != GamePhase.RUNNING or len(actions) == 0:
+            return super().select_action(state, actions)
+
+        current_player = state.players[state.idx_player_active]
+        opponent = state.players[1 - state.idx_player_active]
+        hits = set(current_player.successful_shots)
+
+        # A ship counts as sunk once its location is known and completely hit
+        sunk: Set[str] = set()
+        lengths: List[int] = []
+        for ship in opponent.ships:
+            if ship.location and all(loc in hits for loc in ship.location):
+                sunk.update(ship.location)
+            else:
+                lengths.append(ship.length)
+        if not opponent.ships:
+            lengths = [length for _, length in SHIP_CONFIG]
+
+        tracker = self.trackers.get(state.idx_player_active)
+        if tracker is None or not tracker.is_continuation(current_player.shots):
+            tracker = DensityTracker()
+            self.trackers[state.idx_player_active] = tracker
+        tracker.update(current_player.shots, hits, sunk)
+
+        density = tracker.density(lengths, self.HIT_BONUS)
+        if density.max() > 0:
+            best_cells = np.flatnonzero(density == density.max())
+            action = BattleshipAction(action_type=ActionType.SHOOT, ship_name=None,
+                                      location=[CELL_NAMES[int(random.choice(best_cells))]])
+            if action in actions:
+                return action
+        return super().select_action(state, actions)
 
 if __name__ == "__main__":
 
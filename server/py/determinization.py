@@ -0,0 +1,120 @@
+"""
+Sampler of the hidden cards of a card game, as seen by one player (information-set determinization).
+
+The deck is held as counts per distinct card (a card key), the cards the player has seen (e.g. the own hand and
+the discard pile) are subtracted group by group. Piles which only grow at the end are synced in O(new cards),
+other groups (hands) in O(group size), so the unseen multiset follows the game without rebuilding the deck.
+Hidden hands are dealt from the unseen cards, one deal at a time or many deals at once with NumPy.
+"""
+
+import random
+from typing import Callable, Dict, Generic, Hashable, List, Optional, Sequence, Tuple, TypeVar
+import numpy as np
+
+CardT = TypeVar('CardT')
+
+
+class HiddenCardSampler(Generic[CardT]):
+    """ Unseen cards of a deck (counts per card key) and deals of hidden hands from them """
+
+    def __init__(self, deck: Sequence[CardT], key: Callable[[CardT], Hashable]) -> None:
+        self.key = key
+        self.index: Dict[Hashable, int] = {}
+        self.cards: List[CardT] = []            # one card per index
+        counts: List[int] = []
+        for card in deck:
+            card_key = key(card)
+            idx = self.index.get(card_key)
+            if idx is None:
+                idx = self.index[card_key] = len(self.cards)
+                self.cards.append(card)
+                counts.append(0)
+            counts[idx] += 1
+        self.cnt_deck = np.array(counts, dtype=np.int64)
+        self.cnt_seen = np.zeros(len(self.cards), dtype=np.int64)
+        self._groups: Dict[str, Tuple[int, List[int]]] = {}   # name: number of cards, indices of the seen cards
+        self._last_keys: Dict[str, Optional[Hashable]] = {}
+        self._pool: Optional[List[int]] = None
+
+    def _see(self, indices: Sequence[int], cnt: int) -> None:
+        for idx in indices:
+            self.cnt_seen[idx] += cnt
+        if indices:
+            self._pool = None
+
+    def _indices(self, cards: Sequence[CardT]) -> List[int]:
+        """ Indices of the cards, cards which are not in the deck (e.g. face-down cards) are left out """
+        indices = (self.index.get(self.key(card)) for card in cards)
+        return [idx for idx in indices if idx is not None]
+
+    def sync(self, name: str, cards: Sequence[CardT], append_only: bool = False) -> None:
+        """
+        Set the seen cards of a group (e.g. 'hand' or 'discard') to the given cards. With append_only, a group
+        which has grown since the last sync (its last seen card is still in place) only adds the new cards.
+        """
+        cnt_card, seen = self._groups.get(name, (0, []))
+        if append_only and cnt_card <= len(cards) and \
+                (cnt_card == 0 or self.key(cards[cnt_card - 1]) == self._last_keys.get(name)):
+            added = self._indices(cards[cnt_card:])
+            seen.extend(added)
+            self._see(added, 1)
+        else:
+            self._see(seen, -1)
+            seen = self._indices(cards)
+            self._see(seen, 1)
+        self._groups[name] = (len(cards), seen)
+        self._last_keys[name] = self.key(cards[-1]) if cards else None
+
+    def reset(self) -> None:
+        """ Forget all seen cards """
+        self.cnt_seen[:] = 0
+        self._groups.clear()
+        self._last_keys.clear()
+        self._pool = None
+
+    def get_unseen_counts(self) -> np.ndarray:
+        """ Number of unseen cards per index (never negative) """
+        counts: np.ndarray = np.maximum(self.cnt_deck - self.cnt_seen, 0)
+        return counts
+
+    def get_pool(self) -> List[int]:
+        """ Indices of all unseen cards, one per card (cached until the seen cards change) """
+        if self._pool is None:
+            self._pool = np.repeat(np.arange(len(self.cards)), self.get_unseen_counts()).tolist()
+        return self._pool
+
+    def get_unseen(self) -> List[CardT]:
+        """ All unseen cards """
+        return [self.cards[idx] for idx in self.get_pool()]
+
+    def deal(self, sizes: Sequence[int], rng: random.Random) -> List[List[CardT]]:
+        """
+        Deal hands of the given sizes from the unseen cards. If the sizes add up to less than the unseen
+        cards, the remaining cards are returned as an additional last list (e.g. a hidden draw pile).
+        """
+        pool = self.get_pool()
+        total = sum(sizes)
+        if total > len(pool):
+            raise ValueError(f"Can't deal {total} cards from {len(pool)} unseen cards.")
+        with_rest = total < len(pool)
+        drawn = rng.sample(pool, len(pool) if with_rest else total)
+        hands = []
+        start = 0
+        for size in sizes:
+            hands.append([self.cards[idx] for idx in drawn[start:start + size]])
+            start += size
+        if with_rest:
+            hands.append([self.cards[idx] for idx in drawn[total:]])
+        return hands
+
+    def deal_many(self, cnt: int, total: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Card indices of cnt independent deals of total cards each, shape (cnt, total). The hands are
+        consecutive column ranges; total may be the number of unseen cards to shuffle them completely.
+        """
+        pool = np.array(self.get_pool(), dtype=np.int64)
+        if total > len(pool):
+            raise ValueError(f"Can't deal {total} cards from {len(pool)} unseen cards.")
+        order = np.argsort(rng.random((cnt, len(pool))), axis=1)[:, :total]
+        dealt: np.ndarray = pool[order]
+        return dealt
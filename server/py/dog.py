@@ -5,12 +5,13 @@ This module contains the core game logic and data structures for the Dog card ga
 
 # runcmd: cd ../.. & venv\Scripts\python server/py/dog_template.py
 import random
-import copy
 from itertools import chain
 from typing import List, Optional, Dict, Any, Set
 from server.py.game import Game
-from server.py.dog_game_state import Card, Marble, PlayerState, Action, GameState, GamePhase
+from server.py.dog_game_state import (Card, Marble, PlayerState, Action, GameState, GamePhase, ActionKey,
+                                     action_key, CARD_HIDDEN)
 from server.py.dog_player import RandomPlayer
+from server.py.dog_threat import ThreatMap
 
 class Dog(Game):
     """
@@ -63,10 +64,19 @@ class Dog(Game):
     3: 1   # Player 3 helps Player 1
 }
 
-    def __init__(self) -> None:
-        """ Game initialization (set_state call not necessary, we expect 4 players) """
+    # generator of the shuffles: the global one, or a game's own one if it is started with a seed
+    rng: Any = random
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        """
+        Game initialization (set_state call not necessary, we expect 4 players). With a seed, the game shuffles
+        with its own generator, so it is reproduced by its seed and actions (e.g. for replays).
+        """
+        if seed is not None:
+            self.rng = random.Random(seed)
         self.state: Optional[GameState] = None
         self.state_backup: Optional[GameState] = None
+        self.threat_map: Optional[ThreatMap] = None
         self.initialize_game()  # Ensure the game state is initialized
 
     def initialize_game(self) -> None:
@@ -89,9 +99,9 @@ class Dog(Game):
 
         #prepare deck
         deck = GameState.LIST_CARD.copy()
-        random.shuffle(deck)
+        self.rng.shuffle(deck)
 
-        idx_player_started = random.randint(0, 3)
+        idx_player_started = self.rng.randint(0, 3)
 
         self.state = GameState(
                         cnt_player=4,
@@ -131,9 +141,52 @@ class Dog(Game):
     def create_state_backup(self) -> GameState:
         """ Saves after turning player the current state to fall back """
         assert  self.state
-        self.state_backup = copy.deepcopy(self.state)
+        self.state_backup = self.copy_state(self.state)
         return self.state_backup
 
+    @staticmethod
+    def copy_state(state: GameState) -> GameState:
+        """
+        Copy a state for backups and simulations without deepcopy: the lists, players and marbles are copied,
+        the cards are shared (cards are never changed, only moved between lists).
+        """
+        return state.model_copy(update={
+            'list_player': [
+                player.model_copy(update={
+                    'list_card': list(player.list_card),
+                    'list_marble': [marble.model_copy() for marble in player.list_marble],
+                })
+                for player in state.list_player
+            ],
+            'list_card_draw': list(state.list_card_draw),
+            'list_card_discard': list(state.list_card_discard),
+            'board_positions': list(state.board_positions),
+        })
+
+    @classmethod
+    def from_state(cls, state: GameState) -> 'Dog':
+        """ Game on a copy of the given state without dealing a new game (e.g. for simulations) """
+        game = cls.__new__(cls)
+        game.state = cls.copy_state(state)
+        game.state_backup = cls.copy_state(state)
+        game.threat_map = None
+        return game
+
+    def clone(self) -> 'Dog':
+        """ Independent copy of the game (e.g. for rollouts) """
+        assert self.state
+        game = self.from_state(self.state)
+        game.state_backup = self.state_backup
+        return game
+
+    def get_threat_map(self) -> ThreatMap:
+        """ Fields reachable by each player next turn, brought up to date with the marbles that moved """
+        assert self.state
+        if self.threat_map is None:
+            self.threat_map = ThreatMap(self)
+        self.threat_map.update(self.state)
+        return self.threat_map
+
     def print_state(self) -> None:
         """ Print the current game state """
         assert self.state
@@ -185,7 +238,8 @@ class Dog(Game):
         # Default to [0] for invalid cards
         return [0]
 
-    def _calculate_new_position(self, marble: Marble, move_value: int, player_idx: int) -> Optional[int]:
+    def _calculate_new_position(self, marble: Marble, move_value: int, player_idx: int,
+                                all_marbles: Optional[List[Dict[str, Any]]] = None) -> Optional[int]:
         """
         Calculate the new position of a marble, considering:
         - Safe space entry rules for each player
@@ -200,8 +254,9 @@ class Dog(Game):
         start_positions: Dict[int, int] = self.START_POSITIONS
         safe_spaces: Dict[int, List[int]] = self.SAFE_SPACES
         kennel_positions: Dict[int, List[int]] = self.KENNEL_POSITIONS
-        # Create a list of all marbles for checking occupancy
-        all_marbles: List[Dict[str, Any]] = self._get_all_marbles()
+        # Create a list of all marbles for checking occupancy (unless given by the caller for a series of moves)
+        if all_marbles is None:
+            all_marbles = self._get_all_marbles()
         # Define helper functions
         def is_blocked_start_position(pos: int) -> bool:
             # A start position is blocked if there's a marble with is_save=True on it
@@ -480,12 +535,14 @@ class Dog(Game):
         return grouped_actions_list
 
     def _exchange_jkr(self) -> List[Action]:
+        """
+        Generate the actions exchanging the JKR for another card (rank and suit) which could be played.
+        Whether a card could be played only depends on its rank, so each rank is checked once.
+        """
         actions_list_jkr: List['Action'] = []
-        #all ranks and sueit we can exchange for the jkr
+        #all ranks and suits we can exchange for the jkr
         suits = GameState.LIST_SUIT
-        ranks = GameState.LIST_RANK
-        if 'JKR' in ranks:
-            ranks.remove('JKR')
+        ranks = [rank for rank in GameState.LIST_RANK if rank != 'JKR']
 
         jkr_card = Card(suit='', rank='JKR')
 
@@ -496,13 +553,15 @@ class Dog(Game):
         active_marbles:list[Marble] = active_player.list_marble  # marbels of current player
         all_marbles = self._get_all_marbles() #marbel information of all players
         active_marbles_positions = {m.pos for m in active_marbles} # Helper sets for quick lookups
-        kennels = self.KENNEL_POSITIONS
-        start_positions = self.START_POSITIONS
-        player_idx = self.state.idx_player_active
-        player_kennel = kennels[player_idx]
-        player_start_position = start_positions[player_idx]
-        marbles_in_kennel = [marble for marble in active_marbles if marble.pos in player_kennel]
-        num_in_kennel = len(marbles_in_kennel)
+        player_kennel = self.KENNEL_POSITIONS[active_player_idx]
+        player_start_position = self.START_POSITIONS[active_player_idx]
+        num_in_kennel = len([marble for marble in active_marbles if marble.pos in player_kennel])
+
+        # MARBLE SWAPPING like with `J`: an own marble and an opponent's marble (not on its save start) on the board
+        swap_possible = (
+            any(m["player_idx"] == active_player_idx and m["position"] <= 63 for m in all_marbles) and
+            any(m["player_idx"] != active_player_idx and m["position"] <= 63 and not m["is_save"]
+                for m in all_marbles))
 
         def can_do_starting_move(card_rank: str) -> bool:
             """
@@ -517,80 +576,24 @@ class Dog(Game):
 
             return card_rank in self.STARTING_CARDS
 
-        for rank in ranks:
-            for suit in suits:
-                card = Card(suit=suit, rank=rank)
-                card_values = self._get_card_value(card)  # Get the list of possible values for the card
-
-                # Check starting moves
-                if can_do_starting_move(card.rank):
-                    actions_list_jkr.append(
-                        Action(card=jkr_card,
-                            pos_from=None,
-                            pos_to=None,
-                            card_swap=card)
-                    )
-                # Handle `7` or 'JKR' as 7: split moves
-                if card.rank == '7':
-                    seven_actions = self._handle_seven_card(card, active_marbles)
-                    if len(seven_actions) > 0:
-                        actions_list_jkr.append(
-                            Action(card=jkr_card,
-                                pos_from=None,
-                                pos_to=None,
-                                card_swap=card)
-                        )
-                    else:
-                        # If no actions are possible with '7', skip processing moves for this card.
-                        continue
-
-                # Handle MARBLE SWAPPING with `J`: exchange with opponent's marble
-                for marble_a in all_marbles:
-                    if marble_a["position"] > 63:
-                        continue
-                    if (marble_a["player_idx"] != active_player_idx
-                            and marble_a["is_save"]):
-                        continue
-
-                    for marble_b in all_marbles:
-                        if marble_b is marble_a:
-                            continue
-                        if marble_b["position"] > 63:
-                            continue
-                        if (marble_b["player_idx"] != active_player_idx
-                                and marble_b["is_save"]):
-                            continue
-
-                        # Check that one of these marbles belongs to the active player and the other doesn't
-                        belongs_to_active_a = marble_a["player_idx"] == active_player_idx
-                        belongs_to_active_b = marble_b["player_idx"] == active_player_idx
-                        if belongs_to_active_a == belongs_to_active_b:
-                            # Either both belong to the active player or both don't,
-                            # in either case, no valid swap.
-                            continue
-
-                        # Add swap action
-                        actions_list_jkr.append(Action(
-                            card=jkr_card,
-                            pos_from=None,
-                            pos_to=None,
-                            card_swap=card
-                        ))
+        def can_do_normal_move(card: Card) -> bool:
+            """Check if any marble outside the kennel can move by one of the values of the card."""
+            return any(
+                self._calculate_new_position(marble, card_value, active_player_idx, all_marbles) is not None
+                for marble in active_marbles if marble.pos not in player_kennel
+                for card_value in self._get_card_value(card))
 
-                # all cases with normal cards
-                # Iterate over all possible values of the card and check if we can move this far!!
-                for marble in active_marbles:
-                    if marble.pos not in player_kennel:
-                        for card_value in card_values:
-                            new_pos: Optional[int] = self._calculate_new_position(marble,
-                                                                card_value, self.state.idx_player_active)
-                            if new_pos is not None:
-                                actions_list_jkr.append(Action(
-                                card=jkr_card,
-                                pos_from=None,
-                                pos_to=None,
-                                card_swap=card
-                                ))
+        for rank in ranks:
+            card = Card(suit=suits[0], rank=rank)
+            if rank == '7':
+                # Handle `7` as split moves
+                playable = len(self._handle_seven_card(card, active_marbles)) > 0
+            else:
+                playable = can_do_starting_move(rank) or swap_possible or can_do_normal_move(card)
+            if playable:
+                actions_list_jkr.extend(
+                    Action(card=jkr_card, pos_from=None, pos_to=None, card_swap=Card(suit=suit, rank=rank))
+                    for suit in suits)
 
         return actions_list_jkr
 
@@ -610,6 +613,23 @@ class Dog(Game):
         if self.state.card_active is not None:
             current_cards = [self.state.card_active]
 
+        # Generate actions for each card
+        for card in current_cards:
+            actions_list.extend(self._get_card_actions(card))
+
+        # remove duplicates, keeping the first occurrence
+        unique_actions: Dict[ActionKey, Action] = {}
+        for item in actions_list:
+            unique_actions.setdefault(action_key(item), item)
+
+        return list(unique_actions.values())
+
+    def _get_card_actions(self, card: Card) -> List[Action]:
+        """Generate the possible actions of the active player for a single card (may contain duplicates)."""
+        assert self.state
+        active_player = self.state.list_player[self.state.idx_player_active]
+        actions_list: List[Action] = []
+
         # After exchange phase, normal gameplay actions:
         all_marbles = self._get_all_marbles()
         player_idx = self.state.idx_player_active
@@ -620,107 +640,96 @@ class Dog(Game):
         marbles_in_kennel = [m for m in active_player.list_marble if m.pos in player_kennel]
         num_in_kennel = len(marbles_in_kennel)
 
-        # Generate actions for each card
-        for card in current_cards:
-            card_values = self._get_card_value(card)
-
-            # If there are marbles in the kennel, try starting moves (A, K, JKR)
-            if num_in_kennel > 0:
-                actions_list.extend(
-                    self._get_starting_actions(card, marbles_in_kennel, active_player, player_start_position))
-
-            # If card is '7' or 'JKR' (which can act like 7), handle the special "split move"
-            if card.rank == '7'and self.state.card_active is None:
-                seven_actions = self._handle_seven_card(card, active_player.list_marble)
-                if seven_actions:
-                    actions_list.append(Action(
-                        card=card,
-                        pos_from=None,
-                        pos_to=None,
-                        card_swap=None
-                        ))
-
-                continue
+        card_values = self._get_card_value(card)
 
-            if card.rank == '7'and self.state.card_active is not None:
-                actions_list.extend(self._handle_seven_card(card, active_player.list_marble))
-                continue
+        # If there are marbles in the kennel, try starting moves (A, K, JKR)
+        if num_in_kennel > 0:
+            actions_list.extend(
+                self._get_starting_actions(card, marbles_in_kennel, active_player, player_start_position))
 
-            if card.rank == 'JKR':
-                actions_list.extend(self._exchange_jkr())
-                # After handling special moves for 'j', continue to next card
-                continue
+        # If card is '7' or 'JKR' (which can act like 7), handle the special "split move"
+        if card.rank == '7'and self.state.card_active is None:
+            seven_actions = self._handle_seven_card(card, active_player.list_marble)
+            if seven_actions:
+                actions_list.append(Action(
+                    card=card,
+                    pos_from=None,
+                    pos_to=None,
+                    card_swap=None
+                    ))
 
-            if card.rank == 'J':
-                opponent_swap_actions = []
-                self_swap_actions = []
+            return actions_list
 
-                # Collect valid opponent swap actions (only unsafe marbles)
-                for marble in all_marbles:
-                    if marble["player_idx"] == self.state.idx_player_active or marble["position"] > 63:
-                        continue  # Skip own marbles and marbles in the kennel
+        if card.rank == '7'and self.state.card_active is not None:
+            actions_list.extend(self._handle_seven_card(card, active_player.list_marble))
+            return actions_list
 
-                    if marble["is_save"]:
-                        continue  # Skip safe opponent marbles
+        if card.rank == 'JKR':
+            actions_list.extend(self._exchange_jkr())
+            return actions_list
 
-                    # For each opponent marble, check for valid target marbles (belong to the active player)
-                    for target in all_marbles:
-                        if target["player_idx"] != self.state.idx_player_active or target["position"] > 63:
-                            continue  # Only consider active player's marbles on the board
+        if card.rank == 'J':
+            opponent_swap_actions = []
+            self_swap_actions = []
 
-                        if marble["player_idx"] == target["player_idx"]:
-                            continue  # Skip swaps with marbles of the same player
+            # Collect valid opponent swap actions (only unsafe marbles)
+            for marble in all_marbles:
+                if marble["player_idx"] == self.state.idx_player_active or marble["position"] > 63:
+                    continue  # Skip own marbles and marbles in the kennel
 
-                        # Add both directions for swaps: (marble <-> target) and (target <-> marble)
-                        opponent_swap_actions.append(Action(
-                            card=card,
-                            pos_from=marble["position"],
-                            pos_to=target["position"],
-                            card_swap=None
-                        ))
-                        opponent_swap_actions.append(Action(
-                            card=card,
-                            pos_from=target["position"],
-                            pos_to=marble["position"],
-                            card_swap=None
-                        ))
+                if marble["is_save"]:
+                    continue  # Skip safe opponent marbles
 
-                # Collect self-swap actions as a fallback (only if no opponent swaps were found)
-                if not opponent_swap_actions:
-                    for marble in all_marbles:
-                        if marble["player_idx"] != self.state.idx_player_active or marble["position"] > 63:
-                            continue  # Skip opponent marbles and marbles in the kennel
+                # For each opponent marble, check for valid target marbles (belong to the active player)
+                for target in all_marbles:
+                    if target["player_idx"] != self.state.idx_player_active or target["position"] > 63:
+                        continue  # Only consider active player's marbles on the board
 
-                        for target in all_marbles:
-                            if (target["player_idx"] != self.state.idx_player_active or
-                                marble is target or target["position"] > 63):
-                                continue  # Skip the same marble and marbles in the kennel
+                    if marble["player_idx"] == target["player_idx"]:
+                        continue  # Skip swaps with marbles of the same player
 
-                            # Add valid self-swap action
-                            self_swap_actions.append(Action(
-                                card=card,
-                                pos_from=marble["position"],
-                                pos_to=target["position"],
-                                card_swap=None
-                            ))
-
-                # Prioritize opponent swaps, fallback to self-swaps if none are available
-                actions_list.extend(opponent_swap_actions if opponent_swap_actions else self_swap_actions)
+                    # Add both directions for swaps: (marble <-> target) and (target <-> marble)
+                    opponent_swap_actions.append(Action(
+                        card=card,
+                        pos_from=marble["position"],
+                        pos_to=target["position"],
+                        card_swap=None
+                    ))
+                    opponent_swap_actions.append(Action(
+                        card=card,
+                        pos_from=target["position"],
+                        pos_to=marble["position"],
+                        card_swap=None
+                    ))
 
+            # Collect self-swap actions as a fallback (only if no opponent swaps were found)
+            if not opponent_swap_actions:
+                for marble in all_marbles:
+                    if marble["player_idx"] != self.state.idx_player_active or marble["position"] > 63:
+                        continue  # Skip opponent marbles and marbles in the kennel
 
+                    for target in all_marbles:
+                        if (target["player_idx"] != self.state.idx_player_active or
+                            marble is target or target["position"] > 63):
+                            continue  # Skip the same marble and marbles in the kennel
 
-                continue
+                        # Add valid self-swap action
+                        self_swap_actions.append(Action(
+                            card=card,
+                            pos_from=marble["position"],
+                            pos_to=target["position"],
+                            card_swap=None
+                        ))
 
-            # For marbles outside the kennel, handle swaps and normal moves
-            actions_list.extend(
-                self._get_normal_move_actions(card, card_values, active_player.list_marble, player_idx))
+            # Prioritize opponent swaps, fallback to self-swaps if none are available
+            actions_list.extend(opponent_swap_actions if opponent_swap_actions else self_swap_actions)
+            return actions_list
 
-        unique_action_list = []
-        for item in actions_list:
-            if item not in unique_action_list:
-                unique_action_list.append(item)
+        # For marbles outside the kennel, handle swaps and normal moves
+        actions_list.extend(
+            self._get_normal_move_actions(card, card_values, active_player.list_marble, player_idx))
 
-        return unique_action_list
+        return actions_list
 
     def _is_card_exchange_phase(self) -> bool:
         """Check if the card exchange phase is still ongoing."""
@@ -753,11 +762,12 @@ class Dog(Game):
                                 active_marbles: List, player_idx: int) -> List[Action]:
         """Handle normal moves based on the card values for marbles outside the kennel."""
         actions = []
+        all_marbles = self._get_all_marbles()
         for marble in active_marbles:
             if self._is_in_kennel(marble):
                 continue
             for card_value in card_values:
-                pos_to = self._calculate_new_position(marble, card_value, player_idx)
+                pos_to = self._calculate_new_position(marble, card_value, player_idx, all_marbles)
                 if pos_to is not None:
                     actions.append(
                         Action(
@@ -832,8 +842,8 @@ class Dog(Game):
         if action is None:
             print("No action provided. Advancing the active player.")
             if self.state.card_active is not None:
-                self.state = copy.deepcopy(self.state_backup)
-                assert self.state
+                assert self.state_backup
+                self.state = self.copy_state(self.state_backup)
                 self.state.card_active = None
                 self.state.remaining_steps = None
 
@@ -1254,7 +1264,7 @@ class Dog(Game):
         self.state.list_card_discard.clear()
 
         # Shuffle the draw pile to randomize
-        random.shuffle(self.state.list_card_draw)
+        self.rng.shuffle(self.state.list_card_draw)
         print(f"Debug: Reshuffle complete. Draw pile count: {len(self.state.list_card_draw)}.")
 
         # Validate total card count
@@ -1276,7 +1286,7 @@ class Dog(Game):
             # Re-initialize the deck with the original full set of cards
             # Assuming GameState.LIST_CARD contains the original full deck
             self.state.list_card_draw.extend(GameState.LIST_CARD)
-            random.shuffle(self.state.list_card_draw)
+            self.rng.shuffle(self.state.list_card_draw)
 
             # print("Deck has been reset to the original full set of cards.")
 
@@ -1294,7 +1304,7 @@ class Dog(Game):
             self.reshuffle_discard_into_draw()
 
         # Shuffle the draw pile
-        random.shuffle(self.state.list_card_draw)
+        self.rng.shuffle(self.state.list_card_draw)
 
         # Deal cards one by one to each player
         for _ in range(num_cards):
@@ -1352,7 +1362,8 @@ class Dog(Game):
 
 
     def get_player_view(self, idx_player: int) -> GameState:
-        """ Get the masked state for the active player (e.g. the oppontent's cards are face down)"""
+        """ Get the masked state for the active player (e.g. the oppontent's cards are face down,
+        the draw pile only shows its size and the number of cards in each hand is given)"""
         assert self.state
         masked_players = []
         for i, player in enumerate(self.state.list_player):
@@ -1369,10 +1380,11 @@ class Dog(Game):
             idx_player_started=self.state.idx_player_started,
             idx_player_active=self.state.idx_player_active,
             list_player=masked_players,
-            list_card_draw=self.state.list_card_draw,
+            list_card_draw=[CARD_HIDDEN] * len(self.state.list_card_draw),
             list_card_discard=self.state.list_card_discard,
             card_active=self.state.card_active,
-            board_positions=self.state.board_positions
+            board_positions=self.state.board_positions,
+            list_cnt_card=[len(player.list_card) for player in self.state.list_player]
         )
 
 
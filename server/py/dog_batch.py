@@ -0,0 +1,203 @@
+"""
+Batch engine advancing K independent Dog games in lockstep.
+
+The marbles of all games are held in NumPy arrays of shape (K, 4, 4) (game, player, marble), so the legality
+of the simple cards (2-6, 8-10, Q, K, A) is computed with array operations over all games and marbles at once.
+SEVEN, Jack and Joker, the card exchange and running SEVEN/JKR sequences fall back to the per-game logic of Dog.
+
+Limitation: step() still builds Action objects, lets the players select on full GameState objects and applies
+the actions with Dog.apply_action, one game at a time. Only the legality check is vectorized, so a batch is
+only about 10% faster than stepping the games one by one. Agents which work on action indices should use the
+arrays with dog_encoding.get_batch_legal_indices instead of get_list_action.
+"""
+
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from server.py.game import Player
+from server.py.dog import Dog
+from server.py.dog_game_state import Action, ActionKey, Card, GamePhase, GameState, action_key
+
+CNT_PLAYER = 4
+CNT_MARBLE = 4
+START_FIELDS = np.array([Dog.START_POSITIONS[idx] for idx in range(CNT_PLAYER)])
+KENNEL_FIELDS = np.array([Dog.KENNEL_POSITIONS[idx][0] for idx in range(CNT_PLAYER)])
+SAFE_FIELDS = np.array([Dog.SAFE_SPACES[idx][0] for idx in range(CNT_PLAYER)])
+
+# move values of the cards handled with array operations (as in Dog._get_card_value)
+SIMPLE_CARD_VALUES: Dict[str, List[int]] = {
+    '2': [2], '3': [3], '4': [-4, 4], '5': [5], '6': [6], '8': [8], '9': [9], '10': [10],
+    'Q': [12], 'K': [13], 'A': [1, 11],
+}
+
+def get_move_targets(positions: np.ndarray, is_save: np.ndarray, idx_player: np.ndarray,  # pylint: disable=too-many-locals
+                     move_value: int) -> np.ndarray:
+    """
+    Target fields of the marbles of the given players (one per game) moved by move_value, for all games at once.
+    positions and is_save have the shape (K, 4, 4), idx_player the shape (K,). The result has the shape (K, 4)
+    and holds -1 where the move is not possible. Follows the rules of Dog._calculate_new_position.
+    """
+    cnt_game = len(idx_player)
+    games = np.arange(cnt_game)
+    pos_all = positions.reshape(cnt_game, 1, CNT_PLAYER * CNT_MARBLE)
+    save_all = is_save.reshape(cnt_game, 1, CNT_PLAYER * CNT_MARBLE)
+    current = positions[games, idx_player].astype(np.int64)
+    save = is_save[games, idx_player]
+    tentative = (current + move_value) % Dog.MAIN_TRACK
+    forward = current <= tentative
+
+    def in_path(field: np.ndarray) -> np.ndarray:
+        passed: np.ndarray = np.where(forward, (field > current) & (field <= tentative),
+                                      (field > current) | (field <= tentative))
+        return passed
+
+    # start fields blocked by a marble which was moved out of its kennel and not yet moved
+    blocked_start = ((pos_all == START_FIELDS[None, :, None]) & save_all).any(axis=2)
+    over_blocked = np.zeros(current.shape, dtype=bool)
+    for idx, field in enumerate(START_FIELDS):
+        over_blocked |= in_path(field) & blocked_start[:, idx:idx + 1]
+
+    safe_first = SAFE_FIELDS[idx_player][:, None]
+    cells = np.arange(CNT_MARBLE)
+    occupied_safe = ((pos_all == (safe_first + cells)[:, :, None]).any(axis=2))[:, None, :]
+
+    # moves within the safe spaces must neither leave them nor jump over a marble
+    in_safe = (current >= safe_first) & (current < safe_first + CNT_MARBLE)
+    idx_from = current - safe_first
+    idx_to = idx_from + move_value
+    low, high = (idx_from + 1, idx_to) if move_value > 0 else (idx_to, idx_from - 1)
+    safe_blocked = (occupied_safe & (cells >= low[..., None]) & (cells <= high[..., None])).any(axis=2)
+    safe_ok = (idx_to >= 0) & (idx_to < CNT_MARBLE) & ~safe_blocked
+    target_safe = np.where(safe_ok, safe_first + idx_to, -1)
+
+    # moves passing the own start field enter the safe spaces
+    start = START_FIELDS[idx_player][:, None]
+    entering = ~save & in_path(start + 1)
+    steps_in = move_value - (start - current) % Dog.MAIN_TRACK
+    entry_blocked = (occupied_safe & (cells < steps_in[..., None])).any(axis=2)
+    entry_ok = (steps_in >= 1) & (steps_in <= CNT_MARBLE) & ~entry_blocked
+    target_entry = np.where(entry_ok, safe_first + steps_in - 1, -1)
+
+    target = np.where(in_safe, target_safe, np.where(entering, target_entry, tentative))
+    kennel_first = KENNEL_FIELDS[idx_player][:, None]
+    in_kennel = (current >= kennel_first) & (current < kennel_first + CNT_MARBLE)
+    return np.where(in_kennel | over_blocked, -1, target)
+
+
+def get_start_moves(positions: np.ndarray, idx_player: np.ndarray) -> np.ndarray:
+    """
+    Kennel field of the marble a starting card (A, K, JKR) moves to the start field, for all games at once
+    (shape (K,), -1 if no marble can start). Follows the rules of Dog._get_starting_actions.
+    """
+    games = np.arange(len(idx_player))
+    current = positions[games, idx_player].astype(np.int64)
+    kennel_first = KENNEL_FIELDS[idx_player][:, None]
+    in_kennel = (current >= kennel_first) & (current < kennel_first + CNT_MARBLE)
+    start_free = ~(current == START_FIELDS[idx_player][:, None]).any(axis=1)
+    first_in_kennel = current[games, np.argmax(in_kennel, axis=1)]
+    return np.where(in_kennel.any(axis=1) & start_free, first_in_kennel, -1)
+
+
+class DogBatch:
+    """
+    K independent Dog games, advanced in lockstep with one action per running game and step.
+    The Dog objects stay the authority of the game states; positions and is_save mirror their marbles.
+    """
+
+    def __init__(self, cnt_game: int = 0, states: Optional[Sequence[GameState]] = None) -> None:
+        self.games: List[Dog] = [Dog() for _ in range(cnt_game)]
+        for state in states or []:
+            game = Dog()
+            game.set_state(state)
+            self.games.append(game)
+        self.positions = np.zeros((len(self.games), CNT_PLAYER, CNT_MARBLE), dtype=np.int16)
+        self.is_save = np.zeros((len(self.games), CNT_PLAYER, CNT_MARBLE), dtype=bool)
+        self.idx_player_active = np.zeros(len(self.games), dtype=np.int64)
+        self._targets: Dict[int, np.ndarray] = {}
+        self._start_from: Optional[np.ndarray] = None
+        for idx_game in range(len(self.games)):
+            self._sync(idx_game)
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+    def _sync(self, idx_game: int) -> None:
+        """ Copy the marbles and the active player of a game into the arrays """
+        state = self.games[idx_game].get_state()
+        for idx_player, player in enumerate(state.list_player):
+            for idx_marble, marble in enumerate(player.list_marble):
+                self.positions[idx_game, idx_player, idx_marble] = marble.pos
+                self.is_save[idx_game, idx_player, idx_marble] = marble.is_save
+        self.idx_player_active[idx_game] = state.idx_player_active
+        self._targets.clear()
+        self._start_from = None
+
+    def get_targets(self, move_value: int) -> np.ndarray:
+        """ Target fields of the active players' marbles for a move value in all games (cached until a change) """
+        targets = self._targets.get(move_value)
+        if targets is None:
+            targets = get_move_targets(self.positions, self.is_save, self.idx_player_active, move_value)
+            self._targets[move_value] = targets
+        return targets
+
+    def get_start_from(self) -> np.ndarray:
+        """ Kennel field of the marble to start in all games (-1 if none), cached until a change """
+        if self._start_from is None:
+            self._start_from = get_start_moves(self.positions, self.idx_player_active)
+        return self._start_from
+
+    def _get_simple_card_actions(self, idx_game: int, card: Card) -> List[Action]:
+        """ Actions for a simple card, read from the arrays (same order as Dog._get_card_actions) """
+        actions: List[Action] = []
+        idx_player = int(self.idx_player_active[idx_game])
+        if card.rank in Dog.STARTING_CARDS:
+            pos_from = int(self.get_start_from()[idx_game])
+            if pos_from >= 0:
+                actions.append(Action(card=card, pos_from=pos_from, pos_to=int(START_FIELDS[idx_player]),
+                                      card_swap=None))
+        values = SIMPLE_CARD_VALUES[card.rank]
+        targets = [self.get_targets(value)[idx_game] for value in values]
+        for idx_marble in range(CNT_MARBLE):
+            for target in targets:
+                if target[idx_marble] >= 0:
+                    actions.append(Action(card=card, pos_from=int(self.positions[idx_game, idx_player, idx_marble]),
+                                          pos_to=int(target[idx_marble]), card_swap=None))
+        return actions
+
+    def get_list_action(self, idx_game: int) -> List[Action]:
+        """ Possible actions of the active player in a game (equal to Dog.get_list_action) """
+        game = self.games[idx_game]
+        state = game.get_state()
+        if state.phase == GamePhase.FINISHED:
+            return []
+        if not state.bool_card_exchanged or state.card_active is not None:
+            return game.get_list_action()
+
+        unique: Dict[ActionKey, Action] = {}
+        for card in state.list_player[state.idx_player_active].list_card:
+            if card.rank in SIMPLE_CARD_VALUES:
+                actions = self._get_simple_card_actions(idx_game, card)
+            else:
+                actions = game._get_card_actions(card)  # pylint: disable=protected-access
+            for action in actions:
+                unique.setdefault(action_key(action), action)
+        return list(unique.values())
+
+    def get_list_actions(self) -> List[List[Action]]:
+        """ Possible actions of the active players in all games """
+        return [self.get_list_action(idx_game) for idx_game in range(len(self.games))]
+
+    def step(self, players: Sequence[Player]) -> int:
+        """
+        Let the active player (players[idx_player]) of every running game select and apply one action.
+        All actions are selected on the states before any of them is applied. Returns the number of running games.
+        """
+        running = [idx for idx, game in enumerate(self.games) if game.get_state().phase != GamePhase.FINISHED]
+        selected = []
+        for idx_game in running:
+            state = self.games[idx_game].get_state()
+            list_action = self.get_list_action(idx_game)
+            selected.append(players[state.idx_player_active].select_action(state, list_action))
+        for idx_game, action in zip(running, selected):
+            self.games[idx_game].apply_action(action)
+            self._sync(idx_game)
+        return len(running)
@@ -0,0 +1,145 @@
+"""
+Fixed-size encodings of Dog actions and states for reinforcement-learning agents.
+
+Every action has a stable integer index:
+- moves:     card rank x from field x to field (96 fields plus "none", e.g. for the start of a SEVEN)
+- JKR swaps: the card the Joker is exchanged for (rank x suit)
+- exchange:  the rank of the card given to the partner at the start of a round
+Legal actions are given as a boolean mask over all indices, states as a dense observation vector.
+"""
+
+from typing import List, Optional, Sequence
+import numpy as np
+from server.py.dog import Dog
+from server.py.dog_batch import DogBatch, SIMPLE_CARD_VALUES, START_FIELDS, CNT_MARBLE
+from server.py.dog_game_state import Action, Card, GamePhase, GameState
+
+# fixed copies of the ranks and suits: the index layout must not follow changes to GameState's lists (e.g. by tests)
+RANKS = ('2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A', 'JKR')
+SUITS = ('♠', '♥', '♦', '♣')
+RANK_INDEX = {rank: idx for idx, rank in enumerate(RANKS)}
+SUIT_INDEX = {suit: idx for idx, suit in enumerate(SUITS)}
+
+CNT_FIELD = Dog.BOARD_SIZE
+FIELD_NONE = CNT_FIELD                      # field index of pos_from/pos_to None
+CNT_FIELD_SLOT = CNT_FIELD + 1
+CNT_MOVE = len(RANKS) * CNT_FIELD_SLOT * CNT_FIELD_SLOT
+OFFSET_SWAP = CNT_MOVE                      # JKR exchanged for a card of rank x suit (all but JKR)
+CNT_SWAP = (len(RANKS) - 1) * len(SUITS)
+OFFSET_EXCHANGE = OFFSET_SWAP + CNT_SWAP    # card of a rank given to the partner
+ACTION_SPACE_SIZE = OFFSET_EXCHANGE + len(RANKS)
+
+# observation: marbles per player and field, marbles out of the kennel and not yet moved, own hand (ranks),
+# active card (rank or none), own seat, card exchange pending, round in the cycle of 5
+OBSERVATION_SIZE = 4 * CNT_FIELD + CNT_FIELD + len(RANKS) + len(RANKS) + 1 + 4 + 1 + 5
+
+
+def encode_move(rank: str, pos_from: Optional[int], pos_to: Optional[int]) -> int:
+    """ Index of a move with a card rank from one field to another (None for no field) """
+    idx_from = FIELD_NONE if pos_from is None else pos_from
+    idx_to = FIELD_NONE if pos_to is None else pos_to
+    return (RANK_INDEX[rank] * CNT_FIELD_SLOT + idx_from) * CNT_FIELD_SLOT + idx_to
+
+
+def encode_action(state: GameState, action: Action) -> int:
+    """ Index of an action in the given state (the card exchange is told apart by the state) """
+    if not state.bool_card_exchanged:
+        return OFFSET_EXCHANGE + RANK_INDEX[action.card.rank]
+    if action.card_swap is not None:
+        return OFFSET_SWAP + RANK_INDEX[action.card_swap.rank] * len(SUITS) + SUIT_INDEX[action.card_swap.suit]
+    return encode_move(action.card.rank, action.pos_from, action.pos_to)
+
+
+def decode_action(state: GameState, index: int) -> Action:
+    """ Action for an index in the given state, played with a matching card of the active player """
+    player = state.list_player[state.idx_player_active]
+    cards = [state.card_active] if state.card_active is not None else player.list_card
+    if index >= OFFSET_EXCHANGE:
+        rank = RANKS[index - OFFSET_EXCHANGE]
+        return Action(card=_find_card(cards, rank), pos_from=None, pos_to=None, card_swap=None)
+    if index >= OFFSET_SWAP:
+        idx_rank, idx_suit = divmod(index - OFFSET_SWAP, len(SUITS))
+        card_swap = Card(suit=SUITS[idx_suit], rank=RANKS[idx_rank])
+        return Action(card=_find_card(cards, 'JKR'), pos_from=None, pos_to=None, card_swap=card_swap)
+    rest, idx_to = divmod(index, CNT_FIELD_SLOT)
+    idx_rank, idx_from = divmod(rest, CNT_FIELD_SLOT)
+    return Action(card=_find_card(cards, RANKS[idx_rank]),
+                  pos_from=None if idx_from == FIELD_NONE else idx_from,
+                  pos_to=None if idx_to == FIELD_NONE else idx_to,
+                  card_swap=None)
+
+
+def _find_card(cards: List[Card], rank: str) -> Card:
+    """ First card of a rank (the suit has no effect on the moves) """
+    for card in cards:
+        if card.rank == rank:
+            return card
+    raise ValueError(f"No card of rank {rank} to play.")
+
+
+def get_legal_mask(state: GameState, actions: Sequence[Action]) -> np.ndarray:
+    """ Boolean mask over all action indices with the given (legal) actions set """
+    mask = np.zeros(ACTION_SPACE_SIZE, dtype=bool)
+    mask[[encode_action(state, action) for action in actions]] = True
+    return mask
+
+
+def get_batch_legal_indices(batch: DogBatch, idx_game: int) -> np.ndarray:
+    """
+    Sorted indices of the legal actions in a game of a batch. The simple cards are encoded straight from the
+    arrays of the batch, without building Action objects; the other cards are encoded from Dog's actions.
+    """
+    game = batch.games[idx_game]
+    state = game.get_state()
+    if state.phase == GamePhase.FINISHED:
+        return np.zeros(0, dtype=np.int64)
+    if not state.bool_card_exchanged or state.card_active is not None:
+        return np.unique(np.array([encode_action(state, action) for action in game.get_list_action()],
+                                  dtype=np.int64))
+
+    idx_player = int(batch.idx_player_active[idx_game])
+    pos_from = batch.positions[idx_game, idx_player].astype(np.int64)
+    indices: List[np.ndarray] = []
+    for rank in {card.rank for card in state.list_player[idx_player].list_card}:
+        if rank not in SIMPLE_CARD_VALUES:
+            card = next(card for card in state.list_player[idx_player].list_card if card.rank == rank)
+            actions = game._get_card_actions(card)  # pylint: disable=protected-access
+            indices.append(np.array([encode_action(state, action) for action in actions], dtype=np.int64))
+            continue
+        base = RANK_INDEX[rank] * CNT_FIELD_SLOT * CNT_FIELD_SLOT
+        if rank in Dog.STARTING_CARDS and batch.get_start_from()[idx_game] >= 0:
+            start_move = base + int(batch.get_start_from()[idx_game]) * CNT_FIELD_SLOT + int(START_FIELDS[idx_player])
+            indices.append(np.array([start_move], dtype=np.int64))
+        for value in SIMPLE_CARD_VALUES[rank]:
+            targets = batch.get_targets(value)[idx_game]
+            legal = targets >= 0
+            indices.append(base + pos_from[legal] * CNT_FIELD_SLOT + targets[legal])
+    if not indices:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(indices))
+
+
+def get_observation(state: GameState, idx_player: int) -> np.ndarray:
+    """ Dense observation vector of a state as seen by a player (e.g. the result of Dog.get_player_view) """
+    observation = np.zeros(OBSERVATION_SIZE, dtype=np.float32)
+    marbles = observation[:4 * CNT_FIELD].reshape(4, CNT_FIELD)
+    offset = 4 * CNT_FIELD
+    for idx, player in enumerate(state.list_player[:4]):
+        for marble in player.list_marble[:CNT_MARBLE]:
+            marbles[idx, marble.pos] = 1.0
+            if marble.is_save:
+                observation[offset + marble.pos] = 1.0
+    offset += CNT_FIELD
+    for card in state.list_player[idx_player].list_card:
+        observation[offset + RANK_INDEX[card.rank]] += 1.0
+    offset += len(RANKS)
+    if state.card_active is not None:
+        observation[offset + RANK_INDEX[state.card_active.rank]] = 1.0
+    else:
+        observation[offset + len(RANKS)] = 1.0
+    offset += len(RANKS) + 1
+    observation[offset + idx_player] = 1.0
+    offset += 4
+    observation[offset] = 0.0 if state.bool_card_exchanged else 1.0
+    observation[offset + 1 + (state.cnt_round - 1) % 5] = 1.0
+    return observation
@@ -1,6 +1,6 @@
 # import random
 from enum import Enum
-from typing import List, Optional, ClassVar
+from typing import List, Optional, ClassVar, Tuple
 from pydantic import BaseModel
 # from server.py.game import Game, Player
 
@@ -32,6 +32,17 @@ class Action(BaseModel):
     card_swap: Optional[Card] = None  # optional card to swap (default is None)
 
 
+CARD_HIDDEN = Card(suit='', rank='back')   # face-down card (e.g. of the draw pile in a player view)
+
+ActionKey = Tuple[str, str, Optional[int], Optional[int], Optional[Tuple[str, str]]]
+
+
+def action_key(action: Action) -> ActionKey:
+    """Hashable identity of an action (equal actions have equal keys)"""
+    card_swap = None if action.card_swap is None else (action.card_swap.suit, action.card_swap.rank)
+    return action.card.suit, action.card.rank, action.pos_from, action.pos_to, card_swap
+
+
 class GamePhase(str, Enum):
     """Defines the possible game phases """
     SETUP = 'setup'            # before the game has started
@@ -90,4 +101,5 @@ class GameState(BaseModel):
     card_active: Optional[Card]        # active card (for 7 and JKR with sequence of actions)
     bool_game_finished: bool
     board_positions: List[Optional[int]]
-    remaining_steps: Optional[int] = None
\ No newline at end of file
+    remaining_steps: Optional[int] = None
+    list_cnt_card: Optional[List[int]] = None   # cards in the hand of each player (set in player views)
\ No newline at end of file
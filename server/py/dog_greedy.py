@@ -0,0 +1,151 @@
+"""
+Greedy Dog player with a position evaluation scored from the move delta.
+
+The value of the board for a team is the sum of a value per marble (kennel, distance on the track, depth in the
+safe spaces). Every action only changes a few marbles: the moved one, a marble kicked home by a collision, the
+marbles overtaken with a SEVEN or the marble swapped with a Jack. So each candidate action is scored by the value
+change of these marbles plus a penalty for moving into reach of an opponent (from the ThreatMap of the position),
+without evaluating the whole board.
+"""
+
+import random
+from typing import Dict, List, Optional, Tuple
+from server.py.game import Player
+from server.py.dog import Dog
+from server.py.dog_game_state import Action, GameState
+from server.py.dog_tablebase import Tablebase
+from server.py.dog_threat import ThreatMap
+
+CNT_PLAYER = 4
+WEIGHT_PARTNER = 0.9            # progress of the partner's marbles, relative to the own ones
+WEIGHT_EXPOSURE = 0.35          # part of a marble's value at risk when an opponent can reach it
+
+# value of keeping a card of a rank (the card of the lowest value is given to the partner)
+RANK_VALUE = {'2': 2, '3': 3, '4': 6, '5': 4, '6': 4, '7': 8, '8': 4, '9': 4, '10': 5,
+              'J': 7, 'Q': 5, 'K': 9, 'A': 10, 'JKR': 12}
+
+
+def _marble_values() -> List[Dict[int, float]]:
+    """ Value of a marble of each player per field: 0 in the kennel, 1 to 4 around the track, 5+ when safe """
+    values: List[Dict[int, float]] = []
+    for idx_player in range(CNT_PLAYER):
+        start = Dog.START_POSITIONS[idx_player]
+        value = {pos: 0.0 for pos in Dog.KENNEL_POSITIONS[idx_player]}
+        value.update({pos: 1.0 + 3.0 * ((pos - start) % Dog.MAIN_TRACK) / Dog.MAIN_TRACK
+                      for pos in range(Dog.MAIN_TRACK)})
+        value.update({pos: 5.0 + 0.25 * idx for idx, pos in enumerate(Dog.SAFE_SPACES[idx_player])})
+        values.append(value)
+    return values
+
+
+MARBLE_VALUES = _marble_values()
+
+
+class PositionEvaluator:
+    """
+    Marbles of a state, indexed by field, to score actions by their change of the board value for the team
+    of the active player. Built once per decision (O(marbles)); each action is scored in O(1) fields
+    (plus the fields passed with a SEVEN).
+    """
+
+    def __init__(self, state: GameState) -> None:
+        idx_active = state.idx_player_active
+        self.idx_active = idx_active
+        self.weights = [0.0] * CNT_PLAYER
+        for idx_player in range(CNT_PLAYER):
+            if idx_player == idx_active:
+                self.weights[idx_player] = 1.0
+            elif idx_player == Dog.TEAM_MAPPING[idx_active]:
+                self.weights[idx_player] = WEIGHT_PARTNER
+            else:
+                self.weights[idx_player] = -1.0
+        self.marbles: Dict[int, Tuple[int, bool]] = {}  # field: owner, is_save
+        for idx_player, player in enumerate(state.list_player):
+            for marble in player.list_marble:
+                self.marbles[marble.pos] = (idx_player, marble.is_save)
+        self.threats = ThreatMap(Dog)
+        self.threats.update(state)
+
+    def _value(self, idx_player: int, pos: int) -> float:
+        """ Weighted value of a marble on a field (for the active player's team) """
+        return self.weights[idx_player] * MARBLE_VALUES[idx_player][pos]
+
+    def _loss_kicked(self, pos: int) -> float:
+        """ Value change when the marble on a field is sent back to its kennel """
+        idx_player, _ = self.marbles[pos]
+        return -self._value(idx_player, pos)
+
+    def _exposure(self, idx_player: int, pos: int) -> float:
+        """ Value at risk of a marble on a field which an opponent marble can reach next turn """
+        if self.threats.is_threatened(pos, idx_player):
+            return WEIGHT_EXPOSURE * self._value(idx_player, pos)
+        return 0.0
+
+    def _move_delta(self, pos_from: int, pos_to: int) -> float:
+        """ Value change of moving the marble on pos_from to pos_to and kicking a marble on pos_to """
+        idx_player, _ = self.marbles[pos_from]
+        delta = self._value(idx_player, pos_to) - self._value(idx_player, pos_from)
+        if pos_to in self.marbles and pos_to != pos_from:
+            delta += self._loss_kicked(pos_to)
+        delta -= self._exposure(idx_player, pos_to) - self._exposure(idx_player, pos_from)
+        return delta
+
+    def _seven_delta(self, pos_from: int, pos_to: int) -> float:
+        """ Additional value change of the marbles overtaken (and sent home) by a step of a SEVEN """
+        if pos_to >= Dog.MAIN_TRACK or pos_from >= Dog.MAIN_TRACK:
+            return 0.0
+        delta = 0.0
+        pos = pos_from
+        while pos != pos_to:
+            pos = (pos + 1) % Dog.MAIN_TRACK
+            marble = self.marbles.get(pos)
+            if pos != pos_to and marble is not None and not marble[1]:
+                delta += self._loss_kicked(pos)
+        return delta
+
+    def _swap_delta(self, pos_from: int, pos_to: int) -> float:
+        """ Value change of swapping two marbles with a Jack """
+        idx_from, _ = self.marbles[pos_from]
+        idx_to, _ = self.marbles[pos_to]
+        return (self._value(idx_from, pos_to) - self._value(idx_from, pos_from)
+                + self._value(idx_to, pos_from) - self._value(idx_to, pos_to))
+
+    def score(self, state: GameState, action: Action) -> float:
+        """ Value change of the action for the team of the active player (higher is better) """
+        if not state.bool_card_exchanged:
+            return -RANK_VALUE.get(action.card.rank, 0)
+        if action.card_swap is not None:
+            # keep the Joker unless it is needed, then take the most valuable card
+            return -1.0 + RANK_VALUE.get(action.card_swap.rank, 0) / 100
+        if action.pos_from is None or action.pos_to is None or action.pos_from not in self.marbles:
+            return 0.0
+        if action.card.rank == 'J':
+            return self._swap_delta(action.pos_from, action.pos_to)
+        delta = self._move_delta(action.pos_from, action.pos_to)
+        if action.card.rank == '7' or (state.card_active is not None and state.card_active.rank == '7'):
+            delta += self._seven_delta(action.pos_from, action.pos_to)
+        return delta
+
+
+class GreedyPlayer(Player):
+    """
+    Plays the action with the best evaluation change (ties are broken randomly). With a tablebase, the finish
+    of the own marbles is played towards its lowest (optimistic) bound, a heuristic which ignores the hand.
+    """
+
+    def __init__(self, seed: Optional[int] = None, tablebase: Optional[Tablebase] = None) -> None:
+        self.rng = random.Random(seed)
+        self.tablebase = tablebase
+
+    def select_action(self, state: GameState, actions: List[Action]) -> Optional[Action]:
+        """ Given masked game state and possible actions, select the action with the best score """
+        if len(actions) == 0:
+            return None
+        if self.tablebase is not None:
+            action = self.tablebase.select_action(state, actions)
+            if action is not None:
+                return action
+        evaluator = PositionEvaluator(state)
+        scores = [evaluator.score(state, action) for action in actions]
+        best = max(scores)
+        return self.rng.choice([action for action, score in zip(actions, scores) if score >= best - 1e-9])
@@ -0,0 +1,211 @@
+"""
+Monte Carlo Tree Search player for Dog.
+
+The player searches from the masked player view: every iteration deals the hidden hands of the opponents
+and the face-down draw pile from the unseen cards (determinization, with a HiddenCardSampler kept in sync
+between turns), with the hand sizes of the view. It walks
+the tree with UCB over the actions legal in that deal, adds one node and finishes with a short random rollout
+scored by the progress of both teams.
+The tree is kept between turns and reused when a later state is found in it.
+"""
+
+import math
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+from server.py.game import Player
+from server.py.determinization import HiddenCardSampler
+from server.py.dog import Dog
+from server.py.dog_game_state import Action, ActionKey, Card, GamePhase, GameState, action_key
+
+PublicKey = Tuple[object, ...]
+
+
+def public_key(state: GameState) -> PublicKey:
+    """ Identity of the public part of a state (marbles, turn, round and played cards) """
+    marbles = tuple((marble.pos, marble.is_save) for player in state.list_player for marble in player.list_marble)
+    card_active = None if state.card_active is None else (state.card_active.suit, state.card_active.rank)
+    return (marbles, state.idx_player_active, state.cnt_round, state.bool_card_exchanged,
+            card_active, len(state.list_card_discard))
+
+
+def team_progress(state: GameState, idx_player: int) -> float:
+    """ Progress of the marbles of a player: 0 in the kennel, up to 1 around the track, 1 to 2 in the safe spaces """
+    progress = 0.0
+    start = Dog.START_POSITIONS[idx_player]
+    for marble in state.list_player[idx_player].list_marble:
+        if marble.pos in Dog.SAFE_SPACES[idx_player]:
+            progress += 1.0 + (Dog.SAFE_SPACES[idx_player].index(marble.pos) + 1) / 4
+        elif marble.pos < Dog.MAIN_TRACK:
+            progress += 0.25 + 0.75 * ((marble.pos - start) % Dog.MAIN_TRACK) / Dog.MAIN_TRACK
+    return progress
+
+
+def evaluate(state: GameState, idx_team: int) -> float:
+    """ Reward in [0, 1] for the team of the given player (0 and 2, 1 and 3) """
+    own = team_progress(state, idx_team % 2) + team_progress(state, idx_team % 2 + 2)
+    other = team_progress(state, 1 - idx_team % 2) + team_progress(state, 3 - idx_team % 2)
+    if state.phase == GamePhase.FINISHED:
+        return 1.0 if own > other else 0.0
+    return 0.5 + (own - other) / 32
+
+
+class Node:
+    """ Node of the search tree: statistics of the action leading here, from the view of the player who chose it """
+
+    def __init__(self, parent: Optional['Node'], action: Optional[Action], idx_player: int) -> None:
+        self.parent = parent
+        self.action = action
+        self.idx_player = idx_player
+        self.children: Dict[ActionKey, 'Node'] = {}
+        self.visits = 0
+        self.value = 0.0
+        self.key: Optional[PublicKey] = None
+
+    def select(self, legal: Dict[ActionKey, Action], exploration: float) -> 'Node':
+        """ Child with the highest UCB among the actions legal in the current determinization """
+        log_visits = math.log(max(self.visits, 1))
+
+        def ucb(child: 'Node') -> float:
+            return child.value / child.visits + exploration * math.sqrt(log_visits / child.visits)
+
+        return max((self.children[key] for key in legal if key in self.children), key=ucb)
+
+
+def card_key(card: Card) -> Tuple[str, str]:
+    """ Hashable identity of a card """
+    return card.suit, card.rank
+
+
+def sync_sampler(sampler: HiddenCardSampler[Card], state: GameState, idx_player: int) -> None:
+    """ Mark the cards the player can see as seen: the own hand and the discard pile (the draw pile is face down) """
+    sampler.sync('hand', state.list_player[idx_player].list_card)
+    sampler.sync('discard', state.list_card_discard, append_only=True)
+
+
+def determinize(state: GameState, idx_player: int, sampler: HiddenCardSampler[Card], rng: random.Random) -> Dog:
+    """
+    Game on a copy of a player view where the hidden hands (of the sizes given in the view) and the draw pile
+    are dealt from the unseen cards of the (synced) sampler, the draw pile in a random order
+    """
+    game = Dog.from_state(state)
+    assert game.state is not None and state.list_cnt_card is not None
+    others = [idx for idx in range(state.cnt_player) if idx != idx_player]
+    sizes = [state.list_cnt_card[idx] for idx in others]
+    cnt_unseen = len(sampler.get_pool())
+    while sum(sizes) > cnt_unseen:      # a Joker swap takes a Joker out of the game and adds another card
+        sizes[sizes.index(max(sizes))] -= 1
+    dealt = sampler.deal(sizes, rng)
+    for idx, hand in zip(others, dealt):
+        game.state.list_player[idx].list_card = hand
+    rest = dealt[len(others)] if len(dealt) > len(others) else []
+    game.state.list_card_draw = rest[:len(state.list_card_draw)]
+    game.state.list_cnt_card = None
+    return game
+
+
+class MCTSPlayer(Player):
+    """ Information-set MCTS with determinized hidden hands, a time budget and subtree reuse """
+
+    def __init__(self, time_budget: float = 0.5, max_iterations: Optional[int] = None,  # pylint: disable=too-many-arguments
+                 rollout_depth: int = 8, exploration: float = 1.0, seed: Optional[int] = None) -> None:
+        self.time_budget = time_budget
+        self.max_iterations = max_iterations
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.root: Optional[Node] = None
+        self.sampler: Optional[HiddenCardSampler[Card]] = None
+        self.cnt_iterations = 0
+
+    def select_action(self, state: GameState, actions: List[Action]) -> Optional[Action]:
+        """ Search from the (masked) state of the active player and return the most visited action """
+        if len(actions) == 0:
+            return None
+        if len(actions) == 1:
+            return actions[0]
+        idx_player = state.idx_player_active
+        root = self._get_root(state)
+        if self.sampler is None:
+            self.sampler = HiddenCardSampler(GameState.LIST_CARD, card_key)
+        sync_sampler(self.sampler, state, idx_player)
+
+        deadline = time.perf_counter() + self.time_budget
+        self.cnt_iterations = 0
+        while time.perf_counter() < deadline:
+            if self.max_iterations is not None and self.cnt_iterations >= self.max_iterations:
+                break
+            self._iterate(root, determinize(state, idx_player, self.sampler, self.rng))
+            self.cnt_iterations += 1
+
+        by_key = {action_key(action): action for action in actions}
+        visited = [child for key, child in root.children.items() if key in by_key]
+        if not visited:
+            return self.rng.choice(actions)
+        best = max(visited, key=lambda child: child.visits)
+        self.root = best
+        assert best.action is not None
+        return by_key[action_key(best.action)]
+
+    def _get_root(self, state: GameState) -> Node:
+        """ Node of the kept tree with the same public state, or a new root """
+        key = public_key(state)
+        if self.root is not None:
+            frontier = [self.root]
+            for _ in range(2 * state.cnt_player):
+                for node in frontier:
+                    if node.key == key:
+                        node.parent = None
+                        return node
+                frontier = [child for node in frontier for child in node.children.values()]
+        root = Node(None, None, state.idx_player_active)
+        root.key = key
+        return root
+
+    def _iterate(self, root: Node, game: Dog) -> None:
+        """ One selection, expansion, rollout and backpropagation on a determinized game """
+        node = root
+        assert game.state is not None
+        while game.state.phase != GamePhase.FINISHED:
+            legal = {action_key(action): action for action in game.get_list_action()}
+            if not legal:
+                game.apply_action(None)
+                continue
+            untried = [key for key in legal if key not in node.children]
+            idx_player = game.state.idx_player_active
+            if untried:
+                key = self.rng.choice(untried)
+                child = Node(node, legal[key], idx_player)
+                node.children[key] = child
+                game.apply_action(legal[key])
+                child.key = public_key(game.state)
+                node = child
+                break
+            node = node.select(legal, self.exploration)
+            game.apply_action(legal[action_key(node.action)] if node.action is not None else None)
+
+        self._rollout(game)
+        backup: Optional[Node] = node
+        while backup is not None:
+            backup.visits += 1
+            backup.value += evaluate(game.state, backup.idx_player)
+            backup = backup.parent
+
+    def _rollout(self, game: Dog) -> None:
+        """ Play a few random moves: a random card first, then one of its actions """
+        assert game.state is not None
+        for _ in range(self.rollout_depth):
+            state = game.state
+            if state.phase == GamePhase.FINISHED:
+                return
+            if not state.bool_card_exchanged or state.card_active is not None:
+                actions = game.get_list_action()
+            else:
+                actions = []
+                cards = list(state.list_player[state.idx_player_active].list_card)
+                self.rng.shuffle(cards)
+                for card in cards:
+                    actions = game._get_card_actions(card)  # pylint: disable=protected-access
+                    if actions:
+                        break
+            game.apply_action(self.rng.choice(actions) if actions else None)
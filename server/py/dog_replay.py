@@ -0,0 +1,207 @@
+"""
+Compact binary records of Dog games, to store many simulated games and replay any of them.
+
+A game started with a seed shuffles with its own generator (Dog(seed)), so it is given by its seed and the
+actions played. A record is:
+- the magic bytes and the seed (varint)
+- the initial deal: the starting player and the cards of the first round (a byte per card), checked on replay
+- the number of actions and one varint per action: 0 for no action, else 1 + its index in get_list_action()
+
+An action takes one byte for all but very long action lists (e.g. a SEVEN with many marbles out), so a game of
+some hundred actions is stored in a few hundred bytes instead of the megabytes of its JSON states.
+"""
+
+from typing import Any, Iterable, Iterator, List, Optional, Tuple, Union
+from pydantic import BaseModel
+from server.py.dog import Dog
+from server.py.dog_game_state import Action, GamePhase, GameState
+from server.py.dog_player import RandomPlayer
+
+MAGIC = b'DOGRP1'
+MAX_ACTIONS = 5000      # actions after which a recorded random game is stopped (e.g. a game without progress)
+# fixed copies of the ranks (without the Joker) and suits, as in dog_encoding (GameState's lists may be replaced)
+RANKS = ('2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A')
+SUITS = ('♠', '♥', '♦', '♣')
+# code of a card by (suit, rank): the deck has every card twice, both copies get the same code
+CARD_CODES = {(suit, rank): code for code, (suit, rank) in
+              enumerate([(suit, rank) for rank in RANKS for suit in SUITS] + [('', 'JKR')])}
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    """ Append an unsigned integer in 7-bit groups, low group first (LEB128) """
+    if value < 0:
+        raise ValueError(f"Negative value {value} can't be written as varint.")
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data: Buffer, offset: int) -> Tuple[int, int]:
+    """ Unsigned integer at an offset and the offset after it """
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Record ends within a varint.")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def get_deal(state: GameState) -> List[int]:
+    """ Codes of the cards in the hands, player by player """
+    cards = [(card.suit, card.rank) for player in state.list_player for card in player.list_card]
+    unknown = [card for card in cards if card not in CARD_CODES]
+    if unknown:
+        raise ValueError(f"Cards {unknown} are not in the Dog deck.")
+    return [CARD_CODES[card] for card in cards]
+
+
+class DogRecord(BaseModel):
+    seed: int                       # seed of the game's generator
+    idx_player_started: int         # starting player of the first round
+    deal: List[int]                 # codes of the cards dealt in the first round (player by player)
+    actions: List[int] = []         # per action: 0 for no action, else 1 + index in get_list_action()
+
+    def to_bytes(self) -> bytes:
+        buffer = bytearray(MAGIC)
+        write_varint(buffer, self.seed)
+        buffer.append(self.idx_player_started)
+        buffer.append(len(self.deal))
+        buffer.extend(self.deal)
+        write_varint(buffer, len(self.actions))
+        for code in self.actions:
+            write_varint(buffer, code)
+        return bytes(buffer)
+
+    @classmethod
+    def from_bytes(cls, data: Buffer, offset: int = 0) -> 'DogRecord':
+        """ Record at an offset of the data (e.g. a memoryview of a file with many records) """
+        return cls.read(data, offset)[0]
+
+    @classmethod
+    def read(cls, data: Buffer, offset: int = 0) -> Tuple['DogRecord', int]:
+        """ Record at an offset of the data and the offset after it """
+        record, cnt_action, offset = cls.read_header(data, offset)
+        for _ in range(cnt_action):
+            code, offset = read_varint(data, offset)
+            record.actions.append(code)
+        return record, offset
+
+    @classmethod
+    def read_header(cls, data: Buffer, offset: int = 0) -> Tuple['DogRecord', int, int]:
+        """ Record without its actions at an offset of the data, its number of actions and their offset """
+        if bytes(data[offset:offset + len(MAGIC)]) != MAGIC:
+            raise ValueError("No Dog record at this offset.")
+        seed, offset = read_varint(data, offset + len(MAGIC))
+        idx_player_started = data[offset]
+        cnt_deal = data[offset + 1]
+        deal = list(data[offset + 2:offset + 2 + cnt_deal])
+        cnt_action, offset = read_varint(data, offset + 2 + cnt_deal)
+        return cls(seed=seed, idx_player_started=idx_player_started, deal=deal), cnt_action, offset
+
+
+def iter_codes(data: Buffer, offset: int, cnt_action: int) -> Iterator[int]:
+    """ Action codes read one by one from the data (e.g. a memoryview of a memory map, without copying it) """
+    for _ in range(cnt_action):
+        code, offset = read_varint(data, offset)
+        yield code
+
+
+def encode_action(actions: List[Action], action: Optional[Action]) -> int:
+    """ Code of an action in the list of legal actions (compared by identity first, then by value) """
+    if action is None:
+        return 0
+    for idx, candidate in enumerate(actions):
+        if candidate is action:
+            return idx + 1
+    return actions.index(action) + 1
+
+
+def decode_action(actions: List[Action], code: int) -> Optional[Action]:
+    if code == 0:
+        return None
+    if code > len(actions):
+        raise ValueError(f"Action {code - 1} of {len(actions)} legal actions.")
+    return actions[code - 1]
+
+
+class DogRecorder:
+    """
+    Records the actions of a game started with a seed: hooks into apply_action of the game and reuses the
+    action list from its last get_list_action call, so recording costs no extra move generation in a loop of
+    get_list_action and apply_action.
+    """
+
+    def __init__(self, seed: int) -> None:
+        self.game = Dog(seed)
+        state = self.game.get_state()
+        self.record = DogRecord(seed=seed, idx_player_started=state.idx_player_started, deal=get_deal(state))
+        self.actions: Optional[List[Action]] = None
+        self.apply_action = self.game.apply_action
+        self.get_list_action = self.game.get_list_action
+        self.game.apply_action = self._apply_action         # type: ignore[method-assign]
+        self.game.get_list_action = self._get_list_action   # type: ignore[method-assign]
+
+    def _get_list_action(self) -> List[Action]:
+        self.actions = self.get_list_action()
+        return self.actions
+
+    def _apply_action(self, action: Optional[Action]) -> None:
+        actions = self.actions if self.actions is not None else self.get_list_action()
+        self.actions = None
+        self.record.actions.append(encode_action(actions, action))
+        self.apply_action(action)
+
+    def to_bytes(self) -> bytes:
+        return self.record.to_bytes()
+
+
+def new_game(record: DogRecord) -> Dog:
+    """ Game of a record before its first action (checks that its seed still deals the recorded cards) """
+    game = Dog(record.seed)
+    state = game.get_state()
+    if state.idx_player_started != record.idx_player_started or get_deal(state) != record.deal:
+        raise ValueError(f"Seed {record.seed} deals another game than the record (changed deck or shuffle).")
+    return game
+
+
+def apply_codes(game: Dog, codes: Iterable[int]) -> None:
+    """ Apply the actions of codes to a game """
+    for code in codes:
+        game.apply_action(decode_action(game.get_list_action(), code))
+
+
+def replay(record: DogRecord, cnt_action: Optional[int] = None, game: Optional[Dog] = None,
+           start: int = 0) -> Dog:
+    """
+    Game after the first cnt_action actions of a record (all if None). A game given (e.g. restored from a
+    checkpoint) must be at the state after the first start actions; only the actions after it are applied.
+    """
+    end = len(record.actions) if cnt_action is None else cnt_action
+    if not start <= end <= len(record.actions):
+        raise ValueError(f"Action {end} out of range {start} to {len(record.actions)}.")
+    if game is None:
+        if start != 0:
+            raise ValueError("A game is needed to replay from another action than the first.")
+        game = new_game(record)
+    apply_codes(game, record.actions[start:end])
+    return game
+
+
+def record_random_game(seed: int, max_actions: int = MAX_ACTIONS) -> DogRecord:
+    """ Record of a game between random players (they draw from the global generator, not from the game's) """
+    recorder = DogRecorder(seed)
+    game = recorder.game
+    player = RandomPlayer()
+    while game.get_state().phase != GamePhase.FINISHED and len(recorder.record.actions) < max_actions:
+        actions = game.get_list_action()
+        action: Any = player.select_action(game.get_state(), actions)
+        game.apply_action(action)
+    return recorder.record
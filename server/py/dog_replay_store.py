@@ -0,0 +1,171 @@
+"""
+Append-only store of Dog game records with random access by game and turn.
+
+A store is two files:
+- <path>.dat: the records (see dog_replay), each followed by its checkpoints; a checkpoint is the full state
+  after every interval actions, with its backup and the state of the game's generator (for the later shuffles)
+- <path>.idx: a fixed-size entry per game with the offsets of its record and checkpoints in the data file
+
+Both files are read with mmap. The state at a turn is restored from the nearest checkpoint before it and the
+remaining actions are decoded straight from the memory map, so a query replays less than interval actions.
+The data of a game is written before its index entry, so a reader never sees an entry without its data.
+Fill a store with random games with: python -m server.py.dog_replay_store <path> [games] [first seed]
+"""
+
+import contextlib
+import mmap
+import os
+import random
+import struct
+import sys
+import zlib
+from typing import List, Optional, Tuple
+from server.py.dog import Dog
+from server.py.dog_game_state import GameState
+from server.py.dog_replay import DogRecord, apply_codes, iter_codes, new_game, read_varint, record_random_game
+
+MAGIC_DATA = b'DOGRD1'
+MAGIC_INDEX = b'DOGRI1'
+HEADER_INDEX = struct.Struct('<6sI')        # magic, actions between two checkpoints
+ENTRY = struct.Struct('<QQI')               # offset of the record, offset of the checkpoint table, checkpoints
+CHECKPOINT = struct.Struct('<IIQI')         # turn, offset of its next action in the record, offset and size
+RNG_STATE = struct.Struct('<625I')          # state of the Mersenne Twister of the game (random.Random)
+DEFAULT_INTERVAL = 50
+
+
+def encode_checkpoint(game: Dog) -> bytes:
+    """
+    State of the generator and the compressed JSON of the state and its backup (a turn with an active card
+    falls back to it when the player can't finish it)
+    """
+    version, internal, gauss_next = game.rng.getstate()
+    if version != 3 or gauss_next is not None:
+        raise ValueError("Unexpected state of the game's generator.")
+    assert game.state and game.state_backup
+    states = game.state.model_dump_json() + '\n' + game.state_backup.model_dump_json()
+    return RNG_STATE.pack(*internal) + zlib.compress(states.encode('utf-8'))
+
+
+def decode_checkpoint(data: memoryview) -> Dog:
+    """ Game at a checkpoint, shuffling with the generator of the recorded game """
+    state, backup = zlib.decompress(data[RNG_STATE.size:]).split(b'\n')
+    game = Dog.from_state(GameState.model_validate_json(state))
+    game.state_backup = GameState.model_validate_json(backup)
+    game.rng = random.Random()
+    game.rng.setstate((3, RNG_STATE.unpack_from(data, 0), None))
+    return game
+
+
+class ReplayWriter:
+    """ Appends records to a store (created if it doesn't exist) """
+
+    def __init__(self, path: str, interval: int = DEFAULT_INTERVAL) -> None:
+        is_new = not os.path.exists(path + '.idx')
+        self.data = open(path + '.dat', 'ab')               # pylint: disable=consider-using-with
+        self.index = open(path + '.idx', 'ab')              # pylint: disable=consider-using-with
+        if is_new:
+            self.data.write(MAGIC_DATA)
+            self.index.write(HEADER_INDEX.pack(MAGIC_INDEX, interval))
+            self.interval = interval
+        else:
+            with open(path + '.idx', 'rb') as file:
+                magic, self.interval = HEADER_INDEX.unpack(file.read(HEADER_INDEX.size))
+            if magic != MAGIC_INDEX:
+                raise ValueError(f"{path} is not a Dog replay store.")
+
+    def close(self) -> None:
+        self.data.close()
+        self.index.close()
+
+    def append(self, record: DogRecord) -> None:
+        """ Store a record with the checkpoints of a replay of it """
+        data = record.to_bytes()
+        _, cnt_action, offset = DogRecord.read_header(data)
+        game = new_game(record)
+        checkpoints: List[Tuple[int, int, bytes]] = []
+        for turn, code in enumerate(record.actions, start=1):
+            apply_codes(game, [code])
+            _, offset = read_varint(data, offset)
+            if turn % self.interval == 0 and turn < cnt_action:
+                checkpoints.append((turn, offset, encode_checkpoint(game)))
+
+        offset_record = self.data.tell()
+        offset_table = offset_record + len(data)
+        offset_blob = offset_table + CHECKPOINT.size * len(checkpoints)
+        table = bytearray()
+        for turn, offset_action, blob in checkpoints:
+            table += CHECKPOINT.pack(turn, offset_action, offset_blob, len(blob))
+            offset_blob += len(blob)
+        self.data.write(data + table + b''.join(blob for _, _, blob in checkpoints))
+        self.data.flush()
+        self.index.write(ENTRY.pack(offset_record, offset_table, len(checkpoints)))
+        self.index.flush()
+
+
+class ReplayStore:
+    """ Memory-mapped store with the games stored before it was opened """
+
+    def __init__(self, path: str) -> None:
+        with open(path + '.dat', 'rb') as file:
+            self.mmap_data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(path + '.idx', 'rb') as file:
+            self.mmap_index = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.interval = HEADER_INDEX.unpack_from(self.mmap_index, 0)
+        if magic != MAGIC_INDEX or self.mmap_data[:len(MAGIC_DATA)] != MAGIC_DATA:
+            raise ValueError(f"{path} is not a Dog replay store.")
+        self.data = memoryview(self.mmap_data)
+        self.cnt_game = (len(self.mmap_index) - HEADER_INDEX.size) // ENTRY.size
+
+    def close(self) -> None:
+        """ Release the memory maps """
+        self.data.release()
+        self.mmap_data.close()
+        self.mmap_index.close()
+
+    def __len__(self) -> int:
+        return self.cnt_game
+
+    def _get_entry(self, idx_game: int) -> Tuple[int, int, int]:
+        if not 0 <= idx_game < self.cnt_game:
+            raise IndexError(f"Game {idx_game} not in the store of {self.cnt_game} games.")
+        return ENTRY.unpack_from(self.mmap_index, HEADER_INDEX.size + idx_game * ENTRY.size)
+
+    def get_record(self, idx_game: int) -> DogRecord:
+        return DogRecord.from_bytes(self.data, self._get_entry(idx_game)[0])
+
+    def get_cnt_action(self, idx_game: int) -> int:
+        return DogRecord.read_header(self.data, self._get_entry(idx_game)[0])[1]
+
+    def get_game(self, idx_game: int, turn: Optional[int] = None) -> Dog:
+        """ Game after turn actions (at its end if None), replayed from the nearest checkpoint """
+        offset_record, offset_table, cnt_checkpoint = self._get_entry(idx_game)
+        record, cnt_action, offset_action = DogRecord.read_header(self.data, offset_record)
+        turn = cnt_action if turn is None else turn
+        if not 0 <= turn <= cnt_action:
+            raise IndexError(f"Turn {turn} not in game {idx_game} of {cnt_action} actions.")
+        idx_checkpoint = min(turn // self.interval, cnt_checkpoint) - 1
+        if idx_checkpoint < 0:
+            game = new_game(record)
+            start = 0
+        else:
+            start, offset, offset_blob, size_blob = CHECKPOINT.unpack_from(
+                self.data, offset_table + idx_checkpoint * CHECKPOINT.size)
+            offset_action = offset_record + offset
+            game = decode_checkpoint(self.data[offset_blob:offset_blob + size_blob])
+        apply_codes(game, iter_codes(self.data, offset_action, turn - start))
+        return game
+
+    def get_state(self, idx_game: int, turn: Optional[int] = None) -> GameState:
+        return self.get_game(idx_game, turn).get_state()
+
+
+if __name__ == '__main__':
+
+    cnt_game = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    seed_first = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    writer = ReplayWriter(sys.argv[1])
+    for seed in range(seed_first, seed_first + cnt_game):
+        random.seed(seed)   # of the random players, the game shuffles with its own generator
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            writer.append(record_random_game(seed))
+    writer.close()
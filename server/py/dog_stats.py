@@ -0,0 +1,241 @@
+"""
+Streaming statistics of Dog games for balance analysis.
+
+A DogStatsCollector subscribes to the events of a game by hooking into its methods (as DogRecorder does):
+- moves (apply_action): card usage per rank, the number of moves of each SEVEN
+- collisions (_check_collisions) and overtakes (_handle_overtaking): marbles kicked back to the kennel
+- round changes (next_round), and the end of the game: rounds per game, wins by seat
+
+The events of a turn are counted when it is finished, as a SEVEN or Joker turn which is passed is taken back.
+
+The counters and histograms have a fixed size, so memory stays constant however many games are aggregated,
+and statistics of different processes are merged by adding them up. Run a simulation with random players in
+parallel processes with: python -m server.py.dog_stats [games] [workers]
+"""
+
+import concurrent.futures
+import contextlib
+import os
+import random
+import sys
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from pydantic import BaseModel
+from server.py.dog import Dog
+from server.py.dog_game_state import Action, GamePhase, GameState
+from server.py.dog_player import RandomPlayer
+
+MAX_ACTIONS = 5000              # actions after which a simulated game is stopped (and not counted)
+MAX_ROUNDS = 200                # rounds counted by value, longer games in the last bucket
+CNT_SEAT = 4
+KENNEL_FIELDS = frozenset(pos for positions in Dog.KENNEL_POSITIONS.values() for pos in positions)
+
+
+class Histogram(BaseModel):
+    """ Counts of non-negative integers up to a maximum (larger values are counted in the last bucket) """
+    counts: List[int]
+    total: int = 0                  # sum of the values (exact, also for the values of the last bucket)
+
+    @classmethod
+    def create(cls, max_value: int) -> 'Histogram':
+        return cls(counts=[0] * (max_value + 1))
+
+    def add(self, value: int) -> None:
+        self.counts[min(value, len(self.counts) - 1)] += 1
+        self.total += value
+
+    def merge(self, other: 'Histogram') -> None:
+        if len(other.counts) != len(self.counts):
+            raise ValueError(f"Histograms of {len(self.counts)} and {len(other.counts)} buckets can't be merged.")
+        self.counts = [count + count_other for count, count_other in zip(self.counts, other.counts)]
+        self.total += other.total
+
+    def get_count(self) -> int:
+        return sum(self.counts)
+
+    def get_mean(self) -> Optional[float]:
+        count = self.get_count()
+        return self.total / count if count else None
+
+    def get_percentile(self, percentile: float) -> Optional[int]:
+        """ Smallest value with at least the percentile of the values up to it """
+        count = self.get_count()
+        if not count:
+            return None
+        cumulative = 0
+        for value, count_value in enumerate(self.counts):
+            cumulative += count_value
+            if cumulative * 100 >= percentile * count:
+                return value
+        return len(self.counts) - 1
+
+
+class DogStats(BaseModel):
+    games: int = 0                                      # finished games
+    games_unfinished: int = 0                           # games stopped before their end
+    wins_by_seat: List[int] = [0] * CNT_SEAT            # wins by seat, counted from the first starting player
+    rounds: Histogram = Histogram.create(MAX_ROUNDS)    # rounds per finished game
+    cards: Dict[str, int] = {}                          # turns played per rank of the card (e.g. JKR, 7)
+    kicks_collision: int = 0                            # marbles sent home by a marble landing on them
+    kicks_overtake: int = 0                             # marbles sent home by being overtaken with a SEVEN
+    seven_moves: Histogram = Histogram.create(7)        # marble moves per SEVEN played
+
+    def merge(self, other: 'DogStats') -> 'DogStats':
+        """ Add the statistics of another aggregator (e.g. of another process) """
+        self.games += other.games
+        self.games_unfinished += other.games_unfinished
+        self.wins_by_seat = [wins + wins_other for wins, wins_other in zip(self.wins_by_seat, other.wins_by_seat)]
+        self.rounds.merge(other.rounds)
+        for rank, count in other.cards.items():
+            self.cards[rank] = self.cards.get(rank, 0) + count
+        self.kicks_collision += other.kicks_collision
+        self.kicks_overtake += other.kicks_overtake
+        self.seven_moves.merge(other.seven_moves)
+        return self
+
+    def get_summary(self) -> Dict[str, Any]:
+        """ Win rates by seat, rounds, card usage and kicks per game """
+        cnt_card = sum(self.cards.values())
+        cnt_game = self.games + self.games_unfinished     # the turns of unfinished games are counted as well
+        return {
+            'games': self.games,
+            'games_unfinished': self.games_unfinished,
+            'win_rate_by_seat': [round(wins / self.games, 4) if self.games else None for wins in self.wins_by_seat],
+            'rounds_mean': self.rounds.get_mean(),
+            'rounds_percentiles': {f'p{percentile}': self.rounds.get_percentile(percentile)
+                                   for percentile in (50, 90, 99)},
+            'card_usage': {rank: round(count / cnt_card, 4) for rank, count in sorted(self.cards.items())},
+            'kicks_collision_per_game': self.kicks_collision / cnt_game if cnt_game else None,
+            'kicks_overtake_per_game': self.kicks_overtake / cnt_game if cnt_game else None,
+            'seven_moves': self.seven_moves.counts[1:],
+        }
+
+
+def count_kennel(state: GameState) -> int:
+    return sum(marble.pos in KENNEL_FIELDS for player in state.list_player for marble in player.list_marble)
+
+
+def get_winner(state: GameState) -> Optional[int]:
+    """ Seat of a player of the winning team (None if no team has all its marbles in the safe spaces) """
+    for idx_player, player in enumerate(state.list_player):
+        teammate = state.list_player[Dog.TEAM_MAPPING[idx_player]]
+        if all(marble.pos in Dog.SAFE_SPACES[idx_player] for marble in player.list_marble) and \
+                all(marble.pos in Dog.SAFE_SPACES[Dog.TEAM_MAPPING[idx_player]] for marble in teammate.list_marble):
+            return idx_player
+    return None
+
+
+class DogStatsCollector:
+    """ Adds the events of a game to statistics (hooks into the methods of the game instance) """
+
+    def __init__(self, game: Dog, stats: DogStats) -> None:
+        self.game = game
+        self.stats = stats
+        state = game.get_state()
+        self.idx_player_first = state.idx_player_started
+        self.cnt_round = state.cnt_round
+        # events of the turn being played, counted when it is finished (a SEVEN or Joker turn may be taken back)
+        self.rank_turn: Optional[str] = None
+        self.cnt_seven_move = 0
+        self.kicks: Counter[str] = Counter()
+        self.is_finished = False
+        self._hook('apply_action', self._on_apply_action)
+        self._hook('_check_collisions', self._on_kick('kicks_collision'))
+        self._hook('_handle_overtaking', self._on_kick('kicks_overtake'))
+        self._hook('next_round', self._on_next_round)
+
+    def _hook(self, name: str, handler: Callable[..., None]) -> None:
+        method = getattr(self.game, name)
+        setattr(self.game, name, lambda *args: handler(method, *args))
+
+    def _on_kick(self, counter: str) -> Callable[..., None]:
+        def handler(method: Callable[..., None], action: Action) -> None:
+            cnt_before = count_kennel(self.game.get_state())
+            method(action)
+            self.kicks[counter] += count_kennel(self.game.get_state()) - cnt_before
+        return handler
+
+    def _on_next_round(self, method: Callable[..., None]) -> None:
+        method()
+        self.cnt_round += 1
+
+    def _on_apply_action(self, method: Callable[..., None], action: Optional[Action]) -> None:
+        is_play = action is not None and self.game.get_state().bool_card_exchanged
+        method(action)
+        state = self.game.get_state()
+        if action is None:
+            self._reset_turn()      # the turn is passed, an unfinished one is taken back
+        elif is_play:
+            if self.rank_turn is None:
+                self.rank_turn = action.card.rank
+            if action.card.rank == '7' and action.pos_from is not None and action.pos_to is not None:
+                self.cnt_seven_move += 1
+            if state.card_active is None:
+                self._count_turn()
+        if state.phase == GamePhase.FINISHED and not self.is_finished:
+            self.finish()
+
+    def _count_turn(self) -> None:
+        assert self.rank_turn is not None
+        self.stats.cards[self.rank_turn] = self.stats.cards.get(self.rank_turn, 0) + 1
+        if self.cnt_seven_move:
+            self.stats.seven_moves.add(self.cnt_seven_move)
+        self.stats.kicks_collision += self.kicks['kicks_collision']
+        self.stats.kicks_overtake += self.kicks['kicks_overtake']
+        self._reset_turn()
+
+    def _reset_turn(self) -> None:
+        self.rank_turn = None
+        self.cnt_seven_move = 0
+        self.kicks.clear()
+
+    def finish(self) -> None:
+        """ Count the finished game (called on its last action) or a game stopped before its end """
+        self.is_finished = True
+        state = self.game.get_state()
+        winner = get_winner(state) if state.phase == GamePhase.FINISHED else None
+        if winner is None:
+            self.stats.games_unfinished += 1
+            return
+        self.stats.games += 1
+        self.stats.rounds.add(self.cnt_round)
+        for idx_player in (winner, Dog.TEAM_MAPPING[winner]):
+            self.stats.wins_by_seat[(idx_player - self.idx_player_first) % CNT_SEAT] += 1
+
+
+def play_games(seeds: Iterable[int], max_actions: int = MAX_ACTIONS) -> DogStats:
+    """ Statistics of games between random players (a game per seed) """
+    stats = DogStats()
+    player = RandomPlayer()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        for seed in seeds:
+            random.seed(seed)
+            game = Dog(seed)
+            collector = DogStatsCollector(game, stats)
+            for _ in range(max_actions):
+                if collector.is_finished:
+                    break
+                action: Any = player.select_action(game.get_state(), game.get_list_action())
+                game.apply_action(action)
+            if not collector.is_finished:
+                collector.finish()
+    return stats
+
+
+def run(seeds: Iterable[int], workers: Optional[int] = None, max_actions: int = MAX_ACTIONS) -> DogStats:
+    """ Statistics of games played in parallel processes, merged from the statistics of each process """
+    list_seed = list(seeds)
+    cnt_worker = workers or os.cpu_count() or 1
+    chunks = [list_seed[idx::cnt_worker] for idx in range(cnt_worker)]
+    stats = DogStats()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=cnt_worker) as executor:
+        for result in executor.map(play_games, [chunk for chunk in chunks if chunk], [max_actions] * len(chunks)):
+            stats.merge(result)
+    return stats
+
+
+if __name__ == '__main__':
+
+    results = run(range(int(sys.argv[1]) if len(sys.argv) > 1 else 100),
+                  workers=int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    print(results.get_summary())
@@ -0,0 +1,237 @@
+"""
+Endgame tablebase for the finish of a Dog player.
+
+A configuration is the set of fields of the player's four marbles when all of them are on the last cnt_track
+fields before the own start field (the field itself included) or in the safe spaces. The fields are numbered
+linearly: 0 to cnt_track - 1 along the track, then cnt_track to cnt_track + 3 for the safe spaces, so a move
+of v steps goes from p to p + v as in Dog (no jumps over marbles in the safe spaces, no passing of own marbles
+with a SEVEN, which would send them home). Other players and the Jack are left out.
+
+The generator solves all configurations backwards from the finished one and stores, in a compact file:
+- a lower bound on the number of cards to bring all marbles home (uint8 per configuration, 255 if impossible)
+- the best configuration after playing a card of each rank (uint16 per configuration and rank)
+The bound is optimistic: it assumes a card of the best rank in every turn, as the table doesn't know the hand
+(indexing it by the hand would multiply its size). It ranks configurations, it is not the exact number of turns.
+The file is read with mmap and configurations are indexed with the combinatorial number system, so a query is
+O(1). Generate it with: python -m server.py.dog_tablebase <file> [cnt_track]
+"""
+
+import mmap
+import struct
+import sys
+from collections import deque
+from functools import lru_cache
+from itertools import combinations
+from math import comb
+from typing import Dict, FrozenSet, List, Optional, Tuple
+import numpy as np
+from server.py.dog import Dog
+from server.py.dog_game_state import Action, GameState
+
+MAGIC = b'DOGTB1'
+HEADER = struct.Struct('<6sBBI')    # magic, cnt_track, number of ranks, number of configurations
+RANKS = ('2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A', 'JKR')
+RANK_INDEX = {rank: idx for idx, rank in enumerate(RANKS)}
+# forward moves only: Dog doesn't allow moving 4 back before the own start field
+MOVE_VALUES: Dict[str, List[int]] = {
+    '2': [2], '3': [3], '4': [4], '5': [5], '6': [6], '8': [8], '9': [9], '10': [10],
+    'Q': [12], 'K': [13], 'A': [1, 11],
+}
+CNT_MARBLE = 4
+CNT_SAFE = 4
+SEVEN_STEPS = 7
+VALUE_UNSOLVED = 255
+NO_SUCCESSOR = 0xFFFF
+DEFAULT_CNT_TRACK = 16
+
+Config = Tuple[int, ...]    # sorted linear fields of the four marbles
+
+
+def config_index(config: Config) -> int:
+    """ Index of a configuration (combinatorial number system) """
+    return sum(comb(pos, idx + 1) for idx, pos in enumerate(config))
+
+
+def get_goal(cnt_track: int) -> Config:
+    """ Configuration with all marbles in the safe spaces """
+    return tuple(range(cnt_track, cnt_track + CNT_SAFE))
+
+
+def move_marble(config: Config, pos_from: int, pos_to: int, cnt_track: int,
+                overtaking: bool = False) -> Optional[Config]:
+    """
+    Configuration after moving the marble on pos_from forward to pos_to (None if not possible within the table).
+    Marbles in the safe spaces can't be jumped over; with overtaking (SEVEN), no own marble may be passed at all.
+    """
+    if pos_to <= pos_from or pos_to >= cnt_track + CNT_SAFE or pos_to in config:
+        return None
+    for pos in config:
+        if pos_from < pos < pos_to and (overtaking or pos >= cnt_track):
+            return None
+    return tuple(sorted(pos_to if pos == pos_from else pos for pos in config))
+
+
+def get_successors(config: Config, rank: str, cnt_track: int) -> FrozenSet[Config]:
+    """ Configurations after playing a card of a rank (a JKR plays as any other rank) """
+    if rank == 'JKR':
+        return frozenset().union(*(get_successors(config, other, cnt_track) for other in RANKS if other != 'JKR'))
+    if rank == '7':
+        return _get_seven_successors(config, SEVEN_STEPS, cnt_track)
+    successors = set()
+    for value in MOVE_VALUES.get(rank, []):
+        for pos in config:
+            successor = move_marble(config, pos, pos + value, cnt_track)
+            if successor is not None:
+                successors.add(successor)
+    return frozenset(successors)
+
+
+@lru_cache(maxsize=None)
+def _get_seven_successors(config: Config, steps: int, cnt_track: int) -> FrozenSet[Config]:
+    """ Configurations after splitting the remaining steps of a SEVEN among the marbles """
+    if steps == 0:
+        return frozenset([config])
+    successors: set = set()
+    for pos in config:
+        for value in range(1, steps + 1):
+            successor = move_marble(config, pos, pos + value, cnt_track, overtaking=True)
+            if successor is not None:
+                successors |= _get_seven_successors(successor, steps - value, cnt_track)
+    return frozenset(successors)
+
+
+def solve(cnt_track: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Lower bound on the cards per configuration (any rank in every turn) and the best successor per rank """
+    configs = list(combinations(range(cnt_track + CNT_SAFE), CNT_MARBLE))
+    if len(configs) >= NO_SUCCESSOR:
+        raise ValueError(f"Too many configurations for {cnt_track} track fields.")
+    successors = {config: {rank: get_successors(config, rank, cnt_track) for rank in RANKS} for config in configs}
+    predecessors: Dict[Config, List[Config]] = {config: [] for config in configs}
+    for config, by_rank in successors.items():
+        for successor in set().union(*by_rank.values()):
+            predecessors[successor].append(config)
+
+    bounds = np.full(len(configs), VALUE_UNSOLVED, dtype=np.uint8)
+    goal = get_goal(cnt_track)
+    bounds[config_index(goal)] = 0
+    queue = deque([goal])
+    while queue:
+        config = queue.popleft()
+        bound = int(bounds[config_index(config)])
+        for predecessor in predecessors[config]:
+            if bounds[config_index(predecessor)] == VALUE_UNSOLVED and bound + 1 < VALUE_UNSOLVED:
+                bounds[config_index(predecessor)] = bound + 1
+                queue.append(predecessor)
+
+    best = np.full((len(configs), len(RANKS)), NO_SUCCESSOR, dtype=np.uint16)
+    for config, by_rank in successors.items():
+        for rank, options in by_rank.items():
+            if options:
+                best[config_index(config), RANK_INDEX[rank]] = \
+                    min((config_index(option) for option in options), key=lambda idx: (bounds[idx], idx))
+    return bounds, best
+
+
+def generate(path: str, cnt_track: int = DEFAULT_CNT_TRACK) -> None:
+    """ Solve the configurations and write the tablebase file """
+    bounds, best = solve(cnt_track)
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, cnt_track, len(RANKS), len(bounds)))
+        file.write(bounds.tobytes())
+        file.write(best.astype('<u2').tobytes())
+
+
+class Tablebase:
+    """ Memory-mapped tablebase file with O(1) queries for the configurations of a state """
+
+    def __init__(self, path: str) -> None:
+        with open(path, 'rb') as file:
+            self.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, cnt_track, cnt_rank, cnt_config = HEADER.unpack_from(self.mmap, 0)
+        self.cnt_track: int = cnt_track
+        if magic != MAGIC or cnt_rank != len(RANKS):
+            raise ValueError(f"{path} is not a Dog tablebase file.")
+        self.bounds = np.frombuffer(self.mmap, dtype=np.uint8, count=cnt_config, offset=HEADER.size)
+        self.best = np.frombuffer(self.mmap, dtype='<u2', count=cnt_config * cnt_rank,
+                                  offset=HEADER.size + cnt_config).reshape(cnt_config, cnt_rank)
+        self.configs = list(combinations(range(self.cnt_track + CNT_SAFE), CNT_MARBLE))
+        self.configs.sort(key=config_index)
+
+    def close(self) -> None:
+        """ Release the memory map """
+        del self.bounds, self.best
+        self.mmap.close()
+
+    def get_field(self, idx_player: int, pos: int) -> Optional[int]:
+        """ Linear field of a board position for a player (None if outside of the table) """
+        if pos in Dog.SAFE_SPACES[idx_player]:
+            return self.cnt_track + Dog.SAFE_SPACES[idx_player].index(pos)
+        if pos >= Dog.MAIN_TRACK:
+            return None
+        steps_to_start = (Dog.START_POSITIONS[idx_player] - pos) % Dog.MAIN_TRACK
+        return self.cnt_track - 1 - steps_to_start if steps_to_start < self.cnt_track else None
+
+    def get_config(self, state: GameState, idx_player: int) -> Optional[Config]:
+        """ Configuration of a player's marbles (None if a marble is outside of the table) """
+        fields = []
+        for marble in state.list_player[idx_player].list_marble:
+            field = self.get_field(idx_player, marble.pos)
+            if field is None or (marble.is_save and field < self.cnt_track):
+                return None     # a marble which has not yet moved from its start can't enter the safe spaces
+            fields.append(field)
+        return tuple(sorted(fields))
+
+    def get_lower_bound(self, config: Config) -> int:
+        """
+        Optimistic number of cards to bring the marbles of a configuration home (255 if impossible): exact only
+        if a card of the needed rank is held in every turn
+        """
+        return int(self.bounds[config_index(config)])
+
+    def get_best(self, config: Config, rank: str) -> Optional[Config]:
+        """ Best configuration after playing a card of the rank (None if the card can't be played) """
+        idx = int(self.best[config_index(config), RANK_INDEX[rank]])
+        return None if idx == NO_SUCCESSOR else self.configs[idx]
+
+    def _get_action_bound(self, state: GameState, config: Config, action: Action) -> Optional[int]:
+        """ Lower bound of the configuration an action leads to (None if the action leaves the table) """
+        if action.card_swap is not None:
+            best = self.get_best(config, action.card_swap.rank)
+            return None if best is None else self.get_lower_bound(best)
+        if action.pos_from is None or action.pos_to is None:
+            best = self.get_best(config, action.card.rank)    # start of a SEVEN
+            return None if best is None else self.get_lower_bound(best)
+        field_from = self.get_field(state.idx_player_active, action.pos_from)
+        field_to = self.get_field(state.idx_player_active, action.pos_to)
+        if field_from is None or field_to is None or field_from not in config:
+            return None
+        if state.card_active is not None and state.card_active.rank == '7':
+            successor = move_marble(config, field_from, field_to, self.cnt_track, overtaking=True)
+            if successor is None:
+                return None
+            steps = (state.remaining_steps or 0) - (field_to - field_from)
+            options = _get_seven_successors(successor, steps, self.cnt_track) if steps > 0 else {successor}
+            return min((self.get_lower_bound(option) for option in options), default=None)
+        successor = move_marble(config, field_from, field_to, self.cnt_track)
+        return None if successor is None else self.get_lower_bound(successor)
+
+    def select_action(self, state: GameState, actions: List[Action]) -> Optional[Action]:
+        """
+        Action leading to the configuration with the lowest bound, if the active player is in the table. A heuristic
+        for the finish: the bound doesn't account for the cards actually held or drawn later.
+        """
+        config = self.get_config(state, state.idx_player_active)
+        if config is None or self.get_lower_bound(config) in (0, VALUE_UNSOLVED):
+            return None
+        best: Optional[Action] = None
+        best_bound = VALUE_UNSOLVED
+        for action in actions:
+            bound = self._get_action_bound(state, config, action)
+            if bound is not None and bound < best_bound:
+                best, best_bound = action, bound
+        return best
+
+
+if __name__ == '__main__':
+
+    generate(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CNT_TRACK)
@@ -0,0 +1,175 @@
+"""
+Threat map of a Dog position: the fields each player can reach next turn, per number of steps (1 to 13).
+
+The targets of a marble for all step counts are found in one walk along its path (the rules of
+Dog._calculate_new_position: blocked start fields, entering and moving within the safe spaces). The map keeps
+the targets per marble and a bitmask of fields per player and step count. After a move only the marbles
+that moved or have a changed field on their path are walked again, so queries are O(1) bit tests.
+"""
+
+from typing import Dict, List, Optional, Protocol, Set, Tuple
+from server.py.dog_game_state import GameState
+
+MAX_STEPS = 13
+CNT_SAFE = 4
+
+MarbleSnapshot = Tuple[int, bool]   # position, is_save
+
+
+class Board(Protocol):
+    """ Board layout of Dog (the class or a game), without importing dog here """
+    MAIN_TRACK: int
+    START_POSITIONS: Dict[int, int]
+    SAFE_SPACES: Dict[int, List[int]]
+    KENNEL_POSITIONS: Dict[int, List[int]]
+    TEAM_MAPPING: Dict[int, int]
+
+
+class ThreatMap:
+    """ Fields reachable by the marbles of each player with 1 to MAX_STEPS steps, updated incrementally """
+
+    def __init__(self, board: Board) -> None:
+        self.main_track = board.MAIN_TRACK
+        self.start_positions = board.START_POSITIONS
+        self.safe_spaces = board.SAFE_SPACES
+        self.kennel_positions = board.KENNEL_POSITIONS
+        self.start_fields = set(board.START_POSITIONS.values())
+        self.snapshot: List[List[MarbleSnapshot]] = []
+        self.team_mapping = board.TEAM_MAPPING
+        self.marbles: Dict[int, bool] = {}                      # field: is_save of the marble on it
+        self.targets: Dict[Tuple[int, int], List[Optional[int]]] = {}
+        self.masks: List[List[int]] = []                        # player, steps: bitmask of fields
+        self.reach: List[int] = []                              # player: bitmask of fields with any steps
+        self.cnt_walk = 0                                       # number of marbles walked (for tests)
+
+    def update(self, state: GameState) -> None:
+        """ Bring the map up to date with the marbles of the state (walks only the affected marbles) """
+        current = [[(marble.pos, marble.is_save) for marble in player.list_marble] for player in state.list_player]
+        if len(current) != len(self.snapshot):
+            self.snapshot = current
+            self.marbles = {pos: is_save for player in current for pos, is_save in player}
+            self.masks = [[0] * (MAX_STEPS + 1) for _ in current]
+            self.reach = [0] * len(current)
+            affected = {(idx_player, idx_marble) for idx_player, player in enumerate(current)
+                        for idx_marble in range(len(player))}
+        else:
+            changed: Set[int] = set()
+            affected = set()
+            for idx_player, (old, new) in enumerate(zip(self.snapshot, current)):
+                for idx_marble, (marble_old, marble_new) in enumerate(zip(old, new)):
+                    if marble_old != marble_new:
+                        changed.update((marble_old[0], marble_new[0]))
+                        affected.add((idx_player, idx_marble))
+            if not changed:
+                return
+            self.snapshot = current
+            self.marbles = {pos: is_save for player in current for pos, is_save in player}
+            for idx_player, player in enumerate(current):
+                for idx_marble, (pos, _) in enumerate(player):
+                    if self._is_on_path(idx_player, pos, changed):
+                        affected.add((idx_player, idx_marble))
+
+        for idx_player, idx_marble in affected:
+            pos, is_save = current[idx_player][idx_marble]
+            self.targets[(idx_player, idx_marble)] = self._walk(idx_player, pos, is_save)
+        for idx_player in {idx_player for idx_player, _ in affected}:
+            self._update_masks(idx_player, len(current[idx_player]))
+
+    def _is_on_path(self, idx_player: int, pos: int, fields: Set[int]) -> bool:
+        """ Whether one of the fields may change the targets of a marble on pos """
+        if pos in self.kennel_positions[idx_player]:
+            return False
+        if any(field in self.safe_spaces[idx_player] for field in fields):
+            return True
+        if pos >= self.main_track:
+            # Dog checks the start fields up to (pos + steps) % MAIN_TRACK for moves in the safe spaces too
+            return any(field in self.start_fields for field in fields)
+        return any(field < self.main_track and 1 <= (field - pos) % self.main_track <= MAX_STEPS
+                   for field in fields)
+
+    def _is_blocked_start(self, field: int) -> bool:
+        """ Whether a field is a start field with a marble which was moved out of its kennel and not yet moved """
+        return field in self.start_fields and self.marbles.get(field, False)
+
+    def _walk(self, idx_player: int, pos: int, is_save: bool) -> List[Optional[int]]:
+        """ Target field of a marble for 1 to MAX_STEPS steps (None if the move is not possible) """
+        self.cnt_walk += 1
+        targets: List[Optional[int]] = [None] * (MAX_STEPS + 1)
+        safe = self.safe_spaces[idx_player]
+        if pos in self.kennel_positions[idx_player]:
+            return targets
+
+        if pos in safe:
+            idx_safe = safe.index(pos)
+            for steps in range(1, CNT_SAFE - idx_safe):
+                tentative = (pos + steps) % self.main_track
+                if any(field <= tentative and self._is_blocked_start(field) for field in self.start_fields):
+                    break
+                if safe[idx_safe + steps] in self.marbles:
+                    break   # neither jump over nor land on a marble in the safe spaces
+                targets[steps] = safe[idx_safe + steps]
+            return targets
+
+        if pos >= self.main_track:
+            return self._walk_off_track(idx_player, pos, is_save, targets)
+
+        steps_to_start = (self.start_positions[idx_player] - pos) % self.main_track
+        safe_blocked = False
+        for steps in range(1, MAX_STEPS + 1):
+            field = (pos + steps) % self.main_track
+            if self._is_blocked_start(field):
+                break   # blocked start field: neither passed nor reached with more steps
+            if not is_save and steps > steps_to_start:
+                # the path passes the field after the own start: the move ends in the safe spaces
+                steps_into_safe = steps - steps_to_start
+                safe_blocked = (safe_blocked or steps_into_safe > CNT_SAFE
+                                or safe[steps_into_safe - 1] in self.marbles)
+                if not safe_blocked:
+                    targets[steps] = safe[steps_into_safe - 1]
+            else:
+                targets[steps] = field
+        return targets
+
+    def _walk_off_track(self, idx_player: int, pos: int, is_save: bool,
+                        targets: List[Optional[int]]) -> List[Optional[int]]:
+        """ Targets of a marble on a field off the track which is not its own (as Dog computes them) """
+        start = self.start_positions[idx_player]
+        safe = self.safe_spaces[idx_player]
+        for steps in range(1, MAX_STEPS + 1):
+            tentative = (pos + steps) % self.main_track
+            if any(field <= tentative and self._is_blocked_start(field) for field in self.start_fields):
+                break
+            if is_save or start + 1 > tentative:
+                targets[steps] = tentative
+                continue
+            steps_into_safe = steps - (self.main_track - pos + start)
+            if 1 <= steps_into_safe <= CNT_SAFE and not any(field in self.marbles for field in safe[:steps_into_safe]):
+                targets[steps] = safe[steps_into_safe - 1]
+        return targets
+
+    def _update_masks(self, idx_player: int, cnt_marble: int) -> None:
+        masks = [0] * (MAX_STEPS + 1)
+        for idx_marble in range(cnt_marble):
+            for steps, field in enumerate(self.targets[(idx_player, idx_marble)]):
+                if field is not None:
+                    masks[steps] |= 1 << field
+        self.masks[idx_player] = masks
+        reach = 0
+        for mask in masks:
+            reach |= mask
+        self.reach[idx_player] = reach
+
+    def get_mask(self, idx_player: int, steps: int) -> int:
+        """ Bitmask of the fields a player can reach with the given number of steps """
+        return self.masks[idx_player][steps]
+
+    def is_reachable(self, field: int, idx_player: int, steps: Optional[int] = None) -> bool:
+        """ Whether a player can reach the field (with the given number of steps, or any from 1 to 13) """
+        mask = self.reach[idx_player] if steps is None else self.masks[idx_player][steps]
+        return bool(mask >> field & 1)
+
+    def is_threatened(self, field: int, idx_player: int) -> bool:
+        """ Whether an opponent of the player (not the player or its partner) can reach the field """
+        partner = self.team_mapping.get(idx_player)
+        return any(self.reach[idx_other] >> field & 1 for idx_other in range(len(self.reach))
+                   if idx_other not in (idx_player, partner))
@@ -1,12 +1,150 @@
-from typing import List, Any
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
 from abc import ABCMeta, abstractmethod
+from collections import deque
+from contextvars import ContextVar
+import bisect
+import functools
+import os
+import time
 
 GameState = Any
 GameAction = Any
 
+# methods of the games whose calls are recorded by the profiler
+PROFILED_METHODS = ('get_list_action', 'apply_action', 'get_player_view', 'set_state')
+# number of most recent call durations kept per method for the percentiles
+CNT_SAMPLE = 1024
+# upper bounds in seconds of the buckets counting the calls per duration (for histograms)
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+
+class CallStats:
+    """ Calls of a method: count, total wall time, the most recent durations and the count per duration bucket """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.samples: Deque[float] = deque(maxlen=CNT_SAMPLE)
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)    # the last one for calls longer than all bounds
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """ Count, total time in seconds and mean, percentiles (of the recent calls) and max in microseconds """
+        ordered = sorted(self.samples)
+        snapshot: Dict[str, float] = {'count': self.count, 'total_s': round(self.total, 6)}
+        if ordered:
+            snapshot['mean_us'] = round(self.total / self.count * 1e6, 2)
+            for percentile in (50, 90, 99):
+                snapshot[f'p{percentile}_us'] = round(ordered[min(len(ordered) - 1,
+                                                                  len(ordered) * percentile // 100)] * 1e6, 2)
+            snapshot['max_us'] = round(ordered[-1] * 1e6, 2)
+        return snapshot
+
+
+class StepTrace:
+    """ Slowest engine call within a step of a task (e.g. a websocket handler), recorded by the profiler """
+
+    def __init__(self) -> None:
+        self.game: Any = None
+        self.method: Optional[str] = None
+        self.args: Tuple[Any, ...] = ()
+        self.seconds = 0.0
+
+    def reset(self) -> None:
+        self.game, self.method, self.args, self.seconds = None, None, (), 0.0
+
+
+# trace of the running task's current step (None if the task doesn't trace its steps)
+current_step: ContextVar[Optional[StepTrace]] = ContextVar('current_step', default=None)
+
+
+class GameProfiler:
+    """
+    Wall time of the hot-path methods of every game class (per concrete game). When disabled, the classes
+    have their original methods, so there is no overhead at all; enabling replaces them by recording wrappers.
+    Set the environment variable GAME_PROFILING to enable it at start.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.classes: List[type] = []
+        self.originals: Dict[Tuple[type, str], Callable[..., Any]] = {}
+        self.stats: Dict[Tuple[str, str], CallStats] = {}
+
+    def register(self, cls: type) -> None:
+        """ Add a game class (called for every subclass of Game) """
+        self.classes.append(cls)
+        if self.enabled:
+            self._instrument(cls)
+
+    def enable(self) -> None:
+        if not self.enabled:
+            self.enabled = True
+            for cls in self.classes:
+                self._instrument(cls)
+
+    def disable(self) -> None:
+        self.enabled = False
+        for (cls, name), function in self.originals.items():
+            setattr(cls, name, function)
+        self.originals.clear()
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """ Statistics per game class and method, e.g. snapshot()['Dog']['get_list_action']['p90_us'] """
+        snapshot: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for (game, name), stats in sorted(self.stats.items()):
+            snapshot.setdefault(game, {})[name] = stats.snapshot()
+        return snapshot
+
+    def _instrument(self, cls: type) -> None:
+        """ Wrap the profiled methods a class defines itself (inherited ones are recorded by the parent's) """
+        for name in PROFILED_METHODS:
+            function = cls.__dict__.get(name)
+            if function is None or getattr(function, '__isabstractmethod__', False):
+                continue
+            self.originals[(cls, name)] = function
+            setattr(cls, name, self._wrap(function, name))
+
+    def _wrap(self, function: Callable[..., Any], name: str) -> Callable[..., Any]:
+        stats = self.stats
+
+        @functools.wraps(function)
+        def wrapper(game: Any, *args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return function(game, *args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                key = (type(game).__name__, name)
+                if key not in stats:
+                    stats[key] = CallStats()
+                stats[key].add(seconds)
+                trace = current_step.get()
+                if trace is not None and seconds > trace.seconds:
+                    trace.game, trace.method, trace.args, trace.seconds = game, name, args, seconds
+
+        return wrapper
+
+
+profiler = GameProfiler()
+if os.environ.get('GAME_PROFILING'):
+    profiler.enable()
+
 
 class Game(metaclass=ABCMeta):
 
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        profiler.register(cls)
+
     @abstractmethod
     def set_state(self, state: GameState) -> None:
         """ Set the game to a given state """
@@ -23,7 +161,7 @@ class Game(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def get_list_action(self) -> List[GameAction]:
+    def get_list_action(self) -> Sequence[GameAction]:
         """ Get a list of possible actions for the active player """
         pass
 
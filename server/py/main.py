@@ -1,18 +1,37 @@
 from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
 import json
 import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
 
 import server.py.hangman as hangman
 import server.py.battleship as battleship
 import server.py.dog as dog
+import server.py.dog_greedy as dog_greedy
+import server.py.uno as uno
+from server.py.game import profiler
+from server.py.metrics import metered, metrics, monitor_event_loop
 
 import random
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    # engine call latencies and event-loop lag for /metrics
+    profiler.enable()
+    task = asyncio.create_task(monitor_event_loop())
+    yield
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.mount("/inc/static", StaticFiles(directory="server/inc/static"), name="static")
 
@@ -24,6 +43,16 @@ async def get(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return metrics.render()
+
+
+@app.get("/admin/slow-steps")
+async def get_slow_steps():
+    return metrics.get_slow_steps()
+
+
 # ----- Hangman -----
 
 @app.get("/hangman/singleplayer/local/", response_class=HTMLResponse)
@@ -31,6 +60,7 @@ async def hangman_singleplayer(request: Request):
     return templates.TemplateResponse("game/hangman/singleplayer_local.html", {"request": request})
 
 @app.websocket("/hangman/singleplayer/ws")
+@metered("hangman")
 async def hangman_singleplayer_ws(websocket: WebSocket):
     await websocket.accept()
 
@@ -63,6 +93,7 @@ async def hangman_singleplayer_ws(websocket: WebSocket):
             await websocket.send_json(data)
 
             if state.phase == hangman.GamePhase.FINISHED:
+                metrics.record_game_finished('hangman')
                 break
 
             if len(list_action) == 0:
@@ -95,6 +126,7 @@ async def battleship_simulation(request: Request):
 
 
 @app.websocket("/battleship/simulation/ws")
+@metered("battleship")
 async def battleship_simulation_ws(websocket: WebSocket):
     await websocket.accept()
 
@@ -120,6 +152,7 @@ async def battleship_simulation_ws(websocket: WebSocket):
             await websocket.send_json(data)
 
             if state.phase == battleship.GamePhase.FINISHED:
+                metrics.record_game_finished('battleship')
                 break
 
             data = await websocket.receive_json()
@@ -138,6 +171,7 @@ async def battleship_singleplayer(request: Request):
 
 
 @app.websocket("/battleship/singleplayer/ws")
+@metered("battleship")
 async def battleship_singleplayer_ws(websocket: WebSocket):
     await websocket.accept()
 
@@ -146,12 +180,13 @@ async def battleship_singleplayer_ws(websocket: WebSocket):
     try:
 
         game = battleship.Battleship()
-        player = battleship.RandomPlayer()
+        player = battleship.HuntTargetPlayer()
 
         while True:
 
             state = game.get_state()
             if state.phase == battleship.GamePhase.FINISHED:
+                metrics.record_game_finished('battleship')
                 break
 
             #game.print_state()
@@ -210,12 +245,39 @@ async def uno_simulation(request: Request):
 
 
 @app.websocket("/uno/simulation/ws")
+@metered("uno")
 async def uno_simulation_ws(websocket: WebSocket):
     await websocket.accept()
 
+    idx_player_you = 0
+
     try:
+        game = uno.Uno()
+        game.set_state(uno.GameState(cnt_player=4))
+        player = uno.RandomPlayer()
+
+        while True:
 
-        pass
+            state = game.get_state()
+            list_action = game.get_list_action()
+            action = player.select_action(state, list_action)
+
+            dict_state = state.model_dump()
+            dict_state['idx_player_you'] = idx_player_you
+            dict_state['list_action'] = []
+            dict_state['selected_action'] = None if action is None else action.model_dump()
+            data = {'type': 'update', 'state': dict_state}
+            await websocket.send_json(data)
+
+            if state.phase == uno.GamePhase.FINISHED:
+                metrics.record_game_finished('uno')
+                break
+
+            data = await websocket.receive_json()
+
+            if data['type'] == 'action':
+                action = None if data['action'] is None else uno.Action.model_validate(data['action'])
+                game.apply_action(action)
 
     except WebSocketDisconnect:
         print('DISCONNECTED')
@@ -226,25 +288,76 @@ async def uno_singleplayer(request: Request):
     return templates.TemplateResponse("game/uno/singleplayer.html", {"request": request})
 
 
+def uno_dict_batch(game: uno.Uno, list_turn: List[Tuple[int, Optional[uno.Action]]], idx_player_you: int) -> dict:
+    # all bot turns since the last update in one message, the client animates them locally
+    state = game.get_player_view(idx_player_you)
+    dict_state = state.model_dump()
+    dict_state['idx_player_you'] = idx_player_you
+    dict_state['list_action'] = [action.model_dump() for action in game.get_list_action()] \
+        if state.idx_player_active == idx_player_you and state.phase == uno.GamePhase.RUNNING else []
+    list_dict_turn = [{'idx_player': idx_player, 'action': None if action is None else action.model_dump()}
+                      for idx_player, action in list_turn]
+    return {'type': 'batch', 'list_turn': list_dict_turn, 'state': dict_state}
+
+
 @app.websocket("/uno/singleplayer/ws")
+@metered("uno")
 async def uno_singleplayer_ws(websocket: WebSocket):
     await websocket.accept()
 
+    idx_player_you = 0
+
     try:
 
-        pass
+        game = uno.Uno()
+        game.set_state(uno.GameState(cnt_player=4))
+        players = {idx: uno.RandomPlayer() for idx in range(1, 4)}
+
+        # bots may move first, their turns are sent along with the first state
+        await websocket.send_json(uno_dict_batch(game, game.play_turns(players), idx_player_you))
+
+        while game.get_state().phase != uno.GamePhase.FINISHED:
+
+            list_action = game.get_list_action()
+            if len(list_action) == 0:
+                game.apply_action(None)
+            else:
+                data = await websocket.receive_json()
+                if data['type'] != 'action':
+                    continue
+                action = None if data['action'] is None else uno.Action.model_validate(data['action'])
+                game.apply_action(action)
+
+            # no bot turns if you are still active (e.g. after drawing a card)
+            await websocket.send_json(uno_dict_batch(game, game.play_turns(players), idx_player_you))
+
+        metrics.record_game_finished('uno')
 
     except WebSocketDisconnect:
         print('DISCONNECTED')
 
 
 @app.websocket("/uno/random_player/ws")
+@metered("uno")
 async def uno_random_player_ws(websocket: WebSocket):
     await websocket.accept()
 
     try:
 
-        pass
+        game = uno.Uno()
+        game.set_state(uno.GameState(cnt_player=4))
+        players = {idx: uno.RandomPlayer() for idx in range(4)}
+
+        # one batch per seat's turn (e.g. drawing and then playing), awaiting the send in between
+        while game.get_state().phase == uno.GamePhase.RUNNING:
+            idx_player = game.get_state().idx_player_active
+            assert idx_player is not None
+            list_turn = game.play_turns({idx_player: players[idx_player]})
+            data = uno_dict_batch(game, list_turn, 0)
+            data['state'] = game.get_state().model_dump()
+            data['state']['list_action'] = []
+            await websocket.send_json(data)
+        metrics.record_game_finished('uno')
 
     except WebSocketDisconnect:
         print('DISCONNECTED')
@@ -259,6 +372,7 @@ async def dog_simulation(request: Request):
 
 
 @app.websocket("/dog/simulation/ws")
+@metered("dog")
 async def dog_simulation_ws(websocket: WebSocket):
     # accept the websocket connection
     await websocket.accept()
@@ -288,6 +402,7 @@ async def dog_simulation_ws(websocket: WebSocket):
 
             if state.phase == dog.GamePhase.FINISHED:
                 # exit loop if the game is finished
+                metrics.record_game_finished('dog')
                 break
 
             data = await websocket.receive_json()  # receive action from the client
@@ -307,6 +422,7 @@ async def dog_singleplayer(request: Request):
 
 
 @app.websocket("/dog/singleplayer/ws")
+@metered("dog")
 async def dog_singleplayer_ws(websocket: WebSocket):
     # accept the websocket connection
     await websocket.accept()
@@ -315,12 +431,13 @@ async def dog_singleplayer_ws(websocket: WebSocket):
 
     try:
         game = dog.Dog()  # initialize the game
-        player = dog.RandomPlayer()  # initialize a random player
+        player = dog_greedy.GreedyPlayer()  # initialize a greedy player for the bots
 
         while True:
             state = game.get_state()  # get the current game state
             if state.phase == dog.GamePhase.FINISHED:
                 # exit loop if the game is finished
+                metrics.record_game_finished('dog')
                 break
 
             if state.idx_player_active == idx_player_you:
@@ -368,6 +485,7 @@ async def dog_singleplayer_ws(websocket: WebSocket):
 
 
 @app.websocket("/dog/random_player/ws")
+@metered("dog")
 async def dog_random_player_ws(websocket: WebSocket):
     # accept the websocket connection
     await websocket.accept()
@@ -397,6 +515,7 @@ async def dog_random_player_ws(websocket: WebSocket):
 
             if state.phase == dog.GamePhase.FINISHED:
                 # exit loop if the game is finished
+                metrics.record_game_finished('dog')
                 await websocket.send_json({'type': 'update', 'state': dict_state})
                 break
 
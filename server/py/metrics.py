@@ -0,0 +1,258 @@
+"""
+Metrics of the game server, exported in the Prometheus text format on /metrics.
+
+- open websockets, messages and bytes sent and received per game (MeteredWebSocket, the metered decorator)
+- engine call latencies per game and method (histograms from the game profiler)
+- event-loop lag (measured by a background task)
+- finished games, in total and within the last minute
+- slow steps: a handler runs between two awaits without giving the event loop to any other socket; a step longer
+  than the threshold is kept (with its game, phase and card) in a ring buffer shown on /admin/slow-steps
+
+All updates happen on the event loop thread, so the counters are plain integers without any lock; the hot path
+only pays an addition per message (and the length of the JSON text it serializes anyway).
+"""
+
+import asyncio
+import functools
+import json
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Coroutine, Deque, Dict, Generator, List, Optional
+from fastapi import WebSocket
+from pydantic import BaseModel
+from server.py.game import LATENCY_BUCKETS, GameProfiler, StepTrace, current_step, profiler
+
+LAG_INTERVAL = 0.5          # seconds between two measurements of the event-loop lag
+FINISHED_WINDOW = 60.0      # seconds of finished games counted for the rate
+MAX_FINISHED = 10000        # finished games kept for the rate (per game)
+SLOW_STEP_THRESHOLD = 0.05  # seconds a handler may block the event loop before its step is recorded
+MAX_SLOW_STEPS = 200        # slow steps kept in the ring buffer
+
+
+class SlowStep(BaseModel):
+    time: float                         # end of the step (seconds since the epoch)
+    game: str                           # game of the websocket handler
+    seconds: float                      # duration of the step
+    engine: Optional[str] = None        # game class of the slowest engine call (if the profiler is enabled)
+    method: Optional[str] = None        # slowest engine call
+    engine_seconds: float = 0.0         # duration of the slowest engine call
+    phase: Optional[str] = None         # phase of the game after the step
+    card: Optional[str] = None          # card of the action applied (or the active card of the state)
+
+
+def describe_card(card: Any) -> Optional[str]:
+    """ Short text of a card (e.g. "♠7" for Dog, "red 5" for Uno) """
+    if card is None:
+        return None
+    if hasattr(card, 'suit') and hasattr(card, 'rank'):
+        return f"{card.suit}{card.rank}"
+    if hasattr(card, 'model_dump'):
+        return ' '.join(str(value) for value in card.model_dump().values() if value is not None)
+    return str(card)
+
+
+def describe_step(game: str, seconds: float, trace: StepTrace) -> SlowStep:
+    """ Slow step with the phase and card of its slowest engine call """
+    step = SlowStep(time=time.time(), game=game, seconds=round(seconds, 6))
+    if trace.game is None:
+        return step
+    step.engine = type(trace.game).__name__
+    step.method = trace.method
+    step.engine_seconds = round(trace.seconds, 6)
+    try:
+        state = trace.game.get_state()
+    except Exception:  # pylint: disable=broad-exception-caught
+        state = None    # e.g. a game without a state yet
+    phase = getattr(state, 'phase', None)
+    step.phase = None if phase is None else str(getattr(phase, 'value', phase))
+    action = trace.args[0] if trace.args else None
+    step.card = describe_card(getattr(action, 'card', None) or getattr(state, 'card_active', None))
+    return step
+
+
+class Metrics:
+    """ Counters of the server (one instance per process) """
+
+    def __init__(self, slow_threshold: float = SLOW_STEP_THRESHOLD) -> None:
+        self.websockets_active: Counter[str] = Counter()
+        self.messages_sent: Counter[str] = Counter()
+        self.messages_received: Counter[str] = Counter()
+        self.bytes_sent: Counter[str] = Counter()
+        self.bytes_received: Counter[str] = Counter()
+        self.games_finished: Counter[str] = Counter()
+        self.finished_times: Dict[str, Deque[float]] = {}
+        self.loop_lag = 0.0
+        self.loop_lag_max = 0.0
+        self.slow_threshold = slow_threshold
+        self.slow_steps: Deque[SlowStep] = deque(maxlen=MAX_SLOW_STEPS)
+        self.slow_steps_total: Counter[str] = Counter()
+
+    def record_sent(self, game: str, cnt_byte: int) -> None:
+        self.messages_sent[game] += 1
+        self.bytes_sent[game] += cnt_byte
+
+    def record_received(self, game: str, cnt_byte: int) -> None:
+        self.messages_received[game] += 1
+        self.bytes_received[game] += cnt_byte
+
+    def record_game_finished(self, game: str) -> None:
+        self.games_finished[game] += 1
+        self.finished_times.setdefault(game, deque(maxlen=MAX_FINISHED)).append(time.monotonic())
+
+    def record_loop_lag(self, lag: float) -> None:
+        self.loop_lag = lag
+        self.loop_lag_max = max(self.loop_lag_max, lag)
+
+    def record_step(self, game: str, seconds: float, trace: StepTrace) -> None:
+        if seconds > self.slow_threshold:
+            self.slow_steps_total[game] += 1
+            self.slow_steps.append(describe_step(game, seconds, trace))
+
+    def get_slow_steps(self) -> Dict[str, Any]:
+        """ Event-loop lag and the recorded slow steps (newest first) """
+        return {
+            'threshold': self.slow_threshold,
+            'loop_lag': round(self.loop_lag, 6),
+            'loop_lag_max': round(self.loop_lag_max, 6),
+            'slow_steps_total': dict(self.slow_steps_total),
+            'slow_steps': [step.model_dump() for step in reversed(self.slow_steps)],
+        }
+
+    def get_finished_per_minute(self, game: str, now: Optional[float] = None) -> int:
+        """ Number of games finished within the last minute """
+        times = self.finished_times.get(game)
+        if not times:
+            return 0
+        now = time.monotonic() if now is None else now
+        while times and times[0] < now - FINISHED_WINDOW:
+            times.popleft()
+        return len(times)
+
+    def render(self, game_profiler: GameProfiler = profiler) -> str:
+        """ All metrics in the Prometheus text exposition format """
+        lines: List[str] = []
+
+        def add(name: str, kind: str, description: str, values: Dict[str, float]) -> None:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f'{name}{{game="{game}"}} {value}' for game, value in sorted(values.items()))
+
+        def add_gauge(name: str, description: str, value: float) -> None:
+            lines.extend([f"# HELP {name} {description}", f"# TYPE {name} gauge", f"{name} {value}"])
+
+        add('game_server_websockets_active', 'gauge', 'Open websockets.', dict(self.websockets_active))
+        add('game_server_messages_sent_total', 'counter', 'Websocket messages sent.', dict(self.messages_sent))
+        add('game_server_messages_received_total', 'counter', 'Websocket messages received.',
+            dict(self.messages_received))
+        add('game_server_bytes_sent_total', 'counter', 'Bytes of serialized messages sent.', dict(self.bytes_sent))
+        add('game_server_bytes_received_total', 'counter', 'Bytes of messages received.', dict(self.bytes_received))
+        add('game_server_games_finished_total', 'counter', 'Games played to the end.', dict(self.games_finished))
+        add('game_server_games_finished_per_minute', 'gauge', 'Games finished within the last minute.',
+            {game: self.get_finished_per_minute(game) for game in self.finished_times})
+        add('game_server_slow_steps_total', 'counter', 'Handler steps which blocked the event loop too long.',
+            dict(self.slow_steps_total))
+        add_gauge('game_server_event_loop_lag_seconds', 'Last measured delay of the event loop.',
+                  round(self.loop_lag, 6))
+        add_gauge('game_server_event_loop_lag_max_seconds', 'Largest measured delay of the event loop.',
+                  round(self.loop_lag_max, 6))
+
+        name = 'game_server_engine_call_seconds'
+        lines.append(f"# HELP {name} Duration of the engine calls.")
+        lines.append(f"# TYPE {name} histogram")
+        for (game, method), stats in sorted(game_profiler.stats.items()):
+            labels = f'game="{game}",method="{method}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {stats.count}')
+            lines.append(f'{name}_sum{{{labels}}} {round(stats.total, 6)}')
+            lines.append(f'{name}_count{{{labels}}} {stats.count}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+class MeteredWebSocket:
+    """ Websocket of a game which counts the messages and bytes it sends and receives """
+
+    def __init__(self, websocket: WebSocket, game: str, target: Metrics = metrics) -> None:
+        self.websocket = websocket
+        self.game = game
+        self.metrics = target
+
+    async def accept(self) -> None:
+        await self.websocket.accept()
+
+    async def send_json(self, data: Any) -> None:
+        # serialized as WebSocket.send_json does it, to count the bytes
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self.metrics.record_sent(self.game, len(text.encode('utf-8')))
+        await self.websocket.send_text(text)
+
+    async def receive_json(self) -> Any:
+        text = await self.websocket.receive_text()
+        self.metrics.record_received(self.game, len(text.encode('utf-8')))
+        return json.loads(text)
+
+
+Handler = Callable[..., Coroutine[Any, Any, None]]    # websocket handler of the server
+
+
+class StepTimer:
+    """
+    Awaitable which runs a coroutine step by step (as a task does) and times each step, i.e. the code between
+    two awaits which gave the event loop to other sockets. The profiler records the slowest engine call of the
+    step in the trace of the task.
+    """
+
+    def __init__(self, coroutine: Coroutine[Any, Any, Any], game: str, target: Metrics) -> None:
+        self.coroutine = coroutine
+        self.game = game
+        self.metrics = target
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        trace = StepTrace()
+        current_step.set(trace)
+        value: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            trace.reset()
+            start = time.perf_counter()
+            try:
+                future = self.coroutine.send(value) if error is None else self.coroutine.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.metrics.record_step(self.game, time.perf_counter() - start, trace)
+            try:
+                value, error = (yield future), None
+            except BaseException as thrown:  # pylint: disable=broad-exception-caught
+                value, error = None, thrown     # e.g. the cancellation of the task, passed on to the handler
+
+
+def metered(game: str, target: Metrics = metrics) -> Callable[[Handler], Handler]:
+    """ Decorator of a websocket handler: counts it as open while it runs, meters its websocket and times its steps """
+
+    def decorator(handler: Handler) -> Handler:
+
+        @functools.wraps(handler)
+        async def wrapper(websocket: WebSocket) -> None:
+            target.websockets_active[game] += 1
+            try:
+                await StepTimer(handler(MeteredWebSocket(websocket, game, target)), game, target)
+            finally:
+                target.websockets_active[game] -= 1
+
+        return wrapper
+
+    return decorator
+
+
+async def monitor_event_loop(target: Metrics = metrics, interval: float = LAG_INTERVAL) -> None:
+    """ Measure how much later than requested the event loop wakes up this task (runs until cancelled) """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        target.record_loop_lag(max(0.0, time.perf_counter() - start - interval))
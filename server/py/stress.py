@@ -0,0 +1,238 @@
+"""
+Stress runner which drives complete random games through the game engines.
+
+A game is played by the engine's RandomPlayer on the global random generator seeded with the game's seed, so a
+game is given by its seed and the indices of the chosen actions (its log). After every action cheap invariants
+of the state are checked (no card lost or duplicated, no two marbles on a field, ...); a game which is not
+finished after a number of actions is reported as stuck. A failing log is minimized (choices are replaced by
+the first legal action while the same failure still occurs) and saved as JSON, to be re-run with replay().
+The games are played in parallel processes. Run it with: python -m server.py.stress <engine> [games] [dir]
+"""
+
+import argparse
+import concurrent.futures
+import contextlib
+import os
+import random
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from pydantic import BaseModel
+from server.py.game import Game, Player
+from server.py import battleship, dog, dog_game_state, hangman, uno
+
+MAX_ACTIONS = 5000
+MAX_REPLAYS = 50
+HANGMAN_WORDS = ['apple', 'benchmark', 'kennel', 'marble', 'python', 'server']
+
+
+class InvariantError(Exception):
+    """ A state which breaks a rule every state of the game must follow """
+
+
+class GameStuckError(Exception):
+    """ A game which is not finished after the maximal number of actions (e.g. a loop without progress) """
+
+
+class GameLog(BaseModel):
+    engine: str                     # name of the engine in ENGINES
+    seed: int                       # seed of the global random generator at the start of the game
+    choices: List[int] = []         # index of the chosen action per step (-1 for no action)
+    step: Optional[int] = None      # step of the failure
+    error: Optional[str] = None     # failure ("<exception type>: <message>")
+
+    def get_kind(self) -> Optional[str]:
+        """ Type of the failure (a minimized log must fail the same way) """
+        return None if self.error is None else self.error.split(':')[0]
+
+
+def check_dog(game: dog.Dog) -> None:
+    state = game.get_state()
+    cards = state.list_card_draw + state.list_card_discard + [card for player in state.list_player
+                                                             for card in player.list_card]
+    if len(cards) != len(dog_game_state.GameState.LIST_CARD):
+        raise InvariantError(f"{len(cards)} cards instead of {len(dog_game_state.GameState.LIST_CARD)}")
+    fields: Dict[int, int] = {}
+    for idx_player, player in enumerate(state.list_player):
+        for marble in player.list_marble:
+            if not 0 <= marble.pos < dog.Dog.BOARD_SIZE:
+                raise InvariantError(f"marble of player {idx_player} on field {marble.pos}")
+            if marble.pos in fields:
+                raise InvariantError(f"marbles of players {fields[marble.pos]} and {idx_player} "
+                                     f"on field {marble.pos}")
+            fields[marble.pos] = idx_player
+
+
+def check_uno(game: uno.Uno) -> None:
+    state = game.get_state()
+    cards = (state.list_card_draw or []) + (state.list_card_discard or []) + \
+        [card for player in state.list_player for card in player.list_card]
+    counts = Counter((card.color, card.number, card.symbol) for card in cards)
+    if counts != Counter((card.color, card.number, card.symbol) for card in uno.GameState.LIST_CARD):
+        raise InvariantError(f"{len(cards)} cards which are not the deck of {len(uno.GameState.LIST_CARD)}")
+
+
+def check_hangman(game: hangman.Hangman) -> None:
+    state = game.get_state()
+    if len(set(state.guesses)) != len(state.guesses):
+        raise InvariantError(f"letter guessed twice in {state.guesses}")
+    if not set(state.incorrect_guesses) <= set(state.guesses):
+        raise InvariantError(f"incorrect guesses {state.incorrect_guesses} not in {state.guesses}")
+
+
+def check_battleship(game: battleship.Battleship) -> None:
+    state = game.get_state()
+    for player in state.players:
+        if len(set(player.shots)) != len(player.shots):
+            raise InvariantError(f"{player.name} shot a cell twice")
+        if not set(player.successful_shots) <= set(player.shots):
+            raise InvariantError(f"hits of {player.name} which are no shots")
+    if (state.winner is not None) != (state.phase == battleship.GamePhase.FINISHED):
+        raise InvariantError(f"winner {state.winner} in phase {state.phase}")
+
+
+def new_uno() -> uno.Uno:
+    game = uno.Uno()
+    game.set_state(uno.GameState(cnt_player=4))
+    return game
+
+
+def new_hangman() -> hangman.Hangman:
+    game = hangman.Hangman()
+    game.set_state(hangman.HangmanGameState(word_to_guess=random.choice(HANGMAN_WORDS),
+                                            phase=hangman.GamePhase.RUNNING))
+    return game
+
+
+class Engine:
+    """ How to start a game of an engine, its random player and the invariants of its states """
+
+    def __init__(self, new_game: Callable[[], Game], new_player: Callable[[], Player],
+                 check: Callable[[Any], None]) -> None:
+        self.new_game = new_game
+        self.new_player = new_player
+        self.check = check
+
+
+ENGINES: Dict[str, Engine] = {
+    'dog': Engine(dog.Dog, dog.RandomPlayer, check_dog),
+    'uno': Engine(new_uno, uno.RandomPlayer, check_uno),
+    'hangman': Engine(new_hangman, hangman.RandomPlayer, check_hangman),
+    'battleship': Engine(battleship.Battleship, battleship.RandomPlayer, check_battleship),
+}
+
+
+def play(name: str, seed: int, choices: Optional[List[int]] = None, check: bool = True,  # pylint: disable=too-many-arguments
+         max_actions: int = MAX_ACTIONS, raise_errors: bool = False) -> Tuple[Game, GameLog]:
+    """
+    Play a game to its end (or its first failure) and return the game with its log. Without choices, the
+    random player chooses the actions; with choices, these are played (an index is taken modulo the number of
+    actions) and the game stops after the last one. The player is asked for every action in both cases, so the
+    random generator is used in the same way when a log is replayed.
+    """
+    engine = ENGINES[name]
+    random.seed(seed)
+    log = GameLog(engine=name, seed=seed)
+    game = engine.new_game()
+    player = engine.new_player()
+    step = 0
+    try:
+        while game.get_state().phase != 'finished':
+            if step >= max_actions:
+                raise GameStuckError(f"game not finished after {max_actions} actions")
+            if choices is not None and step >= len(choices):
+                return game, log
+            actions: Any = game.get_list_action()    # a list or a sequence (e.g. Battleship's ActionSpace)
+            action = player.select_action(game.get_state(), actions)
+            if choices is not None:
+                idx_action = choices[step] % len(actions) if choices[step] >= 0 and actions else -1
+                action = None if idx_action < 0 else actions[idx_action]
+            else:
+                idx_action = -1 if action is None else actions.index(action)
+            log.choices.append(idx_action)
+            game.apply_action(action)
+            if check:
+                engine.check(game)
+            step += 1
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        if raise_errors:
+            raise
+        log.step = step
+        log.error = f"{type(error).__name__}: {error}"
+    return game, log
+
+
+def replay(log: GameLog, check: bool = True) -> Game:
+    """ Game after the actions of a log (raises the failure of the log, if it occurs again) """
+    max_actions = len(log.choices) if log.get_kind() == GameStuckError.__name__ else MAX_ACTIONS
+    game, _ = play(log.engine, log.seed, log.choices, check=check, max_actions=max_actions, raise_errors=True)
+    return game
+
+
+def minimize(log: GameLog, max_replays: int = MAX_REPLAYS) -> GameLog:
+    """
+    Shorter and simpler log with the same kind of failure: ranges of choices (halving in size) are replaced by
+    the first legal action, and the log is cut after the step where the failure now occurs.
+    """
+    kind = log.get_kind()
+    if kind in (None, GameStuckError.__name__) or log.step is None:
+        return log  # a stuck game is only reproduced by all of its actions
+    best = log
+    cnt_replay = 0
+    size = max(1, len(best.choices) // 2)
+    while size >= 1 and cnt_replay < max_replays:
+        start = 0
+        while start < len(best.choices) and cnt_replay < max_replays:
+            choices = best.choices[:start] + [0] * len(best.choices[start:start + size]) + \
+                best.choices[start + size:]
+            if choices != best.choices:
+                cnt_replay += 1
+                _, candidate = play(log.engine, log.seed, choices, max_actions=len(log.choices))
+                if candidate.get_kind() == kind and candidate.step is not None:
+                    candidate.choices = candidate.choices[:candidate.step + 1]
+                    best = candidate
+            start += size
+        size //= 2
+    return best
+
+
+def _run_game(name: str, seed: int, check: bool, max_actions: int) -> Optional[GameLog]:
+    """ Play a game in a worker process (without the output of the engine) and return its minimized failure """
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        _, log = play(name, seed, check=check, max_actions=max_actions)
+        return None if log.error is None else minimize(log)
+
+
+def run(name: str, seeds: Iterable[int], check: bool = True, max_actions: int = MAX_ACTIONS,  # pylint: disable=too-many-arguments
+        workers: Optional[int] = None, path: Optional[str] = None) -> List[GameLog]:
+    """
+    Play a game per seed in parallel processes and return the (minimized) logs of the failing games, saved as
+    <engine>_<seed>.json in the directory path if given. Without checks, only exceptions and stuck games fail.
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_game, name, seed, check, max_actions) for seed in seeds]
+        failures = [log for log in (future.result() for future in futures) if log is not None]
+    if path is not None:
+        os.makedirs(path, exist_ok=True)
+        for log in failures:
+            with open(os.path.join(path, f"{log.engine}_{log.seed}.json"), 'w', encoding='utf-8') as file:
+                file.write(log.model_dump_json())
+    return failures
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="Play random games and report the failing ones.")
+    parser.add_argument('engine', choices=sorted(ENGINES))
+    parser.add_argument('games', type=int, nargs='?', default=100)
+    parser.add_argument('path', nargs='?', default='stress_failures')
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first game")
+    parser.add_argument('--no-check', action='store_true', help="don't check the invariants after every action")
+    parser.add_argument('--max-actions', type=int, default=MAX_ACTIONS)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    list_failure = run(args.engine, range(args.seed, args.seed + args.games), check=not args.no_check,
+                       max_actions=args.max_actions, workers=args.workers, path=args.path)
+    for failure in list_failure:
+        print(f"seed {failure.seed}, step {failure.step} of {len(failure.choices)}: {failure.error}")
+    print(f"{len(list_failure)} of {args.games} games failed")
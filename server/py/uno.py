@@ -1,8 +1,15 @@
-from server.py.game import Game, Player
-from typing import List, Optional
-from pydantic import BaseModel
+"""
+Uno game implementation with player actions and game state management.
+This module provides the Uno engine for N players (set through set_state) and a random player.
+"""
+# pylint: disable=too-many-branches
+
+from typing import ClassVar, Dict, List, Mapping, Optional, Tuple
 from enum import Enum
 import random
+from pydantic import BaseModel
+from server.py.game import Game, Player
+from server.py.determinization import HiddenCardSampler
 
 
 class Card(BaseModel):
@@ -17,6 +24,10 @@ class Action(BaseModel):
     draw: Optional[int] = None   # the number of cards to draw for the next player
     uno: bool = False            # true to announce "UNO" with the second last card
 
+    def __lt__(self, other: "Action") -> bool:
+        """ Order actions (e.g. to compare sorted lists of actions) """
+        return str(self) < str(other)
+
 
 class PlayerState(BaseModel):
     name: Optional[str] = None  # name of player
@@ -29,91 +40,362 @@ class GamePhase(str, Enum):
     FINISHED = 'finished'      # when the game is finished
 
 
+def build_deck() -> List[Card]:
+    """ Build the 108 cards of an Uno deck """
+    colors = ['red', 'green', 'yellow', 'blue']
+    deck = [Card(color=color, number=0) for color in colors]
+    deck += [Card(color=color, number=number) for _ in range(2) for number in range(1, 10) for color in colors]
+    deck += [Card(color=color, symbol=symbol)
+             for symbol in ['skip', 'reverse', 'draw2'] for _ in range(2) for color in colors]
+    deck += [Card(color='any', symbol=symbol) for symbol in ['wild', 'wilddraw4'] for _ in range(4)]
+    return deck
+
+
 class GameState(BaseModel):
     # numbers of cards for each player to start with
-    CNT_HAND_CARDS: int = 7
+    CNT_HAND_CARDS: ClassVar[int] = 7
     # any = for wild cards
-    LIST_COLOR: List[str] = ['red', 'green', 'yellow', 'blue', 'any']
+    LIST_COLOR: ClassVar[List[str]] = ['red', 'green', 'yellow', 'blue', 'any']
     # draw2 = draw two cards, wild = chose color, wilddraw4 = chose color and draw 4
-    LIST_SYMBOL: List[str] = ['skip', 'reverse', 'draw2', 'wild', 'wilddraw4']
-    LIST_CARD: List[Card] = [
-        Card(color='red', number=0), Card(color='green', number=0), Card(color='yellow', number=0), Card(color='blue', number=0),
-        Card(color='red', number=1), Card(color='green', number=1), Card(color='yellow', number=1), Card(color='blue', number=1),
-        Card(color='red', number=2), Card(color='green', number=2), Card(color='yellow', number=2), Card(color='blue', number=2),
-        Card(color='red', number=3), Card(color='green', number=3), Card(color='yellow', number=3), Card(color='blue', number=3),
-        Card(color='red', number=4), Card(color='green', number=4), Card(color='yellow', number=4), Card(color='blue', number=4),
-        Card(color='red', number=5), Card(color='green', number=5), Card(color='yellow', number=5), Card(color='blue', number=5),
-        Card(color='red', number=6), Card(color='green', number=6), Card(color='yellow', number=6), Card(color='blue', number=6),
-        Card(color='red', number=7), Card(color='green', number=7), Card(color='yellow', number=7), Card(color='blue', number=7),
-        Card(color='red', number=8), Card(color='green', number=8), Card(color='yellow', number=8), Card(color='blue', number=8),
-        Card(color='red', number=9), Card(color='green', number=9), Card(color='yellow', number=9), Card(color='blue', number=9),
-        Card(color='red', number=1), Card(color='green', number=1), Card(color='yellow', number=1), Card(color='blue', number=1),
-        Card(color='red', number=2), Card(color='green', number=2), Card(color='yellow', number=2), Card(color='blue', number=2),
-        Card(color='red', number=3), Card(color='green', number=3), Card(color='yellow', number=3), Card(color='blue', number=3),
-        Card(color='red', number=4), Card(color='green', number=4), Card(color='yellow', number=4), Card(color='blue', number=4),
-        Card(color='red', number=5), Card(color='green', number=5), Card(color='yellow', number=5), Card(color='blue', number=5),
-        Card(color='red', number=6), Card(color='green', number=6), Card(color='yellow', number=6), Card(color='blue', number=6),
-        Card(color='red', number=7), Card(color='green', number=7), Card(color='yellow', number=7), Card(color='blue', number=7),
-        Card(color='red', number=8), Card(color='green', number=8), Card(color='yellow', number=8), Card(color='blue', number=8),
-        Card(color='red', number=9), Card(color='green', number=9), Card(color='yellow', number=9), Card(color='blue', number=9),
-        # skip next player
-        Card(color='red', symbol='skip'), Card(color='green', symbol='skip'), Card(color='yellow', symbol='skip'), Card(color='blue', symbol='skip'),
-        Card(color='red', symbol='skip'), Card(color='green', symbol='skip'), Card(color='yellow', symbol='skip'), Card(color='blue', symbol='skip'),
-        # revers playing direction
-        Card(color='red', symbol='reverse'), Card(color='green', symbol='reverse'), Card(color='yellow', symbol='reverse'), Card(color='blue', symbol='reverse'),
-        Card(color='red', symbol='reverse'), Card(color='green', symbol='reverse'), Card(color='yellow', symbol='reverse'), Card(color='blue', symbol='reverse'),
-        # next player must draw 2 cards
-        Card(color='red', symbol='draw2'), Card(color='green', symbol='draw2'), Card(color='yellow', symbol='draw2'), Card(color='blue', symbol='draw2'),
-        Card(color='red', symbol='draw2'), Card(color='green', symbol='draw2'), Card(color='yellow', symbol='draw2'), Card(color='blue', symbol='draw2'),
-        # current player choses color for next player to play
-        Card(color='any', symbol='wild'), Card(color='any', symbol='wild'),
-        Card(color='any', symbol='wild'), Card(color='any', symbol='wild'),
-        # current player choses color for next player to play and next player must draw 4 cards
-        Card(color='any', symbol='wilddraw4'), Card(color='any', symbol='wilddraw4'),
-        Card(color='any', symbol='wilddraw4'), Card(color='any', symbol='wilddraw4'),
-    ]
-
-    list_card_draw: Optional[List[Card]]     # list of cards to draw
-    list_card_discard: Optional[List[Card]]  # list of cards discarded
-    list_player: List[PlayerState]           # list of player-states
-    phase: GamePhase                         # the current game-phase ("setup"|"running"|"finished")
-    cnt_player: int                          # number of players N (to be set in the phase "setup")
-    idx_player_active: Optional[int]         # the index (0 to N-1) of active player
-    direction: int                           # direction of the game, +1 to the left, -1 to right
-    color: str                               # active color (last card played or the chosen color after a wild cards)
-    cnt_to_draw: int                         # accumulated number of cards to draw for the next player
-    has_drawn: bool                          # flag to indicate if the last player has alreay drawn cards or not
+    LIST_SYMBOL: ClassVar[List[str]] = ['skip', 'reverse', 'draw2', 'wild', 'wilddraw4']
+    # 4x number 0, 8x each number 1-9, 8x skip, reverse and draw2, 4x wild and wilddraw4
+    LIST_CARD: ClassVar[List[Card]] = build_deck()
+
+    list_card_draw: Optional[List[Card]] = None     # list of cards to draw
+    list_card_discard: Optional[List[Card]] = None  # list of cards discarded
+    list_player: List[PlayerState] = []             # list of player-states
+    phase: GamePhase = GamePhase.SETUP              # the current game-phase ("setup"|"running"|"finished")
+    cnt_player: int = 1                             # number of players N (to be set in the phase "setup")
+    idx_player_active: Optional[int] = None         # the index (0 to N-1) of active player
+    direction: int = 1                              # direction of the game, +1 to the left, -1 to right
+    color: str = 'any'                              # active color (last card played or chosen for a wild card)
+    cnt_to_draw: int = 0                            # accumulated number of cards to draw for the next player
+    has_drawn: bool = False                         # flag to indicate if the last player has alreay drawn cards or not
+
+
+CardKey = Tuple[Optional[str], Optional[int], Optional[str]]
+
+# Face-down card shown instead of hidden cards in the player view
+CARD_HIDDEN = Card(symbol='back')
+
+
+def card_key(card: Card) -> CardKey:
+    """ Hashable identity of a card (cards with the same key are interchangeable) """
+    return card.color, card.number, card.symbol
+
+
+class HandIndex:
+    """
+    Multisets of a player's hand by color, by number and by symbol, kept up to date card by card.
+    Each category maps a card key to its count, so the playable cards for a discard pile card and the
+    "no card of the active color" check for wilddraw4 are looked up per category instead of per card.
+    """
+    def __init__(self, cards: List[Card]) -> None:
+        self.cards = cards
+        self.size = 0
+        self.card_of_key: Dict[CardKey, Card] = {}
+        self.by_color: Dict[Optional[str], Dict[CardKey, int]] = {}
+        self.by_number: Dict[int, Dict[CardKey, int]] = {}
+        self.by_symbol: Dict[str, Dict[CardKey, int]] = {}
+        for card in cards:
+            self.add(card)
+
+    def is_in_sync(self, player: PlayerState) -> bool:
+        """ Check that the index still describes the hand of the given player record """
+        return self.cards is player.list_card and self.size == len(player.list_card)
+
+    def _categories(self, card: Card) -> List[Dict[CardKey, int]]:
+        """ Get the multisets the given card belongs to (created on demand) """
+        categories = [self.by_color.setdefault(card.color, {})]
+        if card.number is not None:
+            categories.append(self.by_number.setdefault(card.number, {}))
+        if card.symbol is not None:
+            categories.append(self.by_symbol.setdefault(card.symbol, {}))
+        return categories
+
+    def add(self, card: Card) -> None:
+        """ Count a card added to the hand """
+        key = card_key(card)
+        self.card_of_key.setdefault(key, card)
+        for category in self._categories(card):
+            category[key] = category.get(key, 0) + 1
+        self.size += 1
+
+    def remove(self, card: Card) -> None:
+        """ Uncount a card removed from the hand """
+        key = card_key(card)
+        for category in self._categories(card):
+            if category[key] == 1:
+                del category[key]
+            else:
+                category[key] -= 1
+        self.size -= 1
+
+    def get_playable(self, color: str, top: Card, cnt_to_draw: int) -> List[Card]:
+        """ Get the distinct cards that may be played on the top card with the given active color """
+        playable: Dict[CardKey, int] = {}
+        if cnt_to_draw > 0:
+            # cards to draw are pending: only stack another draw card
+            if top.symbol == 'draw2':
+                playable.update(self.by_symbol.get('draw2', {}))
+        elif color == 'any':
+            for cards in self.by_color.values():
+                playable.update(cards)
+        else:
+            playable.update(self.by_color.get(color, {}))
+            if top.number is not None:
+                playable.update(self.by_number.get(top.number, {}))
+            if top.symbol is not None and top.symbol not in ('wild', 'wilddraw4'):
+                playable.update(self.by_symbol.get(top.symbol, {}))
+            playable.update(self.by_symbol.get('wild', {}))
+        # wilddraw4 may only be played if the hand holds no card of the active color
+        if not self.by_color.get(color):
+            playable.update(self.by_symbol.get('wilddraw4', {}))
+        else:
+            for key in self.by_symbol.get('wilddraw4', {}):
+                playable.pop(key, None)
+        return [self.card_of_key[key] for key in playable]
 
 
 class Uno(Game):
 
     def __init__(self) -> None:
         """ Important: Game initialization also requires a set_state call to set the number of players """
-        pass
+        self.state: Optional[GameState] = None
+        self._hands: Dict[int, HandIndex] = {}
 
     def set_state(self, state: GameState) -> None:
-        """ Set the game to a given state """
-        pass
+        """ Set the game to a given state (a state in phase "setup" is dealt and started) """
+        self.state = state
+        if state.phase == GamePhase.SETUP:
+            self._setup()
+
+    def _setup(self) -> None:
+        """ Deal the hands, turn the first card of the discard pile and apply its effect """
+        assert self.state is not None
+        state = self.state
+
+        if state.list_card_draw is None:
+            state.list_card_draw = list(GameState.LIST_CARD)
+            random.shuffle(state.list_card_draw)
+        if state.list_card_discard is None:
+            state.list_card_discard = []
+        if len(state.list_player) != state.cnt_player:
+            state.list_player = [PlayerState(name=f"Player {idx + 1}") for idx in range(state.cnt_player)]
+        for player in state.list_player:
+            player.list_card = [state.list_card_draw.pop() for _ in range(GameState.CNT_HAND_CARDS)]
+        if state.idx_player_active is None:
+            state.idx_player_active = random.randrange(state.cnt_player)
+
+        # a wilddraw4 can't be the first card: put it back at the bottom of the draw pile
+        card = state.list_card_draw.pop()
+        for _ in range(len(state.list_card_draw)):
+            if card.symbol != 'wilddraw4':
+                break
+            state.list_card_draw.insert(0, card)
+            card = state.list_card_draw.pop()
+        state.list_card_discard.append(card)
+        state.color = card.color or 'any'
+
+        if card.symbol == 'draw2':
+            state.cnt_to_draw = 2
+        elif card.symbol == 'reverse':
+            state.direction = -state.direction
+        elif card.symbol == 'skip':
+            state.idx_player_active = self._get_idx_player_next(1)
+
+        state.phase = GamePhase.RUNNING
 
     def get_state(self) -> GameState:
         """ Get the complete, unmasked game state """
-        pass
+        assert self.state is not None
+        return self.state
 
     def print_state(self) -> None:
         """ Print the current game state """
-        pass
+        assert self.state is not None
+        state = self.state
+        print(f"Game Phase: {state.phase}")
+        print(f"Active Player: {state.idx_player_active}, Direction: {state.direction}")
+        if state.list_card_discard:
+            print(f"Discard Pile: {state.list_card_discard[-1]} (color: {state.color})")
+        print(f"Cards to draw: {state.cnt_to_draw}, Draw Pile: {len(state.list_card_draw or [])} cards")
+        for player in state.list_player:
+            print(f"{player.name}: {[card_key(card) for card in player.list_card]}")
 
     def get_list_action(self) -> List[Action]:
         """ Get a list of possible actions for the active player """
-        pass
+        if self.state is None or self.state.phase != GamePhase.RUNNING or not self.state.list_card_discard:
+            return []
+        state = self.state
+        assert state.idx_player_active is not None and state.list_card_discard is not None
+        player = state.list_player[state.idx_player_active]
+
+        # after drawing a card, only the drawn card may be played
+        hand = HandIndex(player.list_card[-1:]) if state.has_drawn else self._hand(state.idx_player_active)
+        playable = hand.get_playable(state.color, state.list_card_discard[-1], state.cnt_to_draw)
+
+        list_action: List[Action] = []
+        for card in playable:
+            list_action.extend(self._get_card_actions(card))
+        if len(player.list_card) == 2:
+            list_action.extend([action.model_copy(update={'uno': True}) for action in list_action])
+        if not state.has_drawn:
+            list_action.append(Action(card=None, color=None, draw=state.cnt_to_draw if state.cnt_to_draw > 0 else 1))
+        return list_action
 
-    def apply_action(self, action: Action) -> None:
+    def _get_card_actions(self, card: Card) -> List[Action]:
+        """ Get the actions to play the given card (one per chosen color for wild cards) """
+        assert self.state is not None
+        if card.symbol == 'wild':
+            return [Action(card=card, color=color, draw=None) for color in GameState.LIST_COLOR[:4]]
+        if card.symbol == 'wilddraw4':
+            draw = self.state.cnt_to_draw + 4
+            return [Action(card=card, color=color, draw=draw) for color in GameState.LIST_COLOR[:4]]
+        if card.symbol == 'draw2':
+            return [Action(card=card, color=card.color, draw=self.state.cnt_to_draw + 2)]
+        return [Action(card=card, color=card.color, draw=None)]
+
+    def apply_action(self, action: Optional[Action]) -> None:
         """ Apply the given action to the game """
-        pass
+        if self.state is None or self.state.phase != GamePhase.RUNNING:
+            return
+        state = self.state
+        assert state.idx_player_active is not None and state.list_card_discard is not None
+        player = state.list_player[state.idx_player_active]
+
+        if action is None:
+            # nothing possible: the next player continues
+            self._next_turn(1)
+            return
+
+        if action.card is None:
+            if state.cnt_to_draw > 0:
+                # take the accumulated cards, then the player continues the turn
+                self._draw_cards(state.idx_player_active, state.cnt_to_draw)
+                state.cnt_to_draw = 0
+                return
+            self._draw_cards(state.idx_player_active, action.draw or 1)
+            state.has_drawn = True
+            if not self.get_list_action():
+                self._next_turn(1)
+            return
+
+        card = next((c for c in player.list_card if card_key(c) == card_key(action.card)), None)
+        if card is None:
+            raise ValueError(f"Card {action.card} not found in hand of {player.name}.")
+        self._hand(state.idx_player_active).remove(card)
+        player.list_card.remove(card)
+        state.list_card_discard.append(card)
+        state.color = action.color or card.color or 'any'
+
+        if card.symbol == 'draw2':
+            state.cnt_to_draw += 2
+        elif card.symbol == 'wilddraw4':
+            state.cnt_to_draw += 4
+        elif card.symbol == 'reverse':
+            state.direction = -state.direction
+
+        if len(player.list_card) == 0:
+            state.phase = GamePhase.FINISHED
+            return
+        if len(player.list_card) == 1 and not action.uno:
+            # missed to call "UNO" with the second last card
+            self._draw_cards(state.idx_player_active, 4)
+
+        skip = card.symbol == 'skip' or (card.symbol == 'reverse' and state.cnt_player == 2)
+        self._next_turn(2 if skip else 1)
+
+    def play_turns(self, players: Mapping[int, Player]) -> List[Tuple[int, Optional[Action]]]:
+        """
+        Let the given players (by seat) take their turns in a row, until a seat without a player is active
+        or the game is finished. Returns the (seat, action) of every turn taken, e.g. to be sent as one batch.
+        """
+        assert self.state is not None
+        list_turn: List[Tuple[int, Optional[Action]]] = []
+        while self.state.phase == GamePhase.RUNNING and self.state.idx_player_active in players:
+            idx_player = self.state.idx_player_active
+            assert idx_player is not None
+            list_action = self.get_list_action()
+            action = players[idx_player].select_action(self.get_player_view(idx_player), list_action)
+            self.apply_action(action)
+            list_turn.append((idx_player, action))
+        return list_turn
+
+    def _next_turn(self, steps: int) -> None:
+        """ Pass the turn on by the given number of players in the current direction """
+        assert self.state is not None
+        self.state.idx_player_active = self._get_idx_player_next(steps)
+        self.state.has_drawn = False
+
+    def _get_idx_player_next(self, steps: int) -> int:
+        """ Index of the player the given number of steps away in the current direction """
+        assert self.state is not None and self.state.idx_player_active is not None
+        return (self.state.idx_player_active + steps * self.state.direction) % self.state.cnt_player
+
+    def _hand(self, idx_player: int) -> HandIndex:
+        """ Get the hand index of a player, rebuilding it if the hand was replaced from outside """
+        assert self.state is not None
+        player = self.state.list_player[idx_player]
+        hand = self._hands.get(idx_player)
+        if hand is None or not hand.is_in_sync(player):
+            hand = HandIndex(player.list_card)
+            self._hands[idx_player] = hand
+        return hand
+
+    def _draw_cards(self, idx_player: int, cnt_cards: int) -> None:
+        """ Move cards from the draw pile to the player's hand, reshuffling the discard pile if needed """
+        assert self.state is not None
+        state = self.state
+        player = state.list_player[idx_player]
+        hand = self._hand(idx_player)
+        assert state.list_card_draw is not None and state.list_card_discard is not None
+        for _ in range(cnt_cards):
+            if not state.list_card_draw:
+                # keep the top card, shuffle the rest of the discard pile into the draw pile
+                state.list_card_draw = state.list_card_discard[:-1]
+                state.list_card_discard = state.list_card_discard[-1:]
+                random.shuffle(state.list_card_draw)
+                if not state.list_card_draw:
+                    return
+            card = state.list_card_draw.pop()
+            hand.add(card)
+            player.list_card.append(card)
 
     def get_player_view(self, idx_player: int) -> GameState:
         """ Get the masked state for the active player (e.g. the oppontent's cards are face down)"""
-        pass
+        assert self.state is not None
+        state = self.state
+        list_player = [
+            player if idx == idx_player
+            else PlayerState(name=player.name, list_card=[CARD_HIDDEN] * len(player.list_card))
+            for idx, player in enumerate(state.list_player)
+        ]
+        return state.model_copy(update={
+            'list_player': list_player,
+            'list_card_draw': [CARD_HIDDEN] * len(state.list_card_draw or []),
+        })
+
+
+def sync_sampler(sampler: HiddenCardSampler[Card], state: GameState, idx_player: int) -> None:
+    """ Mark the cards the player can see in a (masked) state as seen: the own hand and the discard pile """
+    sampler.sync('hand', state.list_player[idx_player].list_card)
+    sampler.sync('discard', state.list_card_discard or [], append_only=True)
+
+
+def determinize(state: GameState, idx_player: int, sampler: HiddenCardSampler[Card],
+                rng: random.Random) -> GameState:
+    """
+    Copy of a (masked) state with the hidden hands of the other players and the draw pile dealt from the
+    unseen cards of the (synced) sampler, with the sizes of the face-down cards in the state
+    """
+    others = [idx for idx in range(len(state.list_player)) if idx != idx_player]
+    hands = sampler.deal([len(state.list_player[idx].list_card) for idx in others], rng)
+    list_player = list(state.list_player)
+    for idx, hand in zip(others, hands):
+        list_player[idx] = PlayerState(name=state.list_player[idx].name, list_card=hand)
+    list_card_draw = hands[len(others)] if len(hands) > len(others) else []
+    return state.model_copy(update={'list_player': list_player, 'list_card_draw': list_card_draw})
 
 
 class RandomPlayer(Player):
@@ -128,5 +410,9 @@ class RandomPlayer(Player):
 if __name__ == '__main__':
 
     uno = Uno()
-    state = GameState(cnt_player=3)
-    uno.set_state(state)
+    game_state = GameState(cnt_player=3)
+    uno.set_state(game_state)
+    random_player = RandomPlayer()
+    while game_state.phase != GamePhase.FINISHED:
+        uno.apply_action(random_player.select_action(game_state, uno.get_list_action()))
+    uno.print_state()
@@ -0,0 +1,11 @@
+import pytest
+from server.py.game import profiler
+
+
+@pytest.fixture
+def enabled_profiler():
+    profiler.reset()
+    profiler.enable()
+    yield profiler
+    profiler.disable()
+    profiler.reset()
@@ -1,5 +1,6 @@
 import pytest
 from server.py.battleship import Battleship, BattleshipGameState, GamePhase, BattleshipAction, ActionType, PlayerState, Ship
+from server.py.battleship import location_to_mask, mask_to_location, PLACEMENT_CATALOG, HuntTargetPlayer
 
 def test_initial_state():
     game = Battleship()
@@ -166,4 +167,148 @@ def test_get_player_view():
     view = game.get_player_view(0)
     assert view.idx_player_active == game.state.idx_player_active
     assert view.phase == game.state.phase
-    assert len(view.players) == len(game.state.players)
\ No newline at end of file
+    assert len(view.players) == len(game.state.players)
+
+def test_location_mask_roundtrip():
+    mask = location_to_mask(["A1", "A2", "B1", "J10"])
+    assert mask == (1 << 0) | (1 << 1) | (1 << 10) | (1 << 99)
+    assert mask_to_location(mask) == ["A1", "A2", "B1", "J10"]
+    assert location_to_mask(None) == 0
+
+def test_apply_action_shoot_sinks_fleet():
+    game = Battleship()
+    state = BattleshipGameState(
+        idx_player_active=0,
+        phase=GamePhase.RUNNING,
+        players=[
+            PlayerState(name="Player 1", ships=[Ship(name="Destroyer", length=2, location=["J9", "J10"])]),
+            PlayerState(name="Player 2", ships=[Ship(name="Destroyer", length=2, location=["A1", "B1"])]),
+        ]
+    )
+    game.set_state(state)
+    for location in ["A1", "J1", "B1"]:
+        game.apply_action(BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=[location]))
+    assert game.state.players[0].successful_shots == ["A1", "B1"]
+    assert game.state.players[1].shots == ["J1"]
+    assert game.state.phase == GamePhase.FINISHED
+    assert game.state.winner == 0
+
+def test_placement_catalog():
+    for length, placements in PLACEMENT_CATALOG.items():
+        assert len(placements) == 2 * 10 * (10 - length + 1)
+        assert len(set(placements)) == len(placements)
+        for mask in placements:
+            location = mask_to_location(mask)
+            assert len(location) == length
+            assert len({loc[0] for loc in location}) == 1 or len({loc[1:] for loc in location}) == 1
+
+def test_get_list_action_setup_excludes_overlap():
+    game = Battleship()
+    game.apply_action(BattleshipAction(action_type=ActionType.SET_SHIP, ship_name="Carrier",
+                                       location=["A1", "A2", "A3", "A4", "A5"]))
+    game.apply_action(BattleshipAction(action_type=ActionType.SET_SHIP, ship_name="Carrier",
+                                       location=["J6", "J7", "J8", "J9", "J10"]))
+    actions = game.get_list_action()
+    assert len(actions) == len(PLACEMENT_CATALOG[4]) - 10
+    assert all(action.ship_name == "Battleship" for action in actions)
+    assert all("A3" not in action.location for action in actions)
+    assert actions[-2:] == [actions[len(actions) - 2], actions[len(actions) - 1]]
+
+def test_get_list_action_running_action_space():
+    game = Battleship()
+    game.state.phase = GamePhase.RUNNING
+    game.state.players[0].shots = ["A1", "J10"]
+    actions = game.get_list_action()
+    assert len(actions) == 98
+    assert actions[0].location == ["A2"]
+    assert BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["B5"]) in actions
+    assert BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["A1"]) not in actions
+    assert BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["K1"]) not in actions
+    assert BattleshipAction(action_type=ActionType.SET_SHIP, ship_name="Carrier", location=["B5"]) not in actions
+    for _ in range(20):
+        assert actions.sample() in actions
+    b5 = BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["B5"])
+    assert actions[actions.index(b5)] == b5 and actions.index(b5) == list(actions).index(b5)
+    with pytest.raises(ValueError):
+        actions.index(BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["A1"]))
+    game.apply_action(BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["A2"]))
+    assert len(actions) == 98  # previously returned actions are not affected by later shots
+    assert len(game.get_list_action()) == 100  # it is the second player's turn now
+    game.apply_action(BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["A1"]))
+    assert len(game.get_list_action()) == 97
+
+def test_get_player_view_hides_unsunk_ships():
+    game = Battleship()
+    state = BattleshipGameState(
+        idx_player_active=0,
+        phase=GamePhase.RUNNING,
+        players=[
+            PlayerState(name="Player 1", ships=[Ship(name="Destroyer", length=2, location=["J9", "J10"])],
+                        shots=["A1", "B1", "C3"], successful_shots=["A1", "B1", "C3"]),
+            PlayerState(name="Player 2", ships=[Ship(name="Destroyer", length=2, location=["A1", "B1"]),
+                                                Ship(name="Cruiser", length=3, location=["C3", "C4", "C5"])]),
+        ]
+    )
+    game.set_state(state)
+    view = game.get_player_view(0)
+    assert view.players[0].ships[0].location == ["J9", "J10"]
+    assert view.players[1].ships[0].location == ["A1", "B1"]  # sunk ships are revealed
+    assert view.players[1].ships[1].location is None
+    assert view.players[1].ships[1].length == 3
+    assert game.get_player_view(1).players[0].ships[0].location is None
+
+def test_hunt_target_player_finishes_game():
+    game = Battleship()
+    player = HuntTargetPlayer()
+    while game.state.phase != GamePhase.FINISHED:
+        view = game.get_player_view(game.state.idx_player_active)
+        action = player.select_action(view, game.get_list_action())
+        assert action in game.get_list_action()
+        game.apply_action(action)
+    assert len(game.state.players[game.state.winner].shots) < 100
+    assert len(set(game.state.players[0].shots)) == len(game.state.players[0].shots)
+
+def test_get_state_snapshot_is_not_changed_by_later_moves():
+    game = Battleship()
+    game.apply_action(BattleshipAction(action_type=ActionType.SET_SHIP, ship_name="Carrier",
+                                       location=["A1", "A2", "A3", "A4", "A5"]))
+    snapshot = game.get_state()
+    view = game.get_player_view(1)
+    game.apply_action(BattleshipAction(action_type=ActionType.SET_SHIP, ship_name="Carrier",
+                                       location=["B1", "B2", "B3", "B4", "B5"]))
+    game.apply_action(BattleshipAction(action_type=ActionType.SET_SHIP, ship_name="Battleship",
+                                       location=["C1", "C2", "C3", "C4"]))
+    assert len(snapshot.players[0].ships) == 1
+    assert len(snapshot.players[1].ships) == 0
+    assert snapshot.idx_player_active == 1
+    assert len(view.players[1].ships) == 0
+    assert len(game.state.players[0].ships) == 2
+    assert len(game.state.players[1].ships) == 1
+    snapshot.idx_player_active = 0
+    assert game.get_state().idx_player_active == 1
+    assert game.get_state() == game.get_state()
+
+def test_changing_snapshot_or_view_leaves_game_unchanged():
+    game = Battleship()
+    game.apply_action(BattleshipAction(action_type=ActionType.SET_SHIP, ship_name="Carrier",
+                                       location=["A1", "A2", "A3", "A4", "A5"]))
+    game.get_state().players[0].shots.append("A1")
+    game.get_state().players[0].ships[0].location.append("A6")
+    view = game.get_player_view(0)
+    view.players[0].ships.append(Ship(name="Battleship", length=4, location=["C1", "C2", "C3", "C4"]))
+    assert game.state.players[0].shots == []
+    assert game.state.players[0].ships[0].location == ["A1", "A2", "A3", "A4", "A5"]
+    assert len(game.state.players[0].ships) == 1
+    game.switch_turn()
+    assert BattleshipAction(action_type=ActionType.SET_SHIP, ship_name="Battleship",
+                            location=["C1", "C2", "C3", "C4"]) in game.get_list_action()
+
+def test_in_place_edit_of_state_is_detected():
+    game = Battleship()
+    game.state.phase = GamePhase.RUNNING
+    game.state.players[0].shots = ["A1"]
+    assert BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["A1"]) not in game.get_list_action()
+    game.state.players[0].shots[0] = "B1"     # same number of shots, other cell
+    actions = game.get_list_action()
+    assert BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["A1"]) in actions
+    assert BattleshipAction(action_type=ActionType.SHOOT, ship_name=None, location=["B1"]) not in actions
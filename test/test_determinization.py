@@ -0,0 +1,66 @@
+import random
+from collections import Counter
+import numpy as np
+import pytest
+from server.py.determinization import HiddenCardSampler
+
+
+DECK = ['a'] * 3 + ['b'] * 2 + ['c'] * 4 + ['d']
+
+
+def make_sampler():
+    return HiddenCardSampler(DECK, lambda card: card)
+
+
+def test_sync_subtracts_seen_groups():
+    sampler = make_sampler()
+    sampler.sync('hand', ['a', 'c'])
+    sampler.sync('discard', ['b'], append_only=True)
+    assert Counter(sampler.get_unseen()) == Counter({'a': 2, 'b': 1, 'c': 3, 'd': 1})
+
+    sampler.sync('hand', ['d'])                                 # cards of a hand are replaced
+    sampler.sync('discard', ['b', 'a', 'c'], append_only=True)  # a pile grows at its end
+    assert Counter(sampler.get_unseen()) == Counter({'a': 2, 'b': 1, 'c': 3})
+
+    sampler.sync('discard', ['c'], append_only=True)            # a pile which shrank is synced again
+    assert Counter(sampler.get_unseen()) == Counter({'a': 3, 'b': 2, 'c': 3})
+
+    sampler.sync('hand', ['back', 'a'])                         # unknown cards are not counted
+    sampler.reset()
+    assert Counter(sampler.get_unseen()) == Counter(DECK)
+
+
+def test_incremental_sync_equals_full_sync():
+    rng = random.Random(3)
+    sampler = make_sampler()
+    pile = []
+    for _ in range(30):
+        pile = [] if rng.random() < 0.2 else pile + [rng.choice('abcd')]
+        hand = rng.sample(DECK, 2)
+        sampler.sync('discard', pile, append_only=True)
+        sampler.sync('hand', hand)
+        fresh = make_sampler()
+        fresh.sync('discard', pile)
+        fresh.sync('hand', hand)
+        assert (sampler.get_unseen_counts() == fresh.get_unseen_counts()).all()
+
+
+def test_deal_hands_and_rest():
+    sampler = make_sampler()
+    sampler.sync('hand', ['a', 'a'])
+    hands = sampler.deal([3, 2], random.Random(1))
+    assert [len(hand) for hand in hands] == [3, 2, 3]
+    assert Counter(card for hand in hands for card in hand) == Counter(sampler.get_unseen())
+    assert [len(hand) for hand in sampler.deal([4, 4], random.Random(1))] == [4, 4]
+    with pytest.raises(ValueError):
+        sampler.deal([5, 4], random.Random(1))
+
+
+def test_deal_many():
+    sampler = make_sampler()
+    sampler.sync('hand', ['d', 'c'])
+    dealt = sampler.deal_many(500, 8, np.random.default_rng(0))
+    assert dealt.shape == (500, 8)
+    expected = sorted(sampler.index[card] for card in sampler.get_unseen())
+    assert all(sorted(row) == expected for row in dealt.tolist())
+    assert len({tuple(row) for row in dealt[:, :3].tolist()}) > 10
@@ -1,7 +1,18 @@
 import pytest
 import random
+import numpy as np
+from collections import Counter
 from unittest.mock import patch
 from server.py.dog import Dog, GameState, GamePhase, Card, Action, Marble, RandomPlayer, PlayerState
+from server.py.dog_game_state import CARD_HIDDEN
+from server.py.dog_batch import DogBatch, SIMPLE_CARD_VALUES
+from server.py.dog_encoding import (ACTION_SPACE_SIZE, OBSERVATION_SIZE, RANKS, SUITS, encode_action, decode_action,
+                                    get_legal_mask, get_batch_legal_indices, get_observation)
+from server.py.determinization import HiddenCardSampler
+from server.py.dog_mcts import MCTSPlayer, card_key, determinize, evaluate, sync_sampler
+from server.py.dog_greedy import GreedyPlayer, PositionEvaluator
+from server.py.dog_threat import MAX_STEPS
+from server.py.dog_tablebase import Tablebase, generate, get_goal, get_successors, config_index, VALUE_UNSOLVED
 # from typing import List, Any
 
 ################################################################################
@@ -2586,3 +2597,342 @@ def test_handle_overtaking(initialized_game):
 
 
 
+################################################################################
+#############################    TEST BATCH ENGINE   ###########################
+################################################################################
+
+def random_marble_state(rng: random.Random) -> GameState:
+    """Build a running state with marbles spread over kennels, track, start fields and safe spaces."""
+    used = set()
+    players = []
+    for idx_player in range(4):
+        marbles = []
+        for idx_marble in range(4):
+            while True:
+                kind = rng.random()
+                if kind < 0.3:
+                    pos = Dog.KENNEL_POSITIONS[idx_player][idx_marble]
+                elif kind < 0.45:
+                    pos = rng.choice(Dog.SAFE_SPACES[idx_player])
+                elif kind < 0.6:
+                    pos = rng.choice([0, 1, 15, 16, 17, 31, 32, 33, 47, 48, 49, 63])
+                else:
+                    pos = rng.randrange(64)
+                if pos not in used:
+                    break
+            used.add(pos)
+            marbles.append(Marble(pos=pos, is_save=rng.random() < 0.3))
+        players.append(PlayerState(name=f"Player {idx_player + 1}", list_card=[], list_marble=marbles))
+    return GameState(
+        cnt_player=4, phase=GamePhase.RUNNING, cnt_round=1, bool_card_exchanged=True,
+        idx_player_started=0, idx_player_active=rng.randrange(4), list_player=players,
+        list_card_draw=[], list_card_discard=[], card_active=None, bool_game_finished=False,
+        board_positions=[None] * Dog.BOARD_SIZE)
+
+
+def test_batch_move_targets_match_single_game():
+    """The vectorized targets of all simple card values equal Dog._calculate_new_position."""
+    rng = random.Random(1)
+    states = [random_marble_state(rng) for _ in range(300)]
+    batch = DogBatch(states=states)
+    assert batch.positions.shape == (300, 4, 4)
+    for value in sorted({value for values in SIMPLE_CARD_VALUES.values() for value in values}):
+        targets = batch.get_targets(value)
+        for idx_game, state in enumerate(states):
+            idx_player = state.idx_player_active
+            for idx_marble, marble in enumerate(state.list_player[idx_player].list_marble):
+                expected = batch.games[idx_game]._calculate_new_position(marble, value, idx_player)
+                assert targets[idx_game, idx_marble] == (-1 if expected is None else expected)
+
+
+def test_batch_list_action_matches_single_game():
+    """Simple cards from the arrays plus the per-game fallback give the same actions as Dog."""
+    rng = random.Random(2)
+    ranks = ['2', '4', '7', 'J', 'Q', 'K', 'A', '10']
+    states = [random_marble_state(rng) for _ in range(12)]
+    for state in states:
+        state.list_player[state.idx_player_active].list_card = [
+            Card(suit='♠', rank=rank) for rank in rng.sample(ranks, 3)]
+    batch = DogBatch(states=states)
+    for idx_game, game in enumerate(batch.games):
+        assert batch.get_list_action(idx_game) == game.get_list_action()
+
+
+def test_batch_step_advances_all_games(standard_deck):
+    random.seed(3)
+    batch = DogBatch(8)
+    players = [RandomPlayer() for _ in range(4)]
+    for _ in range(30):
+        assert batch.step(players) == 8
+    for idx_game, game in enumerate(batch.games):
+        state = game.get_state()
+        assert batch.idx_player_active[idx_game] == state.idx_player_active
+        assert [[marble.pos for marble in player.list_marble] for player in state.list_player] == \
+            batch.positions[idx_game].tolist()
+
+
+################################################################################
+#############################    TEST ACTION ENCODING   ########################
+################################################################################
+
+STANDARD_DECK = [Card(suit=suit, rank=rank) for suit in ['♠', '♥', '♦', '♣']
+                 for rank in ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']] * 2 \
+    + [Card(suit='', rank='JKR')] * 6
+
+
+@pytest.fixture
+def standard_deck(monkeypatch):
+    """Deal from the standard deck (other tests replace GameState.LIST_CARD)."""
+    monkeypatch.setattr(GameState, 'LIST_CARD', STANDARD_DECK)
+
+
+def test_encoding_matches_list_action_over_played_games(standard_deck):
+    """Legal indices from the batch arrays equal the encoded actions of Dog, decoding gives back the actions."""
+    random.seed(5)
+    batch = DogBatch(6)
+    players = [RandomPlayer() for _ in range(4)]
+    for _ in range(80):
+        for idx_game, game in enumerate(batch.games):
+            state = game.get_state()
+            actions = game.get_list_action()
+            mask = get_legal_mask(state, actions)
+            assert mask.shape == (ACTION_SPACE_SIZE,)
+            assert set(np.flatnonzero(mask)) == set(get_batch_legal_indices(batch, idx_game))
+            for action in actions:
+                decoded = decode_action(state, encode_action(state, action))
+                assert (decoded.card.rank, decoded.pos_from, decoded.pos_to, decoded.card_swap) == \
+                    (action.card.rank, action.pos_from, action.pos_to, action.card_swap)
+        batch.step(players)
+
+
+def test_encoding_ranks_and_suits_are_fixed(monkeypatch):
+    """The index layout is fixed, it equals the game's ranks and suits and does not follow changes to them."""
+    assert RANKS == tuple(GameState.LIST_RANK) and SUITS == tuple(GameState.LIST_SUIT)
+    monkeypatch.setattr(GameState, 'LIST_RANK', GameState.LIST_RANK[:-1])
+    assert RANKS[-1] == 'JKR' and len(RANKS) == 14
+
+
+def test_observation_of_player_view(standard_deck):
+    game = Dog()
+    state = game.get_state()
+    view = game.get_player_view(1)
+    observation = get_observation(view, 1)
+    assert observation.shape == (OBSERVATION_SIZE,)
+    assert observation[:4 * 96].sum() == 16
+    assert observation[5 * 96:5 * 96 + 14].sum() == len(state.list_player[1].list_card)
+    assert observation[Dog.KENNEL_POSITIONS[2][0] + 2 * 96] == 1.0
+
+
+################################################################################
+#############################    TEST MCTS PLAYER   ############################
+################################################################################
+
+def test_clone_is_independent(standard_deck):
+    random.seed(11)
+    game = Dog()
+    clone = game.clone()
+    clone.apply_action(random.choice(clone.get_list_action()))
+    assert game.get_state() != clone.get_state()
+    assert game.get_state().list_player[0].list_marble[0] is not clone.get_state().list_player[0].list_marble[0]
+    assert Dog.from_state(game.get_state()).get_state() == game.get_state()
+
+
+def test_jkr_does_not_change_list_rank(standard_deck):
+    game = Dog()
+    state = game.get_state()
+    state.bool_card_exchanged = True
+    state.list_player[state.idx_player_active].list_card = [Card(suit='', rank='JKR')]
+    ranks = list(GameState.LIST_RANK)
+    actions = game.get_list_action()
+    assert GameState.LIST_RANK == ranks
+    # all marbles are in the kennel: only the starting cards can be played
+    assert {action.card_swap.rank for action in actions if action.card_swap is not None} == {'A', 'K'}
+    assert len([action for action in actions if action.card_swap is not None]) == 2 * 4
+
+
+def test_determinize_deals_the_unseen_cards(standard_deck):
+    game = Dog()
+    state = game.get_state()
+    view = game.get_player_view(0)
+    sampler = HiddenCardSampler(GameState.LIST_CARD, card_key)
+    assert view.list_card_draw == [CARD_HIDDEN] * len(state.list_card_draw)
+    sync_sampler(sampler, view, 0)
+    unseen = sampler.get_unseen()
+    assert len(unseen) == sum(len(player.list_card) for player in state.list_player[1:]) + len(state.list_card_draw)
+    dealt = determinize(view, 0, sampler, random.Random(2)).get_state()
+    assert dealt.list_player[0].list_card == state.list_player[0].list_card
+    assert [len(player.list_card) for player in dealt.list_player] == \
+        [len(player.list_card) for player in state.list_player]
+    assert len(dealt.list_card_draw) == len(state.list_card_draw)
+    assert dealt.list_card_draw != state.list_card_draw
+    hidden = [card for player in dealt.list_player[1:] for card in player.list_card] + dealt.list_card_draw
+    assert Counter((c.suit, c.rank) for c in hidden) == Counter((c.suit, c.rank) for c in unseen)
+    assert 0.0 <= evaluate(dealt, 0) <= 1.0
+
+
+def test_determinize_keeps_hand_sizes_of_view(standard_deck):
+    game = Dog()
+    state = game.get_state()
+    state.bool_card_exchanged = True
+    player = state.list_player[1]
+    state.list_card_discard.extend(player.list_card)    # player 2 folded
+    player.list_card = []
+    state.list_card_discard.append(state.list_player[2].list_card.pop())
+    view = game.get_player_view(0)
+    assert view.list_cnt_card == [6, 0, 5, 6]
+    sampler = HiddenCardSampler(GameState.LIST_CARD, card_key)
+    sync_sampler(sampler, view, 0)
+    for seed in range(5):
+        dealt = determinize(view, 0, sampler, random.Random(seed)).get_state()
+        assert [len(player.list_card) for player in dealt.list_player] == [6, 0, 5, 6]
+        assert len(dealt.list_card_draw) == len(state.list_card_draw)
+
+
+def test_mcts_player_selects_legal_action(standard_deck):
+    random.seed(4)
+    game = Dog()
+    player = MCTSPlayer(time_budget=5.0, max_iterations=30, seed=1)
+    for _ in range(3):
+        state = game.get_state()
+        actions = game.get_list_action()
+        action = player.select_action(game.get_player_view(state.idx_player_active), actions)
+        assert action in actions
+        assert player.cnt_iterations == (30 if len(actions) > 1 else 0)
+        game.apply_action(action)
+
+
+################################################################################
+#############################    TEST GREEDY PLAYER   ##########################
+################################################################################
+
+def make_greedy_state(positions, cards, idx_player_active=0):
+    """Running state with the marbles of the players on the given fields (others in the kennel)."""
+    game = Dog()
+    state = game.get_state()
+    state.bool_card_exchanged = True
+    state.idx_player_active = idx_player_active
+    for idx_player, fields in positions.items():
+        for marble, pos in zip(state.list_player[idx_player].list_marble, fields):
+            marble.pos = pos
+            marble.is_save = False
+    state.list_player[idx_player_active].list_card = cards
+    return game
+
+
+def test_greedy_prefers_kicking_an_opponent():
+    game = make_greedy_state({0: [10, 20], 1: [15]}, [Card(suit='♠', rank='5')])
+    action = GreedyPlayer(seed=0).select_action(game.get_state(), game.get_list_action())
+    assert (action.pos_from, action.pos_to) == (10, 15)
+
+
+def test_greedy_does_not_kick_the_partner():
+    game = make_greedy_state({0: [10, 20], 2: [15]}, [Card(suit='♠', rank='5')])
+    action = GreedyPlayer(seed=0).select_action(game.get_state(), game.get_list_action())
+    assert (action.pos_from, action.pos_to) == (20, 25)
+
+
+def test_greedy_moves_into_the_safe_spaces():
+    game = make_greedy_state({0: [62, 30]}, [Card(suit='♠', rank='3')])
+    action = GreedyPlayer(seed=0).select_action(game.get_state(), game.get_list_action())
+    assert action.pos_from == 62 and action.pos_to in Dog.SAFE_SPACES[0]
+
+
+def test_evaluator_scores_exposure_and_jack_swap():
+    game = make_greedy_state({0: [5], 1: [40]}, [Card(suit='♠', rank='J')])
+    state = game.get_state()
+    evaluator = PositionEvaluator(state)
+    # moving in front of an opponent marble costs part of the marble's value
+    exposed = evaluator.score(state, Action(card=Card(suit='♠', rank='Q'), pos_from=5, pos_to=45, card_swap=None))
+    safe = evaluator.score(state, Action(card=Card(suit='♠', rank='Q'), pos_from=5, pos_to=35, card_swap=None))
+    assert exposed < safe
+    swap = evaluator.score(state, Action(card=Card(suit='♠', rank='J'), pos_from=5, pos_to=40, card_swap=None))
+    assert swap > 0
+
+
+################################################################################
+#############################    TEST THREAT MAP   #############################
+################################################################################
+
+def assert_threat_map_matches(game):
+    threat_map = game.get_threat_map()
+    state = game.get_state()
+    for idx_player, player in enumerate(state.list_player):
+        for idx_marble, marble in enumerate(player.list_marble):
+            for steps in range(1, MAX_STEPS + 1):
+                pos_to = game._calculate_new_position(marble, steps, idx_player)
+                assert threat_map.targets[(idx_player, idx_marble)][steps] == pos_to
+                if pos_to is not None:
+                    assert threat_map.is_reachable(pos_to, idx_player, steps)
+                    assert threat_map.get_mask(idx_player, steps) >> pos_to & 1
+
+
+def test_threat_map_follows_played_games(standard_deck):
+    random.seed(21)
+    for _ in range(3):
+        game = Dog()
+        for _ in range(150):
+            if game.get_state().phase == GamePhase.FINISHED:
+                break
+            actions = game.get_list_action()
+            game.apply_action(random.choice(actions) if actions else None)
+            assert_threat_map_matches(game)
+        # only the marbles affected by a move are walked again
+        assert game.get_threat_map().cnt_walk < 150 * 16 / 4
+
+
+def test_threat_map_blocked_start_and_threats():
+    game = make_greedy_state({0: [10], 1: [16, 20], 3: [60]}, [Card(suit='♠', rank='2')])
+    game.get_state().list_player[1].list_marble[0].is_save = True
+    threat_map = game.get_threat_map()
+    assert threat_map.is_reachable(15, 0, 5)
+    assert not threat_map.is_reachable(16, 0) and not threat_map.is_reachable(17, 0)
+    assert threat_map.is_threatened(2, 0)       # player 3 from 60 with 6 steps
+    assert not threat_map.is_threatened(2, 1)   # player 3 is the partner of player 1
+    assert threat_map.is_threatened(30, 0) and not threat_map.is_threatened(40, 0)
+
+
+################################################################################
+#############################    TEST ENDGAME TABLEBASE   ######################
+################################################################################
+
+@pytest.fixture
+def tablebase(tmp_path):
+    path = str(tmp_path / 'tablebase.bin')
+    generate(path, cnt_track=6)
+    tablebase = Tablebase(path)
+    yield tablebase
+    tablebase.close()
+
+
+def test_tablebase_bounds_follow_best_successors(tablebase):
+    assert tablebase.get_lower_bound(get_goal(6)) == 0
+    assert sorted(config_index(config) for config in tablebase.configs) == list(range(len(tablebase.configs)))
+    for config in tablebase.configs:
+        bound = tablebase.get_lower_bound(config)
+        if bound in (0, VALUE_UNSOLVED):
+            continue
+        # the bound is reached by one of the ranks, and no rank does better
+        successors = [tablebase.get_best(config, rank) for rank in ('2', '3', '4', '5', '6', '7', '8', '9', '10',
+                                                                    'Q', 'K', 'A', 'JKR')]
+        bounds = [tablebase.get_lower_bound(successor) for successor in successors if successor is not None]
+        assert min(bounds) == bound - 1
+        assert tablebase.get_best(config, 'JKR') in get_successors(config, 'JKR', 6)
+
+
+def test_tablebase_selects_finishing_action(tablebase):
+    game = make_greedy_state({0: [63, 70, 71, 69]}, [Card(suit='♠', rank='2'), Card(suit='♠', rank='5')])
+    state = game.get_state()
+    assert tablebase.get_config(state, 0) == (4, 7, 8, 9)
+    assert tablebase.get_lower_bound((4, 7, 8, 9)) == 1
+    action = tablebase.select_action(state, game.get_list_action())
+    assert (action.card.rank, action.pos_from, action.pos_to) == ('2', 63, 68)
+    # a marble outside of the table (or a marble not yet moved from its start) is not covered
+    state.list_player[0].list_marble[0].pos = 40
+    assert tablebase.get_config(state, 0) is None
+    assert tablebase.select_action(state, game.get_list_action()) is None
+
+
+def test_greedy_player_uses_tablebase(tablebase):
+    game = make_greedy_state({0: [63, 70, 71, 69]}, [Card(suit='♠', rank='5'), Card(suit='♠', rank='2')])
+    action = GreedyPlayer(seed=0, tablebase=tablebase).select_action(game.get_state(), game.get_list_action())
+    assert (action.card.rank, action.pos_to) == ('2', 68)
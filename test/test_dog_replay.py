@@ -0,0 +1,84 @@
+import random
+import pytest
+from server.py.dog import Card, Dog, GameState, RandomPlayer
+from server.py.dog_replay import CARD_CODES, DogRecord, DogRecorder, read_varint, replay, write_varint
+
+
+@pytest.fixture(autouse=True)
+def standard_deck(monkeypatch):
+    # other tests replace the deck of the class
+    deck = [Card(suit=suit, rank=rank) for suit, rank in CARD_CODES if rank != 'JKR'] * 2
+    monkeypatch.setattr(GameState, 'LIST_CARD', deck + [Card(suit='', rank='JKR')] * 6)
+
+
+def record_game(seed, cnt_action):
+    """ Recorder after random actions, with the states after each action """
+    random.seed(seed + 1000)
+    recorder = DogRecorder(seed)
+    player = RandomPlayer()
+    states = [recorder.game.get_state().model_dump()]
+    for _ in range(cnt_action):
+        actions = recorder.game.get_list_action()
+        recorder.game.apply_action(player.select_action(recorder.game.get_state(), actions))
+        states.append(recorder.game.get_state().model_dump())
+    return recorder, states
+
+
+@pytest.mark.parametrize('value', [0, 1, 127, 128, 300, 2 ** 32, 2 ** 64 - 1])
+def test_varint_round_trip(value):
+    buffer = bytearray(b'x')
+    write_varint(buffer, value)
+    assert len(buffer) == 1 + max(1, (value.bit_length() + 6) // 7)
+    assert read_varint(buffer, 1) == (value, len(buffer))
+
+
+def test_varint_errors():
+    with pytest.raises(ValueError):
+        write_varint(bytearray(), -1)
+    with pytest.raises(ValueError):
+        read_varint(b'\x80\x80', 0)
+
+
+def test_seeded_game_ignores_global_generator():
+    random.seed(1)
+    first = Dog(7).get_state().model_dump()
+    random.seed(2)
+    assert Dog(7).get_state().model_dump() == first
+    assert Dog(8).get_state().model_dump() != first
+
+
+def test_record_round_trip_at_offset():
+    recorder, _ = record_game(3, 40)
+    data = recorder.to_bytes()
+    assert len(data) < 100
+    other, _ = record_game(4, 10)
+    buffer = memoryview(other.to_bytes() + data)
+    record, end = DogRecord.read(buffer, len(other.to_bytes()))
+    assert record == recorder.record
+    assert end == len(buffer)
+    with pytest.raises(ValueError, match='No Dog record'):
+        DogRecord.from_bytes(buffer, 1)
+
+
+def test_replay_reconstructs_every_state():
+    recorder, states = record_game(5, 60)
+    record = DogRecord.from_bytes(recorder.to_bytes())
+    for cnt_action in (0, 1, 30, 60):
+        assert replay(record, cnt_action).get_state().model_dump() == states[cnt_action]
+    game = replay(record, 30)
+    assert replay(record, 45, game=game, start=30).get_state().model_dump() == states[45]
+
+
+def test_replay_detects_other_deal():
+    recorder, _ = record_game(6, 5)
+    record = recorder.record.model_copy(update={'deal': list(reversed(recorder.record.deal))})
+    with pytest.raises(ValueError, match='deals another game'):
+        replay(record)
+    with pytest.raises(ValueError, match='out of range'):
+        replay(recorder.record, 6)
+
+
+def test_deck_with_other_cards_is_not_recorded(monkeypatch):
+    monkeypatch.setattr(GameState, 'LIST_CARD', [Card(suit='H', rank='A')] * 110)
+    with pytest.raises(ValueError, match='not in the Dog deck'):
+        DogRecorder(1)
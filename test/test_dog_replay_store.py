@@ -0,0 +1,91 @@
+import random
+import pytest
+from server.py.dog import Card, GameState, RandomPlayer
+from server.py.dog_replay import CARD_CODES, DogRecorder
+from server.py.dog_replay_store import CHECKPOINT, ENTRY, HEADER_INDEX, ReplayStore, ReplayWriter
+
+
+@pytest.fixture(autouse=True)
+def standard_deck(monkeypatch):
+    # other tests replace the deck of the class
+    deck = [Card(suit=suit, rank=rank) for suit, rank in CARD_CODES if rank != 'JKR'] * 2
+    monkeypatch.setattr(GameState, 'LIST_CARD', deck + [Card(suit='', rank='JKR')] * 6)
+
+
+def record_game(seed, cnt_action):
+    """ Record of random actions, with the states after each action """
+    random.seed(seed + 1000)
+    recorder = DogRecorder(seed)
+    player = RandomPlayer()
+    states = [recorder.game.get_state().model_dump()]
+    for _ in range(cnt_action):
+        actions = recorder.game.get_list_action()
+        recorder.game.apply_action(player.select_action(recorder.game.get_state(), actions))
+        states.append(recorder.game.get_state().model_dump())
+    return recorder.record, states
+
+
+def test_store_restores_every_turn(tmp_path):
+    path = str(tmp_path / 'games')
+    games = [record_game(seed, cnt_action) for seed, cnt_action in ((1, 70), (2, 15))]
+    writer = ReplayWriter(path, interval=20)
+    for record, _ in games:
+        writer.append(record)
+    writer.close()
+
+    store = ReplayStore(path)
+    assert len(store) == 2
+    for idx_game, (record, states) in enumerate(games):
+        assert store.get_record(idx_game) == record
+        assert store.get_cnt_action(idx_game) == len(record.actions)
+        for turn, state in enumerate(states):
+            assert store.get_state(idx_game, turn).model_dump() == state
+        assert store.get_state(idx_game).model_dump() == states[-1]
+    store.close()
+
+
+def test_store_keeps_checkpoints_in_data_file(tmp_path):
+    path = str(tmp_path / 'games')
+    record, _ = record_game(3, 45)
+    writer = ReplayWriter(path, interval=20)
+    writer.append(record)
+    writer.close()
+    index = (tmp_path / 'games.idx').read_bytes()
+    assert len(index) == HEADER_INDEX.size + ENTRY.size
+    offset_record, offset_table, cnt_checkpoint = ENTRY.unpack_from(index, HEADER_INDEX.size)
+    assert cnt_checkpoint == 2
+    data = (tmp_path / 'games.dat').read_bytes()
+    assert offset_table == offset_record + len(record.to_bytes())
+    assert [CHECKPOINT.unpack_from(data, offset_table + idx * CHECKPOINT.size)[0] for idx in range(2)] == [20, 40]
+
+
+def test_writer_appends_to_existing_store(tmp_path):
+    path = str(tmp_path / 'games')
+    first, _ = record_game(4, 10)
+    second, states = record_game(5, 30)
+    writer = ReplayWriter(path, interval=10)
+    writer.append(first)
+    writer.close()
+    store = ReplayStore(path)
+    writer = ReplayWriter(path, interval=99)
+    writer.append(second)
+    writer.close()
+    assert len(store) == 1
+    store.close()
+
+    store = ReplayStore(path)
+    assert store.interval == 10
+    assert store.get_record(0) == first
+    assert store.get_state(1, 25).model_dump() == states[25]
+    with pytest.raises(IndexError):
+        store.get_game(2)
+    with pytest.raises(IndexError):
+        store.get_game(1, 31)
+    store.close()
+
+
+def test_store_rejects_other_files(tmp_path):
+    (tmp_path / 'other.dat').write_bytes(b'x' * 20)
+    (tmp_path / 'other.idx').write_bytes(b'y' * 20)
+    with pytest.raises(ValueError, match='not a Dog replay store'):
+        ReplayStore(str(tmp_path / 'other'))
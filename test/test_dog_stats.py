@@ -0,0 +1,118 @@
+import pytest
+from server.py import dog_stats
+from server.py.dog import Action, Card, Dog, GamePhase, GameState
+from server.py.dog_replay import CARD_CODES
+from server.py.dog_stats import DogStats, DogStatsCollector, Histogram
+
+
+def new_game(idx_active=0):
+    """ Game in its first round after the card exchange, with all marbles in the kennels """
+    game = Dog(1)
+    state = game.get_state()
+    state.bool_card_exchanged = True
+    state.idx_player_active = idx_active
+    for idx_player, player in enumerate(state.list_player):
+        for idx_marble, marble in enumerate(player.list_marble):
+            marble.pos = Dog.KENNEL_POSITIONS[idx_player][idx_marble]
+            marble.is_save = False
+    return game, DogStats()
+
+
+def test_histogram():
+    histogram = Histogram.create(10)
+    for value in (1, 2, 2, 3, 40):
+        histogram.add(value)
+    assert histogram.get_count() == 5
+    assert histogram.get_mean() == 48 / 5
+    assert histogram.get_percentile(50) == 2
+    assert histogram.get_percentile(90) == 10
+    other = Histogram.create(10)
+    other.add(2)
+    histogram.merge(other)
+    assert histogram.counts[2] == 3 and histogram.total == 50
+    with pytest.raises(ValueError):
+        histogram.merge(Histogram.create(5))
+    assert Histogram.create(3).get_percentile(50) is None
+
+
+def test_merge_adds_statistics():
+    first = DogStats(games=2, wins_by_seat=[2, 0, 2, 0], cards={'7': 3}, kicks_collision=4)
+    first.rounds.add(20)
+    second = DogStats(games=1, wins_by_seat=[0, 1, 0, 1], cards={'7': 1, 'A': 2}, kicks_overtake=1)
+    second.rounds.add(30)
+    merged = DogStats().merge(first).merge(second)
+    assert merged.games == 3
+    assert merged.wins_by_seat == [2, 1, 2, 1]
+    assert merged.cards == {'7': 4, 'A': 2}
+    assert merged.kicks_collision == 4 and merged.kicks_overtake == 1
+    assert merged.rounds.get_mean() == 25
+    summary = merged.get_summary()
+    assert summary['win_rate_by_seat'] == [0.6667, 0.3333, 0.6667, 0.3333]
+    assert summary['card_usage'] == {'7': 0.6667, 'A': 0.3333}
+
+
+def test_collision_is_counted():
+    game, stats = new_game()
+    state = game.get_state()
+    state.list_player[0].list_marble[0].pos = 3
+    state.list_player[1].list_marble[0].pos = 5
+    card = Card(suit='♠', rank='2')
+    state.list_player[0].list_card = [card]
+    DogStatsCollector(game, stats)
+    game.apply_action(Action(card=card, pos_from=3, pos_to=5))
+    assert state.list_player[1].list_marble[0].pos in Dog.KENNEL_POSITIONS[1]
+    assert stats.kicks_collision == 1
+    assert stats.cards == {'2': 1}
+
+
+def test_seven_is_counted_when_finished():
+    game, stats = new_game()
+    state = game.get_state()
+    state.list_player[0].list_marble[0].pos = 10
+    state.list_player[0].list_marble[1].pos = 20
+    state.list_player[2].list_marble[0].pos = 12
+    seven = Card(suit='♠', rank='7')
+    state.list_player[0].list_card = [seven]
+    collector = DogStatsCollector(game, stats)
+
+    game.apply_action(Action(card=seven, pos_from=10, pos_to=13))
+    game.apply_action(None)     # passed: the SEVEN is taken back
+    assert not stats.cards and stats.kicks_overtake == 0
+    assert collector.rank_turn is None
+
+    game.get_state().idx_player_active = 0
+    game.apply_action(Action(card=seven, pos_from=10, pos_to=13))
+    assert not stats.cards
+    game.apply_action(Action(card=seven, pos_from=20, pos_to=24))
+    assert stats.cards == {'7': 1}
+    assert stats.kicks_overtake == 1
+    assert stats.seven_moves.counts[2] == 1
+
+
+def test_finished_game_is_counted():
+    game, stats = new_game()
+    state = game.get_state()
+    state.idx_player_started = 1
+    for idx_player in (0, 2):
+        for marble, pos in zip(state.list_player[idx_player].list_marble, Dog.SAFE_SPACES[idx_player]):
+            marble.pos = pos
+    state.list_player[0].list_marble[0].pos = 63
+    card = Card(suit='♠', rank='A')
+    state.list_player[0].list_card = [card]
+    collector = DogStatsCollector(game, stats)
+    game.apply_action(Action(card=card, pos_from=63, pos_to=Dog.SAFE_SPACES[0][0]))
+    assert game.get_state().phase == GamePhase.FINISHED
+    assert collector.is_finished
+    assert stats.games == 1
+    assert stats.wins_by_seat == [0, 1, 0, 1]   # seats 0 and 2 are 3 and 1 after the starting player 1
+    assert stats.rounds.counts[1] == 1
+
+
+def test_run_merges_workers(monkeypatch):
+    # other tests replace the deck of the class
+    deck = [Card(suit=suit, rank=rank) for suit, rank in CARD_CODES if rank != 'JKR'] * 2
+    monkeypatch.setattr(GameState, 'LIST_CARD', deck + [Card(suit='', rank='JKR')] * 6)
+    stats = dog_stats.run(range(3), workers=2, max_actions=40)
+    assert stats.games_unfinished == 3
+    assert stats.games == 0
+    assert sum(stats.cards.values()) > 0
@@ -0,0 +1,83 @@
+import pytest
+from server.py.game import LATENCY_BUCKETS, CallStats, Game, GameProfiler
+from server.py.hangman import GamePhase, GuessLetterAction, Hangman, HangmanGameState
+
+
+def play_hangman(letters):
+    game = Hangman()
+    game.set_state(HangmanGameState(word_to_guess='kennel', phase=GamePhase.RUNNING))
+    for letter in letters:
+        game.get_list_action()
+        game.apply_action(GuessLetterAction(letter))
+    game.get_player_view(0)
+
+
+def test_profiler_records_calls_per_game(enabled_profiler):
+    play_hangman('KEX')
+    snapshot = enabled_profiler.snapshot()
+    assert snapshot['Hangman']['apply_action']['count'] == 3
+    assert snapshot['Hangman']['get_list_action']['count'] == 3
+    assert snapshot['Hangman']['set_state']['count'] == 1
+    assert snapshot['Hangman']['get_player_view']['count'] == 1
+    stats = snapshot['Hangman']['apply_action']
+    assert 0 < stats['p50_us'] <= stats['p90_us'] <= stats['p99_us'] <= stats['max_us']
+    assert stats['total_s'] > 0
+
+
+def test_disabled_profiler_keeps_original_methods():
+    original = Hangman.__dict__['apply_action']
+    local = GameProfiler()
+    local.register(Hangman)
+    local.enable()
+    assert Hangman.__dict__['apply_action'] is not original
+    local.disable()
+    assert Hangman.__dict__['apply_action'] is original
+    play_hangman('K')
+    assert not local.snapshot()
+
+
+def test_subclass_defined_while_enabled_is_profiled(enabled_profiler):
+    class Counter(Game):
+        def __init__(self):
+            self.value = 0
+
+        def set_state(self, state):
+            self.value = state
+
+        def get_state(self):
+            return self.value
+
+        def print_state(self):
+            pass
+
+        def get_list_action(self):
+            return [1]
+
+        def apply_action(self, action):
+            self.value += action
+
+        def get_player_view(self, idx_player):
+            return self.value
+
+    game = Counter()
+    game.apply_action(1)
+    game.apply_action(2)
+    assert game.get_state() == 3
+    assert enabled_profiler.snapshot()['Counter']['apply_action']['count'] == 2
+
+
+def test_exception_is_recorded_and_raised(enabled_profiler):
+    game = Hangman()
+    with pytest.raises(ValueError):
+        game.get_player_view(0)
+    assert enabled_profiler.snapshot()['Hangman']['get_player_view']['count'] == 1
+
+
+def test_call_stats_counts_buckets():
+    stats = CallStats()
+    for seconds in (0.00005, 0.0003, 0.0003, 2.0):
+        stats.add(seconds)
+    assert stats.buckets[0] == 1
+    assert stats.buckets[LATENCY_BUCKETS.index(0.0005)] == 2
+    assert stats.buckets[-1] == 1
+    assert sum(stats.buckets) == stats.count == 4
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import time
+import pytest
+from server.py.dog import Dog
+from server.py.game import CallStats, GameProfiler
+from server.py.metrics import FINISHED_WINDOW, MeteredWebSocket, Metrics, metered, monitor_event_loop
+
+
+class FakeWebSocket:
+
+    def __init__(self, received):
+        self.received = list(received)
+        self.sent = []
+        self.accepted = False
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def receive_text(self):
+        return self.received.pop(0)
+
+
+def test_metered_websocket_counts_messages_and_bytes():
+    target = Metrics()
+    fake = FakeWebSocket(['{"type":"action","action":"A"}'])
+
+    async def handle():
+        websocket = MeteredWebSocket(fake, 'hangman', target)
+        await websocket.accept()
+        data = await websocket.receive_json()
+        await websocket.send_json({'echo': data['action'], 'word': 'hällo'})
+
+    asyncio.run(handle())
+    assert fake.accepted
+    assert json.loads(fake.sent[0]) == {'echo': 'A', 'word': 'hällo'}
+    assert target.messages_received['hangman'] == 1
+    assert target.bytes_received['hangman'] == len('{"type":"action","action":"A"}')
+    assert target.messages_sent['hangman'] == 1
+    assert target.bytes_sent['hangman'] == len(fake.sent[0].encode('utf-8'))
+
+
+def test_metered_counts_active_websockets():
+    target = Metrics()
+    seen = []
+
+    @metered('dog', target)
+    async def handler(websocket):
+        seen.append(target.websockets_active['dog'])
+        await websocket.send_json({})
+
+    asyncio.run(handler(FakeWebSocket([])))
+    assert seen == [1]
+    assert target.websockets_active['dog'] == 0
+    assert target.messages_sent['dog'] == 1
+
+
+def test_finished_per_minute_drops_old_games():
+    target = Metrics()
+    target.record_game_finished('uno')
+    target.record_game_finished('uno')
+    now = target.finished_times['uno'][-1]
+    assert target.get_finished_per_minute('uno', now) == 2
+    assert target.get_finished_per_minute('uno', now + FINISHED_WINDOW + 1) == 0
+    assert target.games_finished['uno'] == 2
+    assert target.get_finished_per_minute('dog') == 0
+
+
+def test_render_prometheus_text():
+    target = Metrics()
+    target.record_sent('dog', 120)
+    target.record_loop_lag(0.25)
+    target.record_loop_lag(0.01)
+    text = target.render(GameProfiler())
+    assert '# TYPE game_server_messages_sent_total counter' in text
+    assert 'game_server_bytes_sent_total{game="dog"} 120' in text
+    assert 'game_server_event_loop_lag_seconds 0.01' in text
+    assert 'game_server_event_loop_lag_max_seconds 0.25' in text
+
+
+def test_render_engine_histogram():
+    game_profiler = GameProfiler()
+    stats = CallStats()
+    for seconds in (0.00005, 0.003, 2.0):
+        stats.add(seconds)
+    game_profiler.stats[('Dog', 'apply_action')] = stats
+    text = Metrics().render(game_profiler)
+    labels = 'game="Dog",method="apply_action"'
+    assert '# TYPE game_server_engine_call_seconds histogram' in text
+    assert f'game_server_engine_call_seconds_bucket{{{labels},le="0.0001"}} 1' in text
+    assert f'game_server_engine_call_seconds_bucket{{{labels},le="0.005"}} 2' in text
+    assert f'game_server_engine_call_seconds_bucket{{{labels},le="1.0"}} 2' in text
+    assert f'game_server_engine_call_seconds_bucket{{{labels},le="+Inf"}} 3' in text
+    assert f'game_server_engine_call_seconds_count{{{labels}}} 3' in text
+
+
+def test_monitor_event_loop_records_lag():
+    target = Metrics()
+
+    async def block_loop():
+        task = asyncio.create_task(monitor_event_loop(target, interval=0.01))
+        await asyncio.sleep(0)
+        time.sleep(0.05)
+        await asyncio.sleep(0.02)
+        task.cancel()
+
+    asyncio.run(block_loop())
+    assert target.loop_lag_max >= 0.03
+
+
+def test_slow_step_records_game_phase_and_card(enabled_profiler):
+    target = Metrics(slow_threshold=0.01)
+    game = Dog()
+    action = game.get_list_action()[0]
+
+    @metered('dog', target)
+    async def handler(websocket):
+        await websocket.send_json({})
+        game.apply_action(action)
+        time.sleep(0.02)
+        await websocket.send_json({})
+
+    asyncio.run(handler(FakeWebSocket([])))
+    assert target.slow_steps_total['dog'] == 1
+    step = target.get_slow_steps()['slow_steps'][0]
+    assert step['game'] == 'dog' and step['seconds'] >= 0.02
+    assert step['engine'] == 'Dog' and step['method'] == 'apply_action'
+    assert step['phase'] == 'running'
+    assert step['card'] == f"{action.card.suit}{action.card.rank}"
+
+
+def test_step_timer_sleeps_are_no_slow_steps():
+    target = Metrics(slow_threshold=0.01)
+
+    @metered('uno', target)
+    async def handler(websocket):
+        await asyncio.sleep(0.02)
+        await websocket.send_json({})
+
+    asyncio.run(handler(FakeWebSocket([])))
+    assert not target.slow_steps
+    assert 'game_server_slow_steps_total' in target.render(GameProfiler())
+
+
+def test_step_timer_passes_cancellation_to_handler():
+    target = Metrics()
+    cleaned_up = []
+
+    @metered('hangman', target)
+    async def handler(websocket):
+        try:
+            await asyncio.sleep(10)
+        finally:
+            cleaned_up.append(websocket.game)
+
+    async def cancel():
+        task = asyncio.create_task(handler(FakeWebSocket([])))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    assert cleaned_up == ['hangman']
+    assert target.websockets_active['hangman'] == 0
@@ -0,0 +1,74 @@
+import json
+import pytest
+from server.py import stress
+from server.py.dog import Dog
+from server.py.stress import ENGINES, Engine, GameLog, GameStuckError, InvariantError
+
+
+@pytest.mark.parametrize('name', ['hangman', 'battleship'])
+def test_play_finishes_random_game(name):
+    game, log = stress.play(name, seed=3)
+    assert log.error is None
+    assert game.get_state().phase == 'finished'
+    assert all(choice >= 0 for choice in log.choices)
+
+
+def test_replay_reproduces_game():
+    game, log = stress.play('battleship', seed=5)
+    replayed = stress.replay(log)
+    assert replayed.get_state().model_dump() == game.get_state().model_dump()
+
+
+def test_replay_of_prefix_stops_after_last_choice():
+    _, log = stress.play('hangman', seed=1)
+    game = stress.replay(GameLog(engine='hangman', seed=1, choices=log.choices[:2]))
+    assert len(game.get_state().guesses) == 2
+
+
+def test_stuck_game_is_reported():
+    _, log = stress.play('uno', seed=0, max_actions=5)
+    assert log.get_kind() == 'GameStuckError'
+    assert log.step == 5
+    with pytest.raises(GameStuckError):
+        stress.replay(log)
+
+
+def test_check_dog_finds_overlapping_marbles():
+    game = Dog()
+    stress.check_dog(game)
+    game.state.list_player[1].list_marble[0].pos = 20
+    game.state.list_player[2].list_marble[0].pos = 20
+    with pytest.raises(InvariantError, match='on field 20'):
+        stress.check_dog(game)
+
+
+def test_check_dog_finds_lost_card():
+    game = Dog()
+    game.state.list_card_draw.pop()
+    with pytest.raises(InvariantError, match='cards instead of'):
+        stress.check_dog(game)
+
+
+def test_minimize_keeps_failure(monkeypatch):
+    def check(game):
+        if len(game.get_state().guesses) >= 3:
+            raise InvariantError("three guesses")
+
+    engine = ENGINES['hangman']
+    monkeypatch.setitem(ENGINES, 'hangman', Engine(engine.new_game, engine.new_player, check))
+    _, log = stress.play('hangman', seed=2)
+    assert log.step == 2 and log.get_kind() == 'InvariantError'
+
+    minimized = stress.minimize(log)
+    assert minimized.get_kind() == 'InvariantError'
+    assert minimized.choices == [0, 0, 0]
+    with pytest.raises(InvariantError):
+        stress.replay(minimized)
+
+
+def test_run_saves_failing_logs(tmp_path):
+    failures = stress.run('uno', range(2), max_actions=3, workers=1, path=str(tmp_path))
+    assert [log.seed for log in failures] == [0, 1]
+    saved = GameLog(**json.loads((tmp_path / 'uno_1.json').read_text()))
+    assert saved == failures[1]
+    assert stress.run('hangman', range(3), workers=1) == []
@@ -0,0 +1,210 @@
+import random
+from server.py.uno import (Uno, GameState, GamePhase, PlayerState, Card, Action, RandomPlayer, CARD_HIDDEN, HandIndex,
+                           card_key, determinize, sync_sampler)
+from server.py.determinization import HiddenCardSampler
+
+
+def make_running_state(hand, top, others=None, cnt_to_draw=0, color=None):
+    others = others if others is not None else [Card(color='red', number=1)] * 3
+    return GameState(
+        list_card_draw=[Card(color='green', number=n) for n in range(1, 10)],
+        list_card_discard=[top],
+        list_player=[PlayerState(name='Player 1', list_card=list(hand)),
+                     PlayerState(name='Player 2', list_card=list(others))],
+        phase=GamePhase.RUNNING,
+        cnt_player=2,
+        idx_player_active=0,
+        color=color or top.color,
+        cnt_to_draw=cnt_to_draw,
+    )
+
+
+def test_setup_deals_hands_and_starts_game():
+    game = Uno()
+    state = GameState(cnt_player=4)
+    game.set_state(state)
+    assert state.phase == GamePhase.RUNNING
+    assert len(GameState.LIST_CARD) == 108
+    assert all(len(player.list_card) == GameState.CNT_HAND_CARDS for player in state.list_player)
+    assert len(state.list_card_draw) + len(state.list_card_discard) == 108 - 4 * GameState.CNT_HAND_CARDS
+    assert state.list_card_discard[-1].symbol != 'wilddraw4'
+
+
+def test_setup_start_card_effects():
+    # the hands are dealt from the end of the draw pile, the card below them is turned over
+    filler = list(GameState.LIST_CARD[:20])
+    state = GameState(cnt_player=3, idx_player_active=0,
+                      list_card_draw=filler + [Card(color='red', symbol='reverse')] + filler + filler[:1])
+    Uno().set_state(state)
+    assert state.direction == -1
+    assert state.color == 'red'
+
+    state = GameState(cnt_player=2, idx_player_active=0,
+                      list_card_draw=filler + [Card(color='blue', symbol='skip')] + filler[:14])
+    Uno().set_state(state)
+    assert state.idx_player_active == 1
+
+    state = GameState(cnt_player=2, idx_player_active=0,
+                      list_card_draw=filler + [Card(color='any', symbol='wilddraw4')] + filler[:14])
+    Uno().set_state(state)
+    assert state.list_card_discard[-1] == filler[-1]
+    assert state.list_card_draw[0] == Card(color='any', symbol='wilddraw4')
+
+
+def test_list_action_matches_color_number_and_symbol():
+    game = Uno()
+    hand = [Card(color='red', number=3), Card(color='blue', number=5), Card(color='blue', symbol='skip'),
+            Card(color='green', number=7), Card(color='any', symbol='wild')]
+    game.set_state(make_running_state(hand, Card(color='red', number=5)))
+    actions = game.get_list_action()
+    cards = {(a.card.color, a.card.number, a.card.symbol) for a in actions if a.card is not None}
+    assert cards == {('red', 3, None), ('blue', 5, None), ('any', None, 'wild')}
+    assert len([a for a in actions if a.card is not None and a.card.symbol == 'wild']) == 4
+    assert Action(card=None, color=None, draw=1) in actions
+
+
+def test_wilddraw4_only_without_matching_color():
+    game = Uno()
+    hand = [Card(color='any', symbol='wilddraw4'), Card(color='blue', number=2), Card(color='red', number=2)]
+    game.set_state(make_running_state(hand, Card(color='red', number=5)))
+    assert all(a.card is None or a.card.symbol != 'wilddraw4' for a in game.get_list_action())
+
+    hand = [Card(color='any', symbol='wilddraw4'), Card(color='blue', number=2), Card(color='green', number=2)]
+    game.set_state(make_running_state(hand, Card(color='red', number=5)))
+    actions = [a for a in game.get_list_action() if a.card is not None]
+    assert len(actions) == 4 and all(a.draw == 4 for a in actions)
+
+
+def test_stacking_draw2_and_penalty_draw():
+    game = Uno()
+    hand = [Card(color='blue', symbol='draw2'), Card(color='red', number=1), Card(color='red', number=2)]
+    game.set_state(make_running_state(hand, Card(color='red', symbol='draw2'), cnt_to_draw=2))
+    actions = game.get_list_action()
+    assert sorted(actions) == sorted([Action(card=Card(color='blue', symbol='draw2'), color='blue', draw=4),
+                                      Action(card=None, color=None, draw=2)])
+    game.apply_action(Action(card=None, color=None, draw=2))
+    state = game.get_state()
+    assert len(state.list_player[0].list_card) == 5
+    assert state.cnt_to_draw == 0
+    assert state.idx_player_active == 0
+
+
+def test_draw_then_play_drawn_card():
+    game = Uno()
+    hand = [Card(color='blue', number=1), Card(color='yellow', number=2)]
+    state = make_running_state(hand, Card(color='green', number=5))
+    game.set_state(state)
+    game.apply_action(Action(card=None, color=None, draw=1))
+    assert state.has_drawn and state.idx_player_active == 0
+    assert game.get_list_action() == [Action(card=Card(color='green', number=9), color='green', draw=None)]
+    game.apply_action(game.get_list_action()[0])
+    assert state.idx_player_active == 1
+    assert not state.has_drawn
+
+
+def test_hand_index_follows_drawn_played_and_replaced_cards():
+    game = Uno()
+    hand = [Card(color='blue', number=1), Card(color='blue', number=1), Card(color='any', symbol='wilddraw4')]
+    state = make_running_state(hand, Card(color='red', symbol='draw2'), cnt_to_draw=20)
+    game.set_state(state)
+    game.apply_action(Action(card=None, color=None, draw=20))
+    game.apply_action(Action(card=Card(color='blue', number=1), color='blue'))
+    index = game._hands[0]
+    rebuilt = HandIndex(list(state.list_player[0].list_card))
+    assert index.is_in_sync(state.list_player[0])
+    assert (index.by_color, index.by_number, index.by_symbol) == \
+        (rebuilt.by_color, rebuilt.by_number, rebuilt.by_symbol)
+
+    state.idx_player_active = 0
+    state.list_player[0].list_card = [Card(color='yellow', number=4)]
+    assert not index.is_in_sync(state.list_player[0])
+    actions = game.get_list_action()
+    assert [a.card for a in actions if a.card is not None] == []
+
+
+def test_missed_uno_draws_penalty_cards():
+    game = Uno()
+    hand = [Card(color='red', number=1), Card(color='red', number=2)]
+    state = make_running_state(hand, Card(color='red', number=5))
+    game.set_state(state)
+    assert Action(card=Card(color='red', number=1), color='red', uno=True) in game.get_list_action()
+    game.apply_action(Action(card=Card(color='red', number=1), color='red'))
+    assert len(state.list_player[0].list_card) == 5
+
+
+def test_play_last_card_finishes_game():
+    game = Uno()
+    state = make_running_state([Card(color='red', symbol='skip')], Card(color='red', number=5))
+    game.set_state(state)
+    game.apply_action(Action(card=Card(color='red', symbol='skip'), color='red'))
+    assert state.phase == GamePhase.FINISHED
+    assert state.idx_player_active == 0
+    assert game.get_list_action() == []
+
+
+def test_reshuffle_discard_pile_when_draw_pile_is_empty():
+    game = Uno()
+    state = make_running_state([Card(color='blue', number=1)], Card(color='red', number=5))
+    state.list_card_draw = []
+    state.list_card_discard = [Card(color='yellow', number=n) for n in range(1, 4)] + [Card(color='red', number=5)]
+    game.set_state(state)
+    game.apply_action(Action(card=None, color=None, draw=1))
+    assert state.list_card_discard == [Card(color='red', number=5)]
+    assert len(state.list_card_draw) == 2
+
+
+def test_player_view_hides_opponent_cards():
+    game = Uno()
+    state = GameState(cnt_player=3, idx_player_active=0)
+    game.set_state(state)
+    view = game.get_player_view(1)
+    assert view.list_player[1].list_card == state.list_player[1].list_card
+    assert view.list_player[0].list_card == [CARD_HIDDEN] * GameState.CNT_HAND_CARDS
+    assert all(card == CARD_HIDDEN for card in view.list_card_draw)
+    assert state.list_player[0].list_card[0] != CARD_HIDDEN
+
+
+def test_random_players_finish_game():
+    random.seed(7)
+    for cnt_player in (2, 3, 4):
+        game = Uno()
+        state = GameState(cnt_player=cnt_player)
+        game.set_state(state)
+        player = RandomPlayer()
+        for _ in range(5000):
+            if state.phase == GamePhase.FINISHED:
+                break
+            game.apply_action(player.select_action(state, game.get_list_action()))
+        assert state.phase == GamePhase.FINISHED
+        assert len(state.list_player[state.idx_player_active].list_card) == 0
+        total = sum(len(p.list_card) for p in state.list_player)
+        assert total + len(state.list_card_draw) + len(state.list_card_discard) == 108
+    game.print_state()
+
+
+def test_play_turns_stops_at_seat_without_player():
+    random.seed(3)
+    game = Uno()
+    state = GameState(cnt_player=4, idx_player_active=1)
+    game.set_state(state)
+    list_turn = game.play_turns({idx: RandomPlayer() for idx in range(1, 4)})
+    assert state.phase == GamePhase.FINISHED or state.idx_player_active == 0
+    assert all(idx_player != 0 for idx_player, _ in list_turn)
+    assert game.play_turns({}) == []
+
+
+def test_determinize_player_view():
+    random.seed(9)
+    game = Uno()
+    state = GameState(cnt_player=3)
+    game.set_state(state)
+    view = game.get_player_view(1)
+    sampler = HiddenCardSampler(GameState.LIST_CARD, card_key)
+    sync_sampler(sampler, view, 1)
+    dealt = determinize(view, 1, sampler, random.Random(4))
+    assert dealt.list_player[1].list_card == state.list_player[1].list_card
+    assert [len(p.list_card) for p in dealt.list_player] == [len(p.list_card) for p in state.list_player]
+    assert len(dealt.list_card_draw) == len(state.list_card_draw)
+    cards = [card for p in dealt.list_player for card in p.list_card] + dealt.list_card_draw + dealt.list_card_discard
+    assert sorted(map(card_key, cards), key=str) == sorted(map(card_key, GameState.LIST_CARD), key=str)
+    assert all(card != CARD_HIDDEN for card in cards)